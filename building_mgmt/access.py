@@ -0,0 +1,156 @@
+"""
+Building access resolution.
+
+Works out once which buildings a user can reach, and which module permissions
+they hold there, so views can filter querysets instead of checking buildings
+one query at a time.
+
+- Master role users can access every building with every permission.
+- Other users have full access to the buildings they created, plus whatever
+  their active users_mgmt.BuildingAccess grants allow.
+
+The resolver is memoised on the request and the resolved grants are kept in
+the cache for BUILDING_ACCESS_CACHE_TTL seconds; BuildingAccess and Building
+changes invalidate the affected users.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+from django.http import HttpRequest
+from django.utils import timezone
+from rest_framework.request import Request
+
+from .models import Building
+
+# Module name -> (view flag, edit flag) on users_mgmt.BuildingAccess
+MODULE_PERMISSIONS = {
+    'financial': ('can_view_financial', 'can_edit_financial'),
+    'equipment': ('can_view_equipment', 'can_edit_equipment'),
+    'legal': ('can_view_legal', 'can_edit_legal'),
+    'field_requests': ('can_view_field_requests', 'can_edit_field_requests'),
+    'reports': ('can_view_reports', 'can_generate_reports'),
+    'users': ('can_manage_users', 'can_manage_users'),
+}
+
+# BuildingAccess levels that may modify the building itself
+EDIT_ACCESS_LEVELS = ('full', 'admin')
+
+ALL_MODULES = sorted(MODULE_PERMISSIONS)
+
+CACHE_KEY = 'building_access:{user_id}'
+
+
+def _cache_key(user_id):
+    return CACHE_KEY.format(user_id=user_id)
+
+
+def load_grants(user):
+    """
+    Read the grants of a non-master user from the database (two queries).
+    Returns {building_id: {'edit': bool, 'view': [modules], 'modify': [modules]}}.
+    """
+    from users_mgmt.models import BuildingAccess
+
+    grants = {}
+    today = timezone.now().date()
+    accesses = BuildingAccess.objects.filter(
+        Q(access_start_date__isnull=True) | Q(access_start_date__lte=today),
+        Q(access_end_date__isnull=True) | Q(access_end_date__gte=today),
+        user=user,
+        is_active=True,
+    ).values('building_id', 'access_level', *{flag for flags in MODULE_PERMISSIONS.values() for flag in flags})
+    for access in accesses:
+        grants[access['building_id']] = {
+            'edit': access['access_level'] in EDIT_ACCESS_LEVELS,
+            'view': [m for m, (view, _) in MODULE_PERMISSIONS.items() if access[view]],
+            'modify': [m for m, (_, edit) in MODULE_PERMISSIONS.items() if access[edit]],
+        }
+
+    # Creators keep full control of their buildings whatever the grants say
+    for building_id in Building.objects.filter(created_by=user).values_list('id', flat=True):
+        grants[building_id] = {'edit': True, 'view': ALL_MODULES, 'modify': ALL_MODULES}
+    return grants
+
+
+class BuildingAccessResolver:
+    def __init__(self, user):
+        self.user = user
+        self.is_master = getattr(user, 'role', None) == 'master'
+        self._grants = None
+
+    @property
+    def grants(self):
+        if self._grants is None:
+            if self.is_master:
+                self._grants = {}
+            else:
+                key = _cache_key(self.user.id)
+                grants = cache.get(key)
+                if grants is None:
+                    grants = load_grants(self.user)
+                    cache.set(key, grants, settings.BUILDING_ACCESS_CACHE_TTL)
+                self._grants = grants
+        return self._grants
+
+    def _allows(self, grant, module, edit):
+        if module is None:
+            return grant['edit'] if edit else True
+        return module in (grant['modify'] if edit else grant['view'])
+
+    def building_ids(self, module=None, edit=False):
+        """Ids of the buildings the user can reach, or None when unrestricted (master)."""
+        if self.is_master:
+            return None
+        return {
+            building_id for building_id, grant in self.grants.items()
+            if self._allows(grant, module, edit)
+        }
+
+    def can_access(self, building_id, module=None, edit=False):
+        """
+        Whether the user may access `building_id`; with `module`, whether they hold
+        that module's view (or edit) permission there. Never queries once resolved.
+        """
+        if self.is_master:
+            return True
+        try:
+            building_id = int(building_id)
+        except (TypeError, ValueError):
+            return False
+        grant = self.grants.get(building_id)
+        return grant is not None and self._allows(grant, module, edit)
+
+    def filter_queryset(self, queryset, field='building_id', module=None, edit=False):
+        """Restrict `queryset` to rows whose `field` is an accessible building id."""
+        ids = self.building_ids(module, edit)
+        if ids is None:
+            return queryset
+        return queryset.filter(**{f'{field}__in': ids})
+
+    def get_building(self, building_id, module=None, edit=False, queryset=None):
+        """The building if accessible, else None (no query at all when access is denied)."""
+        if not self.can_access(building_id, module, edit):
+            return None
+        queryset = Building.objects.all() if queryset is None else queryset
+        return queryset.filter(id=building_id).first()
+
+
+def building_access(request):
+    """
+    The request's resolver, created once per request.
+    A user may be passed instead (e.g. from a background job); the resolver is
+    then not memoised but still served from the cache.
+    """
+    if not isinstance(request, (HttpRequest, Request)):
+        return BuildingAccessResolver(request)
+    # Memoise on the Django HttpRequest so every DRF Request wrapper shares it
+    http_request = getattr(request, '_request', request)
+    resolver = getattr(http_request, '_building_access', None)
+    if resolver is None or resolver.user is not request.user:
+        resolver = BuildingAccessResolver(request.user)
+        http_request._building_access = resolver
+    return resolver
+
+
+def invalidate_building_access(*user_ids):
+    cache.delete_many([_cache_key(user_id) for user_id in user_ids if user_id])
@@ -3,4 +3,8 @@ from django.apps import AppConfig
 
 class BuildingMgmtConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'building_mgmt'
\ No newline at end of file
+    name = 'building_mgmt'
+
+    def ready(self):
+        # Building access and directory cache invalidation
+        from . import signals  # noqa: F401
@@ -0,0 +1,68 @@
+"""
+Public building directory used by the signup page.
+
+A slim projection (id, name, city) read with .values() and rendered once:
+the JSON body and its strong ETag are kept in the cache until a Building or
+Address changes (see building_mgmt.signals), so anonymous traffic is served
+without touching the database and conditional requests get a 304.
+"""
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.http import quote_etag
+
+from .models import Building
+
+CACHE_KEY = 'building_directory'
+
+
+def directory_rows():
+    return Building.objects.order_by('building_name', 'id').values('id', 'building_name', 'address__city')
+
+
+def render_directory(rows):
+    """(body bytes, strong ETag) of the directory rows."""
+    body = json.dumps(
+        [{'id': row['id'], 'name': row['building_name'], 'city': row['address__city']} for row in rows],
+        ensure_ascii=False,
+        separators=(',', ':'),
+    ).encode('utf-8')
+    return body, quote_etag(hashlib.sha256(body).hexdigest()[:32])
+
+
+def build_directory():
+    """Render the directory; returns (body bytes, strong ETag)."""
+    return render_directory(directory_rows())
+
+
+def get_directory():
+    """The cached (body, ETag) pair, rebuilt on a miss."""
+    directory = cache.get(CACHE_KEY)
+    if directory is None:
+        directory = build_directory()
+        cache.set(CACHE_KEY, directory, settings.BUILDING_DIRECTORY_CACHE_TTL)
+    return directory
+
+
+async def aget_directory():
+    """get_directory() for async views: the rows are read with the async ORM on a miss."""
+    directory = await cache.aget(CACHE_KEY)
+    if directory is None:
+        directory = render_directory([row async for row in directory_rows()])
+        await cache.aset(CACHE_KEY, directory, settings.BUILDING_DIRECTORY_CACHE_TTL)
+    return directory
+
+
+def cache_control():
+    """Let browsers revalidate quickly and shared caches (CDN) absorb the rest."""
+    return (
+        f'public, max-age={settings.BUILDING_DIRECTORY_MAX_AGE}, '
+        f's-maxage={settings.BUILDING_DIRECTORY_SHARED_MAX_AGE}, '
+        f'stale-while-revalidate={settings.BUILDING_DIRECTORY_SHARED_MAX_AGE}'
+    )
+
+
+def invalidate_directory():
+    cache.delete(CACHE_KEY)
@@ -0,0 +1,561 @@
+import os
+import tempfile
+from dataclasses import dataclass
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+from django.db.models import CharField, Count, Max
+from django.db.models.functions import Cast, Coalesce, Length
+from django.http import FileResponse
+from django.utils import timezone
+from openpyxl import Workbook, load_workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
+from openpyxl.utils import get_column_letter
+from rest_framework import status
+from sindipro_backend.caching import invalidate_tags
+
+from .models import Unit
+
+XLSX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+UNIT_EXPORT_HEADERS = [
+    'Unit Number', 'Tower', 'Floor', 'Identification', 'Area (m²)',
+    'Ideal Fraction', 'Status', 'Owner', 'Owner Phone', 'Parking Spaces',
+    'Key Delivery', 'Deposit Location'
+]
+
+# Map key_delivery to more readable text for export
+KEY_DELIVERY_DISPLAY_MAP = {
+    'Yes': 'Yes',
+    'No': 'No',
+    'Pnd': 'Pending',
+    'Y': 'Yes',
+    'N': 'No'
+}
+
+# Floor, identification, area, fraction, status, parking
+CENTERED_COLUMNS = {3, 4, 5, 6, 7, 10}
+
+EXPORT_CHUNK_SIZE = 2000
+STREAM_BLOCK_SIZE = 64 * 1024
+MAX_COLUMN_WIDTH = 50
+
+
+def _column_widths(units):
+    """
+    Compute the width of every export column with a single aggregate query.
+
+    Write-only worksheets need their column dimensions before the first row is
+    appended, so the longest value per column is measured in the database
+    instead of re-scanning the written cells.
+    """
+    def length_of(field):
+        return Coalesce(Max(Length(Cast(field, output_field=CharField()))), 0)
+
+    lengths = units.order_by().aggregate(
+        number=length_of('number'),
+        tower=length_of('tower__name'),
+        floor=length_of('floor'),
+        identification=length_of('identification'),
+        area=length_of('area'),
+        ideal_fraction=length_of('ideal_fraction'),
+        status=length_of('status'),
+        owner=length_of('owner'),
+        owner_phone=length_of('owner_phone'),
+        parking_spaces=length_of('parking_spaces'),
+        key_delivery=length_of('key_delivery'),
+        deposit_location=length_of('deposit_location'),
+    )
+
+    # Display values can be longer than the stored codes (e.g. 'Pnd' -> 'Pending')
+    def longest_label(choices):
+        return max(len(label) for label in choices)
+
+    column_lengths = [
+        lengths['number'],
+        max(lengths['tower'], len('N/A')),
+        lengths['floor'],
+        max(lengths['identification'], longest_label(dict(Unit.IDENTIFICATION_CHOICES).values())),
+        lengths['area'],
+        lengths['ideal_fraction'],
+        max(lengths['status'], longest_label(dict(Unit.STATUS_CHOICES).values())),
+        lengths['owner'],
+        lengths['owner_phone'],
+        lengths['parking_spaces'],
+        max(lengths['key_delivery'], longest_label(KEY_DELIVERY_DISPLAY_MAP.values())),
+        max(lengths['deposit_location'], len('N/A')),
+    ]
+
+    return [
+        min(max(length, len(header)) + 2, MAX_COLUMN_WIDTH)
+        for header, length in zip(UNIT_EXPORT_HEADERS, column_lengths)
+    ]
+
+
+def unit_export_row(unit):
+    """Convert a unit into the list of display values written to the export."""
+    status_display = dict(Unit.STATUS_CHOICES).get(unit.status, unit.status)
+    identification_display = dict(Unit.IDENTIFICATION_CHOICES).get(unit.identification, unit.identification)
+    key_delivery_display = KEY_DELIVERY_DISPLAY_MAP.get(unit.key_delivery, unit.key_delivery)
+
+    return [
+        unit.number,
+        unit.tower.name if unit.tower else "N/A",
+        unit.floor,
+        identification_display,
+        float(unit.area),
+        float(unit.ideal_fraction),
+        status_display,
+        unit.owner,
+        unit.owner_phone,
+        unit.parking_spaces,
+        key_delivery_display,
+        unit.deposit_location or "N/A"
+    ]
+
+
+def write_units_workbook(building, output, progress_callback=None):
+    """
+    Write the units report of a building to `output` (path or file object).
+
+    Uses a write-only worksheet and a chunked queryset iterator so memory
+    stays flat regardless of the number of units. `progress_callback`, if
+    given, is called with (rows_written, total_rows) after every chunk.
+    """
+    units = Unit.objects.filter(building=building)
+
+    # Status summary and totals come from one grouped query instead of a
+    # second pass over the units plus a separate count()
+    status_counts = {}
+    for entry in units.order_by().values('status').annotate(total=Count('id')):
+        status_display = dict(Unit.STATUS_CHOICES).get(entry['status'], entry['status'])
+        status_counts[status_display] = status_counts.get(status_display, 0) + entry['total']
+    total_units = sum(status_counts.values())
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(title=f"{building.building_name} - Units Report")
+
+    for col, width in enumerate(_column_widths(units), 1):
+        ws.column_dimensions[get_column_letter(col)].width = width
+
+    # Define styles
+    header_font = Font(bold=True, color="FFFFFF")
+    header_fill = PatternFill(start_color="4472C4", end_color="4472C4", fill_type="solid")
+    header_alignment = Alignment(horizontal="center", vertical="center")
+    center_alignment = Alignment(horizontal="center")
+    border = Border(
+        left=Side(style="thin"),
+        right=Side(style="thin"),
+        top=Side(style="thin"),
+        bottom=Side(style="thin")
+    )
+
+    def styled_cell(value, font=None, fill=None, alignment=None, cell_border=None):
+        cell = WriteOnlyCell(ws, value=value)
+        if font:
+            cell.font = font
+        if fill:
+            cell.fill = fill
+        if alignment:
+            cell.alignment = alignment
+        if cell_border:
+            cell.border = cell_border
+        return cell
+
+    # Title and building information
+    ws.append([styled_cell(
+        f"Building Units Report - {building.building_name}",
+        font=Font(bold=True, size=16), alignment=center_alignment
+    )])
+    ws.merged_cells.add('A1:L1')
+
+    address = building.address
+    address_str = f"{address.street}, {address.number}, {address.neighborhood}, {address.city}/{address.state}"
+    ws.append([styled_cell(
+        f"Address: {address_str} | CNPJ: {building.cnpj} | Manager: {building.manager_name}",
+        alignment=center_alignment
+    )])
+    ws.merged_cells.add('A2:L2')
+    ws.append([])
+
+    # Headers
+    ws.append([
+        styled_cell(header, font=header_font, fill=header_fill, alignment=header_alignment, cell_border=border)
+        for header in UNIT_EXPORT_HEADERS
+    ])
+
+    # Write unit data
+    rows = units.select_related('tower').only(
+        'number', 'floor', 'area', 'ideal_fraction', 'identification', 'deposit_location',
+        'key_delivery', 'owner', 'owner_phone', 'parking_spaces', 'status', 'tower__name'
+    ).order_by('tower__name', 'floor', 'number')
+
+    row = 5
+    for written, unit in enumerate(rows.iterator(chunk_size=EXPORT_CHUNK_SIZE), 1):
+        ws.append([
+            styled_cell(
+                value, cell_border=border,
+                alignment=center_alignment if col in CENTERED_COLUMNS else None
+            )
+            for col, value in enumerate(unit_export_row(unit), 1)
+        ])
+        row += 1
+        if progress_callback and written % EXPORT_CHUNK_SIZE == 0:
+            progress_callback(written, total_units)
+
+    # Add summary information
+    ws.append([])
+    ws.append([])
+    summary_row = row + 2
+    ws.append([styled_cell(f"Total Units: {total_units}", font=Font(bold=True))])
+    ws.merged_cells.add(f'A{summary_row}:D{summary_row}')
+
+    summary_row += 1
+    for status_name, count in status_counts.items():
+        ws.append([f"{status_name}: {count} units"])
+        ws.merged_cells.add(f'A{summary_row}:D{summary_row}')
+        summary_row += 1
+
+    wb.save(output)
+
+
+def units_export_filename(building):
+    return f"{building.building_name.replace(' ', '_')}_units_report.xlsx"
+
+
+def export_file_response(path, filename):
+    """
+    Send the export file at `path` as an attachment, read in blocks. The file
+    is removed when the response is closed, whether or not it was streamed
+    (e.g. the client disconnected first).
+    """
+    response = FileResponse(open(path, 'rb'), as_attachment=True, filename=filename,
+                            content_type=XLSX_CONTENT_TYPE)
+    response.block_size = STREAM_BLOCK_SIZE
+    # Runs after FileResponse's own closer has closed the file
+    response._resource_closers.append(lambda: os.remove(path))
+    return response
+
+
+def build_units_export_file(building, progress_callback=None):
+    """Write the units report to a temporary file and return its path."""
+    fd, path = tempfile.mkstemp(suffix='.xlsx')
+    os.close(fd)
+    try:
+        write_units_workbook(building, path, progress_callback)
+    except Exception:
+        os.remove(path)
+        raise
+    return path
+
+
+IMPORT_HEADER_ROW = 4
+IMPORT_BATCH_SIZE = 2000
+
+UNIT_IMPORT_FIELDS = [
+    'tower', 'floor', 'area', 'ideal_fraction', 'identification', 'deposit_location',
+    'key_delivery', 'owner', 'owner_phone', 'parking_spaces', 'status',
+]
+
+# Map key_delivery values to database-compatible short codes
+KEY_DELIVERY_IMPORT_MAP = {
+    'yes': 'Yes',
+    'no': 'No',
+    'delivered': 'Yes',
+    'not delivered': 'No',
+    'pending': 'Pnd',
+    'received': 'Yes',
+    'given': 'Yes',
+    'done': 'Yes',
+    'not done': 'No',
+    'completed': 'Yes',
+    'incomplete': 'No',
+    'sim': 'Yes',  # Portuguese for yes
+    'não': 'No',   # Portuguese for no
+    'nao': 'No',   # Portuguese for no (without accent)
+    'entregue': 'Yes',  # Portuguese for delivered
+}
+
+
+@dataclass
+class UnitImportRow:
+    """A validated spreadsheet row, ready to be written to building_mgmt_unit."""
+    row_num: int
+    number: str
+    tower: object
+    floor: int
+    area: Decimal
+    ideal_fraction: Decimal
+    identification: str
+    deposit_location: str
+    key_delivery: str
+    owner: str
+    owner_phone: str
+    parking_spaces: int
+    status: str
+
+
+def _safe_str(value, default=''):
+    if value is None:
+        return default
+    try:
+        # Convert to string and ensure it's properly encoded
+        s = str(value).strip()
+        return s.encode('utf-8', errors='ignore').decode('utf-8', errors='ignore')
+    except Exception:
+        return default
+
+
+def _safe_int(value, default):
+    try:
+        return int(float(value)) if value is not None else default
+    except (ValueError, TypeError):
+        return default
+
+
+def _safe_decimal(value, places):
+    try:
+        return Decimal(str(value)).quantize(places) if value is not None else Decimal(0).quantize(places)
+    except (InvalidOperation, ValueError, TypeError):
+        return Decimal(0).quantize(places)
+
+
+def read_units_header(ws):
+    """Return the stripped header cells of a units sheet opened in read-only mode."""
+    for values in ws.iter_rows(min_row=IMPORT_HEADER_ROW, max_row=IMPORT_HEADER_ROW,
+                               max_col=len(UNIT_EXPORT_HEADERS), values_only=True):
+        return [str(value).strip() if value else "" for value in values]
+    return []
+
+
+def parse_units_sheet(ws, towers):
+    """
+    Parse the data rows of a units sheet into UnitImportRow records.
+
+    Rows are read lazily with iter_rows() so a read-only workbook never holds
+    the whole sheet. Returns (records, errors); records are keyed by unit
+    number so a number repeated in the file keeps its last occurrence.
+    """
+    status_map = {v: k for k, v in Unit.STATUS_CHOICES}
+    identification_map = {v: k for k, v in Unit.IDENTIFICATION_CHOICES}
+
+    records = {}
+    errors = []
+
+    rows = ws.iter_rows(min_row=IMPORT_HEADER_ROW + 1, max_col=len(UNIT_EXPORT_HEADERS), values_only=True)
+    for row_num, row_data in enumerate(rows, IMPORT_HEADER_ROW + 1):
+        # Stop at the first row without a unit number
+        if not row_data or row_data[0] is None or str(row_data[0]).strip() == '':
+            break
+
+        row_data = list(row_data) + [None] * (len(UNIT_EXPORT_HEADERS) - len(row_data))
+
+        try:
+            unit_number = _safe_str(row_data[0])[:20]
+            tower_name_raw = _safe_str(row_data[1])
+            tower_name = tower_name_raw if tower_name_raw and tower_name_raw != 'N/A' else None
+
+            identification_display = _safe_str(row_data[3], 'Residential')
+            status_display = _safe_str(row_data[6], 'Vacant')
+
+            # Map display values back to database values
+            unit_status = status_map.get(status_display, 'vacant')[:20]
+            identification = identification_map.get(identification_display, 'residential')[:20]
+
+            # Normalize and map key_delivery value, keeping unknown values truncated
+            key_delivery_input = _safe_str(row_data[10], 'No')
+            key_delivery = KEY_DELIVERY_IMPORT_MAP.get(key_delivery_input.lower().strip(), 'No')
+            if key_delivery == 'No' and key_delivery_input:
+                key_delivery = key_delivery_input[:3]
+
+            record = UnitImportRow(
+                row_num=row_num,
+                number=unit_number,
+                tower=None,
+                floor=_safe_int(row_data[2], 1),
+                area=_safe_decimal(row_data[4], Decimal('0.01')),
+                ideal_fraction=_safe_decimal(row_data[5], Decimal('0.000001')),
+                identification=identification,
+                deposit_location=_safe_str(row_data[11])[:200],
+                key_delivery=key_delivery[:3],
+                owner=_safe_str(row_data[7])[:200],
+                owner_phone=_safe_str(row_data[8])[:20],
+                parking_spaces=max(_safe_int(row_data[9], 0), 0),
+                status=unit_status,
+            )
+        except Exception as e:
+            errors.append(f"Row {row_num}: Error parsing data - {str(e)}")
+            continue
+
+        # Find tower by name
+        if tower_name:
+            record.tower = towers.get(tower_name)
+            if not record.tower:
+                errors.append(f"Row {row_num}: Tower '{tower_name}' not found in building")
+                continue
+
+        # Validate required fields
+        if not record.number:
+            errors.append(f"Row {row_num}: Unit number is required")
+            continue
+
+        if record.area <= 0:
+            errors.append(f"Row {row_num}: Area must be greater than 0")
+            continue
+
+        previous = records.pop(record.number, None)
+        if previous:
+            errors.append(
+                f"Row {row_num}: Unit {record.number} also appears in row {previous.row_num}; last occurrence kept"
+            )
+        records[record.number] = record
+
+    return list(records.values()), errors
+
+
+def _apply_record(unit, record):
+    for field in UNIT_IMPORT_FIELDS:
+        setattr(unit, field, getattr(record, field))
+    return unit
+
+
+def _save_error_message(unit_number, error):
+    error_msg = str(error)
+    if "value too long for type character varying" in error_msg:
+        return f"Error saving unit {unit_number}: One or more fields exceed maximum length limits."
+    if "UnicodeDecodeError" in error_msg or "UnicodeEncodeError" in error_msg or "codec" in error_msg:
+        return f"Error saving unit {unit_number}: Invalid character encoding in data."
+    if "unique constraint" in error_msg.lower() or "duplicate key" in error_msg.lower():
+        return f"Error saving unit {unit_number}: Unit already exists."
+    return f"Error saving unit {unit_number}: {error_msg}"
+
+
+def import_unit_records(building, records, batch_size=IMPORT_BATCH_SIZE, progress_callback=None):
+    """
+    Upsert parsed unit records for a building.
+
+    Existing units are resolved with one query, then every batch is written
+    with one bulk_create and one bulk_update inside its own transaction. If a
+    batch fails, its rows are retried one by one under savepoints so the
+    per-row error report is preserved. `progress_callback`, if given, is
+    called with (rows_done, total_rows) after every batch.
+
+    Returns (created_count, updated_count, save_errors).
+    """
+    existing_ids = dict(
+        Unit.objects.filter(building=building).values_list('number', 'id')
+    )
+
+    created_count = 0
+    updated_count = 0
+    save_errors = []
+
+    for batch_start in range(0, len(records), batch_size):
+        batch = records[batch_start:batch_start + batch_size]
+        now = timezone.now()
+
+        to_create = []
+        to_update = []
+        for record in batch:
+            existing_id = existing_ids.get(record.number)
+            if existing_id:
+                unit = _apply_record(Unit(id=existing_id, building=building, number=record.number), record)
+                unit.updated_at = now
+                to_update.append(unit)
+            else:
+                to_create.append(_apply_record(Unit(building=building, number=record.number), record))
+
+        try:
+            with transaction.atomic():
+                if to_create:
+                    Unit.objects.bulk_create(to_create)
+                if to_update:
+                    Unit.objects.bulk_update(to_update, UNIT_IMPORT_FIELDS + ['updated_at'])
+            created_count += len(to_create)
+            updated_count += len(to_update)
+        except Exception:
+            # Fall back to row-by-row writes to report exactly which rows failed.
+            # Creates may carry pks from the rolled-back bulk_create (PostgreSQL
+            # returns them), so the kind of write comes from the partition above.
+            rows = [(unit, False) for unit in to_create] + [(unit, True) for unit in to_update]
+            for unit, is_update in rows:
+                try:
+                    with transaction.atomic():
+                        if is_update:
+                            unit.save(update_fields=UNIT_IMPORT_FIELDS + ['updated_at'])
+                        else:
+                            unit.pk = None
+                            unit.save(force_insert=True)
+                    if is_update:
+                        updated_count += 1
+                    else:
+                        created_count += 1
+                except Exception as save_error:
+                    save_errors.append(_save_error_message(unit.number, save_error))
+
+        if progress_callback:
+            progress_callback(batch_start + len(batch), len(records))
+
+    # bulk_create/bulk_update skip the signals that invalidate cached unit lists
+    invalidate_tags('unit', building_id=building.id)
+    return created_count, updated_count, save_errors
+
+
+def import_units_file(building, excel_file, progress_callback=None):
+    """
+    Run a full units import from an uploaded Excel file.
+
+    Returns (response_data, http_status, records) where response_data is the
+    report sent back to the client (summary, warnings, validation_warnings).
+    """
+    try:
+        wb = load_workbook(excel_file, read_only=True, data_only=True)
+        ws = wb.active
+    except Exception as e:
+        return {'error': f'Error reading Excel file: {str(e)}'}, status.HTTP_400_BAD_REQUEST, []
+
+    try:
+        headers = read_units_header(ws)
+
+        # Validate headers (more flexible validation)
+        if len(headers) < 8:  # At least basic headers
+            return {
+                'error': 'Invalid Excel format. Missing required columns.',
+                'expected_headers': UNIT_EXPORT_HEADERS,
+                'found_headers': headers
+            }, status.HTTP_400_BAD_REQUEST, []
+
+        # Get all towers for this building to map tower names to IDs
+        towers = {tower.name: tower for tower in building.towers.all()}
+
+        records, errors = parse_units_sheet(ws, towers)
+    finally:
+        wb.close()
+
+    if not records:
+        if errors:
+            return {'error': 'Data validation failed', 'details': errors}, status.HTTP_400_BAD_REQUEST, []
+        return {'error': 'No valid unit data found in the Excel file'}, status.HTTP_400_BAD_REQUEST, []
+
+    create_count, update_count, save_errors = import_unit_records(
+        building, records, progress_callback=progress_callback
+    )
+    total_processed = create_count + update_count
+
+    response_data = {
+        'message': f'Successfully processed {total_processed} units',
+        'summary': {
+            'total_processed': total_processed,
+            'created': create_count,
+            'updated': update_count
+        }
+    }
+
+    if save_errors:
+        response_data['warnings'] = save_errors
+
+    if errors:
+        response_data['validation_warnings'] = errors
+
+    return response_data, status.HTTP_201_CREATED if total_processed else status.HTTP_400_BAD_REQUEST, records
@@ -1,12 +1,73 @@
+from datetime import date
+from decimal import Decimal
 from django.core.management.base import BaseCommand
 from django.db import transaction
 from building_mgmt.models import Building, Address, Tower, TowerUnitDistribution, Unit
 from auth_system.models import User
+from financials import snapshots
+from financials.bulk import resolve_categories
+from financials.models import AnnualBudget, Collection, Expense, FinancialMainAccount
+from sindipro_backend.caching import invalidate_tags
+from users_mgmt.models import BuildingAccess
 import random
 
+FINANCIAL_CATEGORIES = ['Manutenção', 'Limpeza', 'Segurança', 'Energia', 'Água']
+FINANCIAL_TAGS = ('expense', 'annual_budget', 'collection', 'financial_account')
+
 class Command(BaseCommand):
     help = 'Seed initial building data for the SINDIPRO system'
 
+    def add_arguments(self, parser):
+        parser.add_argument('--financial-months', type=int, default=0,
+                            help='Also seed this many months of expenses, budgets, collections and '
+                                 'accounts per building (e.g. for load tests)')
+
+    def seed_financials(self, buildings, months, user):
+        # bulk_create skips the model signals: snapshots and cache tags are refreshed below
+        categories = list(resolve_categories(FINANCIAL_CATEGORIES).values())
+        today = date.today()
+        first_month = (today.year * 12 + today.month - 1) - (months - 1)
+        month_starts = [date(m // 12, m % 12 + 1, 1) for m in range(first_month, first_month + months)]
+
+        expenses, budgets, collections, accounts = [], [], [], []
+        for building in buildings:
+            for month_start in month_starts:
+                for category in categories:
+                    expenses.append(Expense(
+                        building=building, category=category,
+                        expense_type=random.choice(['operational', 'maintenance']),
+                        description=f'{category.name} {month_start:%m/%Y}',
+                        amount=Decimal(random.randint(50000, 500000)) / 100,
+                        expense_date=month_start.replace(day=random.randint(1, 28)),
+                        vendor=f'Fornecedor {category.name}', created_by=user,
+                    ))
+            for year in sorted({month_start.year for month_start in month_starts}):
+                budgets.extend(
+                    AnnualBudget(building=building, year=year, category=category,
+                                 budgeted_amount=Decimal(random.randint(1000000, 5000000)) / 100, created_by=user)
+                    for category in categories
+                )
+            collections.append(Collection(
+                building=building, name='Taxa condominial', purpose='Despesas ordinárias',
+                monthly_amount=Decimal('25000.00'), start_date=month_starts[0], created_by=user,
+            ))
+            accounts.extend(
+                FinancialMainAccount(building=building, code=f'{index}', name=category.name, type='main',
+                                     expected_amount=Decimal('10000.00'), actual_amount=Decimal('9500.00'))
+                for index, category in enumerate(categories, start=1)
+            )
+
+        Expense.objects.bulk_create(expenses, batch_size=1000)
+        AnnualBudget.objects.bulk_create(budgets, batch_size=1000)
+        Collection.objects.bulk_create(collections, batch_size=1000)
+        FinancialMainAccount.objects.bulk_create(accounts, batch_size=1000)
+        for building in buildings:
+            snapshots.rebuild_building(building.id)
+            for tag in FINANCIAL_TAGS:
+                transaction.on_commit(lambda tag=tag, building_id=building.id: invalidate_tags(tag, building_id=building_id))
+        self.stdout.write(f'Created {len(expenses)} expenses, {len(budgets)} budgets, '
+                          f'{len(collections)} collections and {len(accounts)} accounts')
+
     def handle(self, *args, **options):
         self.stdout.write('Seeding building data...')
         
@@ -177,6 +238,9 @@ class Command(BaseCommand):
                     for floor in range(1, floors + 1):
                         for unit_num in range(1, min(units_per_floor + 1, units_per_tower - (floor - 1) * units_per_floor + 1)):
                             unit_number = f'{floor:02d}{unit_num:02d}'
+                            if building.number_of_towers > 1:
+                                # Numbers are unique per building
+                                unit_number = f'{tower_num}{unit_number}'
                             
                             # Determine unit type based on building type
                             if building.building_type == 'residential':
@@ -190,7 +254,8 @@ class Command(BaseCommand):
                             status = random.choices(['occupied', 'vacant'], weights=[7, 3])[0]
                             
                             unit = Unit.objects.create(
-                                block=tower,
+                                building=building,
+                                tower=tower,
                                 number=unit_number,
                                 floor=floor,
                                 area=random.uniform(50, 200),
@@ -226,6 +291,17 @@ class Command(BaseCommand):
             else:
                 self.stdout.write(f'Demo user already exists: {demo_user.email}')
             
+            # Let the demo user see its building, financial module included
+            if demo_user.building_id:
+                BuildingAccess.objects.get_or_create(
+                    user=demo_user,
+                    building_id=demo_user.building_id,
+                    defaults={'can_view_financial': True, 'can_view_reports': True}
+                )
+            
+            if options['financial_months'] > 0:
+                self.seed_financials(created_buildings, options['financial_months'], demo_user)
+            
             # Summary
             self.stdout.write(self.style.SUCCESS(f'\nSuccessfully seeded building data:'))
             self.stdout.write(f'- {len(created_buildings)} buildings created')
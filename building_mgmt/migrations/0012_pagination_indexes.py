@@ -0,0 +1,23 @@
+# Generated by Django 5.2.4 on 2026-10-18 20:53
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('building_mgmt', '0011_remove_has_deposit'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='building',
+            index=models.Index(fields=['created_at', 'id'], name='building_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='unit',
+            index=models.Index(fields=['building', 'number', 'id'], name='unit_building_number_idx'),
+        ),
+    ]
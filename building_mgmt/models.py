@@ -58,6 +58,11 @@ class Building(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='building_created_id_idx'),
+        ]
+    
     def __str__(self):
         return self.building_name
 
@@ -110,6 +115,9 @@ class Unit(models.Model):
     
     class Meta:
         unique_together = ('building', 'number')
+        indexes = [
+            models.Index(fields=['building', 'number', 'id'], name='unit_building_number_idx'),
+        ]
     
     def __str__(self):
         return f"{self.building.building_name} - Unit {self.number}"
\ No newline at end of file
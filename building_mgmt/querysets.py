@@ -0,0 +1,64 @@
+"""
+Query plans for the building read serializers.
+
+Each read serializer is paired with the select_related / prefetch_related /
+only() plan that loads everything it renders, so a list costs the same
+number of queries whether it holds 1 building or 1000:
+
+- BuildingReadSerializer: buildings + both addresses in one query, towers
+  with their unit distribution in a second one.
+- BuildingBasicSerializer: a single query.
+- UnitDetailSerializer: a single query (building name and tower joined).
+
+Use optimize_for(SerializerClass, queryset) wherever those serializers
+render more than one object.
+"""
+from django.db.models import Prefetch
+
+from .models import Building, Tower, Unit
+from .serializers import BuildingBasicSerializer, BuildingReadSerializer, UnitDetailSerializer
+
+TOWER_READ_FIELDS = (
+    'id', 'building_id', 'name', 'units_per_tower',
+    'unit_distribution__id', 'unit_distribution__commercial', 'unit_distribution__non_residential',
+    'unit_distribution__residential', 'unit_distribution__studio', 'unit_distribution__wave',
+)
+
+UNIT_DETAIL_FIELDS = (
+    'id', 'area', 'deposit_location', 'floor', 'ideal_fraction', 'identification',
+    'key_delivery', 'number', 'owner', 'owner_phone', 'parking_spaces', 'status',
+    'created_at', 'updated_at',
+    'building__id', 'building__building_name', 'tower__id', 'tower__name',
+)
+
+
+def building_read_queryset(queryset=None):
+    queryset = Building.objects.all() if queryset is None else queryset
+    towers = Tower.objects.select_related('unit_distribution').only(*TOWER_READ_FIELDS).order_by('id')
+    return queryset.select_related('address', 'alternative_address').prefetch_related(
+        Prefetch('towers', queryset=towers)
+    )
+
+
+def building_basic_queryset(queryset=None):
+    queryset = Building.objects.all() if queryset is None else queryset
+    return queryset.select_related('address', 'alternative_address').only(
+        'id', 'building_name', 'address', 'alternative_address'
+    )
+
+
+def unit_detail_queryset(queryset=None):
+    queryset = Unit.objects.all() if queryset is None else queryset
+    return queryset.select_related('building', 'tower').only(*UNIT_DETAIL_FIELDS)
+
+
+READ_PLANS = {
+    BuildingReadSerializer: building_read_queryset,
+    BuildingBasicSerializer: building_basic_queryset,
+    UnitDetailSerializer: unit_detail_queryset,
+}
+
+
+def optimize_for(serializer_class, queryset=None):
+    """Apply the query plan registered for `serializer_class` to `queryset`."""
+    return READ_PLANS[serializer_class](queryset)
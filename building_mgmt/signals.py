@@ -0,0 +1,36 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from sindipro_backend.caching import register_cache_dependency
+from users_mgmt.models import BuildingAccess
+from .access import invalidate_building_access
+from .directory import invalidate_directory
+from .models import Address, Building, Tower, TowerUnitDistribution, Unit
+
+# Cached building and unit lists (sindipro_backend.caching)
+register_cache_dependency(Building, 'building', building_field='id')
+register_cache_dependency(Address, 'building', building_field=None)
+register_cache_dependency(Tower, 'building')
+register_cache_dependency(TowerUnitDistribution, 'building', building_field=None)
+register_cache_dependency(Unit, 'unit')
+
+
+@receiver(post_save, sender=Building)
+@receiver(post_delete, sender=Building)
+def building_changed(sender, instance, **kwargs):
+    # Ownership grants full access to the creator
+    invalidate_building_access(instance.created_by_id)
+    invalidate_directory()
+
+
+@receiver(post_save, sender=Address)
+@receiver(post_delete, sender=Address)
+def address_changed(sender, instance, **kwargs):
+    # The directory lists each building's city
+    invalidate_directory()
+
+
+@receiver(post_save, sender=BuildingAccess)
+@receiver(post_delete, sender=BuildingAccess)
+def building_access_changed(sender, instance, **kwargs):
+    invalidate_building_access(instance.user_id)
@@ -0,0 +1,40 @@
+import os
+
+from django.core.files.storage import default_storage
+
+from jobs.queue import register_job, save_job_result_file, set_job_progress
+from .excel import build_units_export_file, import_units_file, units_export_filename
+from .models import Building
+
+
+@register_job('units_excel_export')
+def export_units_job(job):
+    building = Building.objects.select_related('address').get(id=job.payload['building_id'])
+
+    export_path = build_units_export_file(
+        building, progress_callback=lambda done, total: set_job_progress(job, done, total)
+    )
+    try:
+        filename = units_export_filename(building)
+        save_job_result_file(job, filename, export_path)
+    finally:
+        os.remove(export_path)
+
+    return {'filename': filename, 'building_id': building.id}
+
+
+@register_job('units_excel_import')
+def import_units_job(job):
+    building = Building.objects.get(id=job.payload['building_id'])
+    upload_name = job.payload['upload_name']
+
+    with default_storage.open(upload_name, 'rb') as excel_file:
+        response_data, status_code, _ = import_units_file(
+            building, excel_file, progress_callback=lambda done, total: set_job_progress(job, done, total)
+        )
+
+    default_storage.delete(upload_name)
+
+    # Validation problems are a finished import with a report, not a retryable failure
+    response_data['status_code'] = status_code
+    return response_data
@@ -0,0 +1,252 @@
+import os
+import tracemalloc
+from decimal import Decimal
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient, APIRequestFactory, force_authenticate
+
+from auth_system.models import User
+from sindipro_backend.instrumentation import assert_max_queries
+from .excel import IMPORT_BATCH_SIZE, UNIT_IMPORT_FIELDS, UnitImportRow, import_unit_records
+from .models import Address, Building, Tower, Unit
+from .views import export_units_excel
+
+
+def create_user(email, role='master'):
+    return User.objects.create_user(
+        email=email, username=email, password='test-password', role=role, first_name='Test', last_name='User'
+    )
+
+
+def create_building(user, name, cnpj, units=0):
+    address = Address.objects.create(
+        cep='01310-100', street='Avenida Paulista', number='1000', neighborhood='Bela Vista',
+        city='São Paulo', state='SP'
+    )
+    building = Building.objects.create(
+        building_name=name, building_type='residential', cnpj=cnpj, manager_name='Manager',
+        manager_phone='(11) 99999-0000', address=address, number_of_towers=1, created_by=user
+    )
+    tower = Tower.objects.create(building=building, name='Torre 1', units_per_tower=units)
+    Unit.objects.bulk_create([
+        Unit(
+            building=building, tower=tower, number=f'{index:05d}', floor=index % 30 + 1, area='75.50',
+            ideal_fraction='0.010000', identification='residential', key_delivery='yes',
+            owner=f'Owner {index}', owner_phone='(11) 98888-0000', parking_spaces=index % 3,
+            status='occupied' if index % 4 else 'vacant'
+        )
+        for index in range(units)
+    ], batch_size=1000)
+    return building
+
+
+class UnitsExcelExportTests(TestCase):
+    """The streamed export keeps memory and queries flat as the unit count grows."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('master@example.com')
+        cls.small = create_building(cls.user, 'Small', '00.000.000/0001-01', units=500)
+        cls.large = create_building(cls.user, 'Large', '00.000.000/0001-02', units=5000)
+
+    def export(self, building):
+        """(peak traced bytes, query count, body size) of one export request."""
+        client = APIClient()
+        client.force_authenticate(self.user)
+        tracemalloc.start()
+        try:
+            with CaptureQueriesContext(connection) as queries:
+                response = client.get(f'/api/buildings/{building.id}/units/export/excel/')
+                size = sum(len(block) for block in response.streaming_content)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        self.assertEqual(response.status_code, 200)
+        return peak, len(queries), size
+
+    # Memory is bounded by one iterator chunk: make both buildings span several
+    @mock.patch('building_mgmt.excel.EXPORT_CHUNK_SIZE', 250)
+    def test_memory_and_queries_stay_flat(self):
+        self.export(self.small)  # warm up imports and caches
+        small_peak, small_queries, small_size = self.export(self.small)
+        large_peak, large_queries, large_size = self.export(self.large)
+
+        self.assertGreater(large_size, small_size * 5)
+        self.assertEqual(large_queries, small_queries)
+        # 10x the rows must not mean 10x the memory
+        self.assertLess(large_peak, small_peak * 2)
+
+    def test_export_file_removed_when_response_is_never_read(self):
+        request = APIRequestFactory().get(f'/api/buildings/{self.small.id}/units/export/excel/')
+        force_authenticate(request, user=self.user)
+        response = export_units_excel(request, id=self.small.id)
+        path = response.file_to_stream.name
+        self.assertTrue(os.path.exists(path))
+
+        response.close()
+        self.assertFalse(os.path.exists(path))
+
+
+def import_row(number, tower, floor=1):
+    return UnitImportRow(
+        row_num=0, number=number, tower=tower, floor=floor, area=Decimal('80.00'),
+        ideal_fraction=Decimal('0.500000'), identification='residential', deposit_location='',
+        key_delivery='Yes', owner='Imported Owner', owner_phone='(11) 97777-0000', parking_spaces=1,
+        status='occupied'
+    )
+
+
+class UnitsImportTests(TestCase):
+    def setUp(self):
+        self.user = create_user('manager@example.com')
+        self.building = create_building(self.user, 'Import', '00.000.000/0001-03', units=2)
+        self.tower = self.building.towers.get()
+        self.valid, self.invalid = self.building.units.order_by('number')
+
+    def test_bulk_import_query_count(self):
+        Unit.objects.bulk_create([
+            Unit(building=self.building, tower=self.tower, number=f'E{index:05d}', floor=1, area='70.00',
+                 ideal_fraction='0.010000', identification='residential', key_delivery='yes')
+            for index in range(1500)
+        ])
+        # Interleaved: each batch mixes new and existing units
+        records = [
+            import_row(f'{"E" if index % 2 else "N"}{index // 2:05d}', self.tower, floor=index % 20 + 1)
+            for index in range(3000)
+        ]
+
+        # Per batch: a savepoint pair, and the INSERT / UPDATE statements the backend
+        # needs for that many rows (one each on PostgreSQL, a few under SQLite's parameter limit)
+        def statements(fields, rows):
+            return -(-rows // connection.ops.bulk_batch_size(fields, [None] * rows)) if rows else 0
+
+        insert_fields = [field for field in Unit._meta.concrete_fields if not field.primary_key]
+        update_fields = ['pk', 'pk'] + [Unit._meta.get_field(name) for name in UNIT_IMPORT_FIELDS + ['updated_at']]
+        budget = 1  # existing units
+        for start in range(0, len(records), IMPORT_BATCH_SIZE):
+            rows = len(records[start:start + IMPORT_BATCH_SIZE])
+            budget += 2 + statements(insert_fields, rows // 2) + statements(update_fields, rows - rows // 2)
+
+        with assert_max_queries(budget) as metrics:
+            created, updated, errors = import_unit_records(self.building, records)
+
+        self.assertEqual((created, updated, errors), (1500, 1500, []))
+        self.assertLess(metrics.queries, len(records) / 50)
+        self.assertEqual(self.building.units.count(), 3002)
+        self.assertEqual(self.building.units.get(number='E00007').floor, 16)
+
+    def test_failed_batch_falls_back_to_row_writes(self):
+        # bulk_create succeeds (and sets pks), then bulk_update fails and the batch rolls back
+        records = [
+            import_row('NEW-1', self.tower),
+            import_row(self.valid.number, self.tower, floor=7),
+            import_row(self.invalid.number, self.tower, floor=-1),  # violates the positive floor check
+        ]
+
+        created, updated, errors = import_unit_records(self.building, records)
+
+        self.assertEqual((created, updated), (1, 1))
+        self.assertEqual(len(errors), 1)
+        self.assertIn(self.invalid.number, errors[0])
+        self.assertTrue(self.building.units.filter(number='NEW-1').exists())
+        self.valid.refresh_from_db()
+        self.assertEqual(self.valid.floor, 7)
+
+
+class BuildingListQueryTests(TestCase):
+    """The list endpoints run a constant number of queries whatever the number of buildings."""
+
+    # path -> query budget (the views' @query_budget)
+    ENDPOINTS = {
+        '/api/buildings/': 4,
+        '/api/buildings/all/': 2,
+        '/api/buildings/units/': 3,
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('owner@example.com', role='manager')
+
+    def add_buildings(self, total):
+        for index in range(Building.objects.count(), total):
+            create_building(self.user, f'Building {index}', f'{index:014d}', units=2)
+
+    def count_queries(self, path):
+        cache.clear()  # measure the view, not a cached response
+        client = APIClient()
+        client.force_authenticate(self.user)
+        with assert_max_queries(self.ENDPOINTS[path]) as metrics:
+            response = client.get(path)
+        self.assertEqual(response.status_code, 200)
+        return metrics.queries, len(response.json())
+
+    def test_query_count_is_constant(self):
+        baseline = {}
+        for total in (1, 10, 1000):
+            self.add_buildings(total)
+            for path in self.ENDPOINTS:
+                with self.subTest(buildings=total, path=path):
+                    queries, rows = self.count_queries(path)
+                    self.assertEqual(rows, total * 2 if path.endswith('units/') else total)
+                    self.assertEqual(queries, baseline.setdefault(path, queries))
+
+
+@override_settings(BUILDING_DIRECTORY_MAX_AGE=60, BUILDING_DIRECTORY_SHARED_MAX_AGE=300)
+class BuildingDirectoryTests(TestCase):
+    """The public directory is served from the cache with a strong ETag until a building changes."""
+
+    url = '/api/buildings/directory/'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('owner@example.com', role='manager')
+        cls.building = create_building(cls.user, 'Aurora', '00.000.000/0001-40')
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def test_cached_body_and_headers(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), [{'id': self.building.id, 'name': 'Aurora', 'city': 'São Paulo'}])
+        self.assertRegex(response['ETag'], r'^"[0-9a-f]{32}"$')
+        self.assertEqual(response['Cache-Control'],
+                         'public, max-age=60, s-maxage=300, stale-while-revalidate=300')
+
+        with self.assertNumQueries(0):
+            cached = self.client.get(self.url)
+        self.assertEqual((cached.content, cached['ETag']), (response.content, response['ETag']))
+
+    def test_if_none_match(self):
+        etag = self.client.get(self.url)['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+        self.assertEqual(response['ETag'], etag)
+        self.assertIn('s-maxage=300', response['Cache-Control'])
+
+        # If-None-Match uses the weak comparison
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=f'W/{etag}').status_code, 304)
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH='"stale"').status_code, 200)
+
+    def test_invalidated_on_building_save_and_delete(self):
+        etag = self.client.get(self.url)['ETag']
+
+        self.building.building_name = 'Boreal'
+        self.building.save()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row['name'] for row in response.json()], ['Boreal'])
+
+        self.building.address.city = 'Campinas'
+        self.building.address.save()
+        self.assertEqual([row['city'] for row in self.client.get(self.url).json()], ['Campinas'])
+
+        self.building.delete()
+        self.assertEqual(self.client.get(self.url).json(), [])
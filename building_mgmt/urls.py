@@ -1,9 +1,12 @@
+from django.conf import settings
 from django.urls import path
 from . import views
 
 urlpatterns = [
     path('', views.get_buildings, name='get_buildings'),
     path('all/', views.get_all_buildings, name='get_all_buildings'),
+    path('directory/', views.building_directory_async if settings.ASYNC_VIEWS else views.building_directory,
+         name='building_directory'),
     path('create/', views.create_building, name='create_building'),
     path('<int:id>/', views.update_building, name='update_building'),
     path('<int:id>/units/', views.create_unit, name='create_unit'),
@@ -0,0 +1,164 @@
+"""
+Consumption anomaly detection.
+
+Every (building, consumption type, period) series of ConsumptionReading is
+scanned once in date order, read in one query along the
+(building, consumption_type, period, reading_date) unique index. Each
+reading is compared with:
+
+- the rolling mean/standard deviation of the readings before it (last 12
+  monthly or 30 daily readings), kept as running sums so a series costs O(n):
+  |z| >= CONSUMPTION_ANOMALY_Z_THRESHOLD is a spike or a drop;
+- its seasonal baseline, the mean of the same calendar month in the
+  previous years (monthly) or of the same weekday in the previous weeks
+  (daily): a deviation of CONSUMPTION_ANOMALY_SEASONAL_THRESHOLD percent
+  or more is a seasonal anomaly. Spikes and drops are left out of the
+  seasonal baselines so a single outlier does not flag the same season later.
+
+A scan replaces the ConsumptionAnomaly rows of the buildings it covers.
+"""
+import itertools
+import math
+from collections import defaultdict, deque
+from decimal import Decimal
+from operator import itemgetter
+
+from django.conf import settings
+from django.db import transaction
+
+from .models import ConsumptionAnomaly, ConsumptionReading
+
+# Readings in the rolling window and past seasons kept per period
+WINDOWS = {'monthly': 12, 'daily': 30}
+SEASONS = {'monthly': 3, 'daily': 4}
+MIN_SEASONS = 2
+
+
+def season_of(period, date):
+    return date.month if period == 'monthly' else date.weekday()
+
+
+class RollingStats:
+    """Mean and population standard deviation of the last `size` values, in O(1) per value."""
+
+    def __init__(self, size):
+        self.values = deque()
+        self.size = size
+        self.total = 0.0
+        self.squares = 0.0
+
+    def __len__(self):
+        return len(self.values)
+
+    def push(self, value):
+        self.values.append(value)
+        self.total += value
+        self.squares += value * value
+        if len(self.values) > self.size:
+            old = self.values.popleft()
+            self.total -= old
+            self.squares -= old * old
+
+    def mean_std(self):
+        count = len(self.values)
+        mean = self.total / count
+        return mean, math.sqrt(max(self.squares / count - mean * mean, 0.0))
+
+
+def detect_series(period, readings):
+    """
+    Yield {'reading_id', 'reading_date', 'value', 'kind', 'expected', 'z_score',
+    'seasonal_baseline', 'seasonal_deviation'} for the anomalous readings of one
+    series; `readings` are (id, date, value) tuples in date order.
+    """
+    z_threshold = settings.CONSUMPTION_ANOMALY_Z_THRESHOLD
+    seasonal_threshold = settings.CONSUMPTION_ANOMALY_SEASONAL_THRESHOLD
+    min_history = settings.CONSUMPTION_ANOMALY_MIN_HISTORY
+
+    rolling = RollingStats(WINDOWS[period])
+    seasons = defaultdict(lambda: deque(maxlen=SEASONS[period]))
+    for reading_id, date, value in readings:
+        x = float(value)
+        kind = expected = z_score = baseline = deviation = None
+
+        if len(rolling) >= min_history:
+            expected, std = rolling.mean_std()
+            if std > 0:
+                z_score = (x - expected) / std
+                if abs(z_score) >= z_threshold:
+                    kind = 'spike' if z_score > 0 else 'drop'
+
+        history = seasons[season_of(period, date)]
+        if len(history) >= MIN_SEASONS:
+            baseline = sum(history) / len(history)
+            if baseline > 0:
+                deviation = (x - baseline) / baseline * 100
+                if kind is None and abs(deviation) >= seasonal_threshold:
+                    kind = 'seasonal'
+
+        if kind:
+            yield {
+                'reading_id': reading_id,
+                'reading_date': date,
+                'value': value,
+                'kind': kind,
+                'expected': expected,
+                'z_score': z_score,
+                'seasonal_baseline': baseline,
+                'seasonal_deviation': deviation,
+            }
+        rolling.push(x)
+        # A spike/drop would skew its season for years; the rolling window still absorbs level shifts
+        if kind not in ('spike', 'drop'):
+            history.append(x)
+
+
+def _decimal(value, limit):
+    """Round to cents, clamped into a DecimalField's range."""
+    if value is None:
+        return None
+    return Decimal(f'{max(min(value, limit), -limit):.2f}')
+
+
+def scan_buildings(building_ids=None):
+    """
+    Detect the anomalies of `building_ids` (every building when None) and
+    replace their stored ConsumptionAnomaly rows. Returns a summary dict.
+    """
+    readings = ConsumptionReading.objects.all()
+    if building_ids is not None:
+        readings = readings.filter(building_id__in=building_ids)
+    rows = readings.order_by('building_id', 'consumption_type_id', 'period', 'reading_date', 'id').values_list(
+        'id', 'building_id', 'consumption_type_id', 'period', 'reading_date', 'consumption_value'
+    )
+
+    anomalies = []
+    series_count = reading_count = 0
+    for (building_id, type_id, period), series in itertools.groupby(rows.iterator(chunk_size=5000),
+                                                                     key=itemgetter(1, 2, 3)):
+        series_count += 1
+        points = [(row[0], row[4], row[5]) for row in series]
+        reading_count += len(points)
+        for found in detect_series(period, points):
+            anomalies.append(ConsumptionAnomaly(
+                building_id=building_id,
+                reading_id=found['reading_id'],
+                consumption_type_id=type_id,
+                period=period,
+                reading_date=found['reading_date'],
+                value=found['value'],
+                kind=found['kind'],
+                expected=_decimal(found['expected'], 10 ** 10 - 1),
+                z_score=_decimal(found['z_score'], 10 ** 6 - 1),
+                seasonal_baseline=_decimal(found['seasonal_baseline'], 10 ** 10 - 1),
+                seasonal_deviation=_decimal(found['seasonal_deviation'], 10 ** 8 - 1),
+            ))
+
+    stale = ConsumptionAnomaly.objects.all()
+    if building_ids is not None:
+        stale = stale.filter(building_id__in=building_ids)
+    with transaction.atomic():
+        stale.delete()
+        ConsumptionAnomaly.objects.bulk_create(anomalies, batch_size=1000)
+
+    return {'series': series_count, 'readings': reading_count, 'anomalies': len(anomalies)}
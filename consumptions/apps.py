@@ -4,3 +4,13 @@ from django.apps import AppConfig
 class ConsumptionsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'consumptions'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+
+        # Cached consumption lists (sindipro_backend.caching)
+        from sindipro_backend.caching import register_cache_dependency
+        from .models import ConsumptionAccount, ConsumptionRegister
+
+        register_cache_dependency(ConsumptionRegister, 'consumption_register')
+        register_cache_dependency(ConsumptionAccount, 'consumption_account', building_field=None)
@@ -0,0 +1,134 @@
+"""
+Month-over-month deltas of monthly consumption readings.
+
+previous_month_consumption / percentage_change are recomputed set-wise: one
+query reads the readings of a range with LAG() over each building and
+consumption type, and only the rows whose values changed are written back
+with bulk_update. The previous reading counts when it falls in the previous
+calendar month; the percentage is left empty when that reading is zero or
+the change does not fit the column (|change| >= 1000%).
+
+A single save does not need the window query: pre_save reads the rest of the
+series around the reading (deltas_around) and computes the same LAG in Python
+with the new values in place, so the reading is written with its deltas and
+only the following readings that changed are updated (consumptions.signals).
+Existing rows are backfilled with `manage.py recompute_consumption_deltas`.
+"""
+import datetime
+from decimal import Decimal
+
+from dateutil.relativedelta import relativedelta
+from django.db.models import F, Window
+from django.db.models.functions import Lag
+
+from .models import ConsumptionReading
+
+PERCENT_PLACES = Decimal('0.01')
+PERCENT_LIMIT = Decimal('1000')
+CHUNK_SIZE = 2000
+
+
+def month_start(date):
+    return date.replace(day=1)
+
+
+def following_month_end(date):
+    """Last day of the month after `date`'s: the last reading whose delta depends on `date`."""
+    return month_start(date) + relativedelta(months=2) - datetime.timedelta(days=1)
+
+
+def month_over_month(value, previous_value, previous_date, date):
+    """(previous_month_consumption, percentage_change) of a reading."""
+    if previous_date is None or month_start(previous_date) != month_start(date) - relativedelta(months=1):
+        return None, None
+    if not previous_value:
+        return previous_value, None
+    change = ((value - previous_value) / previous_value * 100).quantize(PERCENT_PLACES)
+    return previous_value, change if abs(change) < PERCENT_LIMIT else None
+
+
+def recompute_reading_deltas(building_id=None, consumption_type_id=None, start=None, end=None):
+    """
+    Recompute the deltas of the monthly readings dated within [start, end]
+    (open-ended when omitted) of a building and/or consumption type.
+    Returns the number of rows updated.
+    """
+    readings = ConsumptionReading.objects.filter(period='monthly')
+    if building_id is not None:
+        readings = readings.filter(building_id=building_id)
+    if consumption_type_id is not None:
+        readings = readings.filter(consumption_type_id=consumption_type_id)
+    if start is not None:
+        # The first readings of the range need their predecessor in the window
+        readings = readings.filter(reading_date__gte=month_start(start) - relativedelta(months=1))
+    if end is not None:
+        readings = readings.filter(reading_date__lte=end)
+
+    def lag(field):
+        return Window(Lag(field), partition_by=[F('building_id'), F('consumption_type_id')],
+                      order_by=F('reading_date').asc())
+
+    rows = readings.annotate(
+        previous_value=lag('consumption_value'), previous_date=lag('reading_date')
+    ).values_list(
+        'id', 'reading_date', 'consumption_value', 'previous_month_consumption', 'percentage_change',
+        'previous_value', 'previous_date',
+    ).order_by()
+
+    changed = []
+    for reading_id, date, value, stored_previous, stored_change, previous_value, previous_date in rows.iterator(
+            chunk_size=CHUNK_SIZE):
+        if start is not None and date < start:
+            continue
+        previous, change = month_over_month(value, previous_value, previous_date, date)
+        if (previous, change) != (stored_previous, stored_change):
+            changed.append(ConsumptionReading(id=reading_id, previous_month_consumption=previous,
+                                              percentage_change=change))
+    if changed:
+        ConsumptionReading.objects.bulk_update(
+            changed, ['previous_month_consumption', 'percentage_change'], batch_size=CHUNK_SIZE
+        )
+    return len(changed)
+
+
+def deltas_around(reading):
+    """
+    Set the deltas of a monthly `reading` about to be saved from the rest of its
+    series between the previous month and the following one (one query), and
+    return [(id, previous_month_consumption, percentage_change)] of the later
+    readings whose deltas change once it is saved.
+    """
+    fields = ConsumptionReading._meta
+    date = fields.get_field('reading_date').to_python(reading.reading_date)
+    value = fields.get_field('consumption_value').to_python(reading.consumption_value)
+    others = ConsumptionReading.objects.filter(
+        building_id=reading.building_id, consumption_type_id=reading.consumption_type_id, period='monthly',
+        reading_date__gte=month_start(date) - relativedelta(months=1), reading_date__lte=following_month_end(date),
+    )
+    if reading.pk is not None:
+        others = others.exclude(pk=reading.pk)
+    rows = list(others.values_list(
+        'id', 'reading_date', 'consumption_value', 'previous_month_consumption', 'percentage_change'
+    ))
+    rows.append((None, date, value, None, None))
+    rows.sort(key=lambda row: row[1])
+
+    changed = []
+    previous_value = previous_date = None
+    for reading_id, row_date, row_value, stored_previous, stored_change in rows:
+        # Rows before the first one have their predecessor outside the window, but don't depend on `reading`
+        deltas = month_over_month(row_value, previous_value, previous_date, row_date)
+        if reading_id is None:
+            reading.previous_month_consumption, reading.percentage_change = deltas
+        elif row_date > date and deltas != (stored_previous, stored_change):
+            changed.append((reading_id, *deltas))
+        previous_value, previous_date = row_value, row_date
+    return changed
+
+
+def write_deltas(changed):
+    """Write [(id, previous_month_consumption, percentage_change)] as returned by deltas_around()."""
+    for reading_id, previous, change in changed:
+        ConsumptionReading.objects.filter(pk=reading_id).update(
+            previous_month_consumption=previous, percentage_change=change
+        )
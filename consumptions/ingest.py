@@ -0,0 +1,107 @@
+"""
+Bulk ingest of consumption registers.
+
+A batch (a JSON list, or the rows of a CSV upload) is validated as a whole
+with ConsumptionRegisterSerializer plus one query for the referenced
+buildings, and written with bulk_create in one transaction; nothing is
+stored unless every item is valid. bulk_create skips model signals, so the
+rollups are refreshed and the cache tags invalidated here.
+"""
+import codecs
+import csv
+import itertools
+
+from django.conf import settings
+from django.db import transaction
+
+from building_mgmt.access import building_access
+from building_mgmt.models import Building
+from sindipro_backend.caching import invalidate_tags
+from .models import ConsumptionRegister
+from .rollups import refresh_after_insert
+from .serializers import ConsumptionRegisterSerializer
+
+
+class IngestError(Exception):
+    """The batch was rejected; `details` lists {'index', 'errors'} per failing item."""
+
+    def __init__(self, message, details=None):
+        super().__init__(message)
+        self.message = message
+        self.details = details or []
+
+
+def read_csv_items(upload, encoding='utf-8-sig'):
+    """
+    Items of a CSV upload (header row with the JSON field names: date,
+    utilityType or utility_type, value, gasCategory, buildingId...).
+    Empty cells are left out so optional fields keep their defaults.
+    """
+    limit = settings.CONSUMPTION_BULK_MAX_ITEMS
+    items = []
+    try:
+        lines = codecs.iterdecode(upload, encoding)
+        first = next(lines, '')
+        try:
+            dialect = csv.Sniffer().sniff(first, delimiters=',;\t')
+        except csv.Error:
+            dialect = csv.excel
+        rows = csv.reader(itertools.chain([first], lines), dialect)
+        header = [name.strip() for name in next(rows, [])]
+        for row in rows:
+            if not any(cell.strip() for cell in row):
+                continue
+            if len(items) == limit:
+                raise IngestError(f'At most {limit} items per request')
+            items.append({name: cell.strip() for name, cell in zip(header, row) if name and cell.strip()})
+    except (LookupError, UnicodeDecodeError, csv.Error) as e:
+        raise IngestError(f'Error reading CSV file: {e}')
+    return items
+
+
+def validate_items(request, items):
+    """Validate every item; returns [(index, serializer)] or raises IngestError."""
+    if not isinstance(items, list) or not items:
+        raise IngestError('Expected a non-empty list of items')
+    if len(items) > settings.CONSUMPTION_BULK_MAX_ITEMS:
+        raise IngestError(f'At most {settings.CONSUMPTION_BULK_MAX_ITEMS} items per request')
+
+    valid, errors = [], []
+    for index, item in enumerate(items):
+        if not isinstance(item, dict):
+            errors.append({'index': index, 'errors': {'non_field_errors': ['Expected an object']}})
+            continue
+        serializer = ConsumptionRegisterSerializer(data=item)
+        if serializer.is_valid():
+            valid.append((index, serializer))
+        else:
+            errors.append({'index': index, 'errors': serializer.errors})
+
+    access = building_access(request)
+    building_ids = {serializer.validated_data.get('building_id') for _, serializer in valid} - {None}
+    existing = set(Building.objects.filter(id__in=building_ids).values_list('id', flat=True)) if building_ids else set()
+    for index, serializer in valid:
+        building_id = serializer.validated_data.get('building_id')
+        if building_id is not None and (building_id not in existing or not access.can_access(building_id, edit=True)):
+            errors.append({'index': index, 'errors': {'buildingId': ['Building not found or access denied']}})
+    if errors:
+        errors.sort(key=lambda error: error['index'])
+        raise IngestError('Invalid data', errors)
+    return valid
+
+
+def ingest_registers(request, items):
+    """Validate and insert a batch of registers; returns the created rows in input order."""
+    valid = validate_items(request, items)
+    registers = [ConsumptionRegister(**serializer.validated_data) for _, serializer in valid]
+
+    with transaction.atomic():
+        created = ConsumptionRegister.objects.bulk_create(registers, batch_size=settings.CONSUMPTION_BULK_BATCH_SIZE)
+        refresh_after_insert(created)
+        building_ids = {register.building_id for register in created}
+
+        def invalidate():
+            for building_id in building_ids:
+                invalidate_tags('consumption_register', building_id=building_id)
+        transaction.on_commit(invalidate)
+    return created
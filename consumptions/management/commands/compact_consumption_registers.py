@@ -0,0 +1,36 @@
+import datetime
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from consumptions.rollups import compact_registers
+
+
+class Command(BaseCommand):
+    help = (
+        'Retention policy for consumption registers: fold the raw registers older than '
+        'CONSUMPTION_RAW_RETENTION_DAYS into the archived totals of their daily rollups and '
+        'delete them. Series keep their values; only the individual registers are gone.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=settings.CONSUMPTION_RAW_RETENTION_DAYS,
+                            help='Keep raw registers of the last N days (default: %(default)s)')
+        parser.add_argument('--building', type=int, action='append', dest='buildings',
+                            help='Only compact this building id (repeatable); defaults to all')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Only count what would be compacted')
+
+    def handle(self, *args, **options):
+        if options['days'] < 1:
+            raise CommandError('--days must be at least 1')
+        before = datetime.date.today() - datetime.timedelta(days=options['days'])
+
+        self.stdout.write(f'Compacting consumption registers dated before {before}...')
+
+        summary = compact_registers(before, options['buildings'], dry_run=options['dry_run'])
+
+        verb = 'Would compact' if options['dry_run'] else 'Compacted'
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {summary['registers']} register(s) into {summary['days']} daily rollup(s)"
+        ))
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from consumptions.anomalies import scan_buildings
+
+
+class Command(BaseCommand):
+    help = (
+        'Scan consumption readings for anomalies (rolling z-scores and seasonal baselines) '
+        'and replace the stored ConsumptionAnomaly rows. Meant to run nightly.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--building', type=int, action='append', dest='buildings',
+                            help='Only scan this building id (repeatable); defaults to all')
+
+    def handle(self, *args, **options):
+        summary = scan_buildings(options['buildings'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Done: {summary['anomalies']} anomaly(ies) in {summary['readings']} reading(s) "
+            f"across {summary['series']} series"
+        ))
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from consumptions.rollups import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = (
+        'Recompute the consumption register rollups (day, month and year cells) from the raw '
+        'registers and the archived totals. Run it after bulk loads that did not call '
+        'consumptions.rollups.refresh_after_insert().'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--building', type=int, action='append', dest='buildings',
+                            help='Only rebuild this building id (repeatable); defaults to all, '
+                                 'including registers not tied to a building')
+
+    def handle(self, *args, **options):
+        buildings = options['buildings']
+        scope = f'{len(buildings)} building(s)' if buildings else 'all buildings'
+        self.stdout.write(f'Rebuilding consumption rollups for {scope}...')
+
+        written = rebuild_rollups(buildings, include_unassigned=not buildings)
+
+        self.stdout.write(self.style.SUCCESS(f'Done: {written} rollup cell(s) written'))
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from building_mgmt.models import Building
+from consumptions.deltas import recompute_reading_deltas
+
+
+class Command(BaseCommand):
+    help = (
+        'Recompute previous_month_consumption and percentage_change of monthly consumption '
+        'readings, one building at a time. Run it once to backfill existing rows and after '
+        'bulk loads that skip model signals.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--building', type=int, action='append', dest='buildings',
+                            help='Only recompute this building id (repeatable); defaults to all')
+
+    def handle(self, *args, **options):
+        buildings = options['buildings'] or list(Building.objects.order_by('id').values_list('id', flat=True))
+
+        self.stdout.write(f'Recomputing consumption deltas for {len(buildings)} building(s)...')
+
+        updated = 0
+        for building_id in buildings:
+            count = recompute_reading_deltas(building_id)
+            updated += count
+            if options['verbosity'] > 1:
+                self.stdout.write(f'Building #{building_id}: {count} reading(s) updated')
+
+        self.stdout.write(self.style.SUCCESS(f'Done: {updated} reading(s) updated'))
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.4 on 2026-10-18 20:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('consumptions', '0002_consumptionaccount_consumptionregister'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='consumptionaccount',
+            index=models.Index(fields=['month', 'id'], name='consumption_account_month_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='consumptionregister',
+            index=models.Index(fields=['date', 'id'], name='consumption_register_date_idx'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.4 on 2026-10-18 21:24
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('building_mgmt', '0012_pagination_indexes'),
+        ('consumptions', '0003_consumptionaccount_consumption_account_month_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='consumptionregister',
+            name='building',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='consumption_registers', to='building_mgmt.building'),
+        ),
+        migrations.AddIndex(
+            model_name='consumptionregister',
+            index=models.Index(fields=['utility_type', 'date'], name='consumption_register_util_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='consumptionregister',
+            index=models.Index(fields=['building', 'utility_type', 'date'], name='consumption_register_bldg_idx'),
+        ),
+    ]
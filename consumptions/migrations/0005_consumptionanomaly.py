@@ -0,0 +1,38 @@
+# Generated by Django 5.2.4 on 2026-10-18 21:27
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('building_mgmt', '0012_pagination_indexes'),
+        ('consumptions', '0004_register_series'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ConsumptionAnomaly',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(choices=[('daily', 'Daily'), ('monthly', 'Monthly')], max_length=10)),
+                ('reading_date', models.DateField()),
+                ('value', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('kind', models.CharField(choices=[('spike', 'Spike'), ('drop', 'Drop'), ('seasonal', 'Seasonal Deviation')], max_length=20)),
+                ('expected', models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True)),
+                ('z_score', models.DecimalField(blank=True, decimal_places=2, max_digits=8, null=True)),
+                ('seasonal_baseline', models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True)),
+                ('seasonal_deviation', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('detected_at', models.DateTimeField(auto_now_add=True)),
+                ('building', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='consumption_anomalies', to='building_mgmt.building')),
+                ('consumption_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='consumptions.consumptiontype')),
+                ('reading', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='anomaly', to='consumptions.consumptionreading')),
+            ],
+            options={
+                'db_table': 'consumptions_consumption_anomaly',
+                'ordering': ['-reading_date'],
+                'indexes': [models.Index(fields=['building', 'reading_date', 'id'], name='consumption_anomaly_bldg_idx')],
+            },
+        ),
+    ]
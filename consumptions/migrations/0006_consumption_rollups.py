@@ -0,0 +1,75 @@
+# Generated by Django 5.2.4 on 2026-10-18 21:30
+
+import datetime
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def fill_month_start(apps, schema_editor):
+    ConsumptionAccount = apps.get_model('consumptions', 'ConsumptionAccount')
+    for month in ConsumptionAccount.objects.values_list('month', flat=True).distinct():
+        try:
+            month_start = datetime.datetime.strptime(month, '%Y-%m').date()
+        except ValueError:
+            continue
+        ConsumptionAccount.objects.filter(month=month).update(month_start=month_start)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('building_mgmt', '0012_pagination_indexes'),
+        ('consumptions', '0005_consumptionanomaly'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ConsumptionRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('utility_type', models.CharField(choices=[('water', 'Water'), ('electricity', 'Electricity'), ('gas', 'Gas')], max_length=20)),
+                ('granularity', models.CharField(choices=[('day', 'Day'), ('month', 'Month'), ('year', 'Year')], max_length=5)),
+                ('period_start', models.DateField()),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('minimum', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('maximum', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('archived_total', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('archived_count', models.PositiveIntegerField(default=0)),
+                ('archived_minimum', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('archived_maximum', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'consumptions_consumption_rollup',
+            },
+        ),
+        migrations.AddField(
+            model_name='consumptionaccount',
+            name='month_start',
+            field=models.DateField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='consumptionaccount',
+            index=models.Index(fields=['utility_type', 'month_start'], name='consumption_account_util_idx'),
+        ),
+        migrations.RunPython(fill_month_start, migrations.RunPython.noop),
+        migrations.AddField(
+            model_name='consumptionrollup',
+            name='building',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='consumption_rollups', to='building_mgmt.building'),
+        ),
+        migrations.AddIndex(
+            model_name='consumptionrollup',
+            index=models.Index(fields=['granularity', 'utility_type', 'period_start'], name='consumption_rollup_period_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='consumptionrollup',
+            constraint=models.UniqueConstraint(fields=('building', 'utility_type', 'granularity', 'period_start'), name='consumption_rollup_uniq'),
+        ),
+        migrations.AddConstraint(
+            model_name='consumptionrollup',
+            constraint=models.UniqueConstraint(condition=models.Q(('building__isnull', True)), fields=('utility_type', 'granularity', 'period_start'), name='consumption_rollup_unassigned_uniq'),
+        ),
+    ]
@@ -0,0 +1,70 @@
+from django.db import migrations
+from django.db.models import Count, Max, Min, Sum
+
+STAT_FIELDS = ('total', 'count', 'minimum', 'maximum')
+
+
+def _merge(stats, total, count, minimum, maximum):
+    if not count:
+        return stats
+    if stats is None:
+        return [total, count, minimum, maximum]
+    return [stats[0] + total, stats[1] + count, min(stats[2], minimum), max(stats[3], maximum)]
+
+
+def backfill_rollups(apps, schema_editor):
+    # ConsumptionRollup is only maintained on writes: derive it for the existing registers
+    # (same rules as consumptions.rollups.rebuild_rollups, frozen here)
+    ConsumptionRegister = apps.get_model('consumptions', 'ConsumptionRegister')
+    ConsumptionRollup = apps.get_model('consumptions', 'ConsumptionRollup')
+
+    # Day cells holding compacted registers keep their archived totals; the rest is derived again
+    archived = {
+        (cell.building_id, cell.utility_type, cell.period_start): cell
+        for cell in ConsumptionRollup.objects.filter(granularity='day', archived_count__gt=0)
+    }
+    ConsumptionRollup.objects.filter(archived_count=0).delete()
+
+    days = {
+        key: _merge(None, *(getattr(cell, f'archived_{field}') for field in STAT_FIELDS))
+        for key, cell in archived.items()
+    }
+    rows = ConsumptionRegister.objects.values('building_id', 'utility_type', 'date').annotate(
+        total=Sum('value'), count=Count('id'), minimum=Min('value'), maximum=Max('value')
+    ).order_by()
+    for row in rows.iterator():
+        key = (row['building_id'], row['utility_type'], row['date'])
+        days[key] = _merge(days.get(key), *(row[field] for field in STAT_FIELDS))
+
+    cells = {}
+    for (building_id, utility_type, date), stats in days.items():
+        cells[(building_id, utility_type, 'day', date)] = stats
+        for granularity, period_start in (('month', date.replace(day=1)), ('year', date.replace(month=1, day=1))):
+            key = (building_id, utility_type, granularity, period_start)
+            cells[key] = _merge(cells.get(key), *stats)
+
+    created, updated = [], []
+    for (building_id, utility_type, granularity, period_start), stats in cells.items():
+        cell = archived.get((building_id, utility_type, period_start)) if granularity == 'day' else None
+        if cell is None:
+            created.append(ConsumptionRollup(
+                building_id=building_id, utility_type=utility_type, granularity=granularity,
+                period_start=period_start, **dict(zip(STAT_FIELDS, stats)),
+            ))
+        else:
+            for field, value in zip(STAT_FIELDS, stats):
+                setattr(cell, field, value)
+            updated.append(cell)
+    ConsumptionRollup.objects.bulk_create(created, batch_size=1000)
+    ConsumptionRollup.objects.bulk_update(updated, STAT_FIELDS, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('consumptions', '0006_consumption_rollups'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
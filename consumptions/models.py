@@ -1,3 +1,5 @@
+import datetime
+
 from django.db import models
 from django.contrib.auth import get_user_model
 from building_mgmt.models import Building
@@ -32,7 +34,7 @@ class ConsumptionReading(models.Model):
     cost = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
     notes = models.TextField(blank=True)
     
-    # Auto-calculated fields
+    # Month-over-month deltas of monthly readings, maintained by consumptions.deltas
     previous_month_consumption = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
     percentage_change = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True)
     
@@ -46,29 +48,17 @@ class ConsumptionReading(models.Model):
     
     def __str__(self):
         return f"{self.building.name} - {self.consumption_type.name} - {self.reading_date}"
-    
-    def save(self, *args, **kwargs):
-        # Calculate percentage change from previous month
-        if self.period == 'monthly':
-            from datetime import timedelta
-            from dateutil.relativedelta import relativedelta
-            
-            previous_month = self.reading_date - relativedelta(months=1)
-            previous_reading = ConsumptionReading.objects.filter(
-                building=self.building,
-                consumption_type=self.consumption_type,
-                period='monthly',
-                reading_date__year=previous_month.year,
-                reading_date__month=previous_month.month
-            ).first()
-            
-            if previous_reading:
-                self.previous_month_consumption = previous_reading.consumption_value
-                if previous_reading.consumption_value > 0:
-                    change = ((self.consumption_value - previous_reading.consumption_value) / previous_reading.consumption_value) * 100
-                    self.percentage_change = round(change, 2)
-        
-        super().save(*args, **kwargs)
+
+    # What a reading's deltas depend on (consumptions.signals)
+    DELTA_FIELDS = ('building_id', 'consumption_type_id', 'period', 'reading_date', 'consumption_value')
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the loaded values so a save knows what changed without reading the row again
+        if not instance.get_deferred_fields() & set(cls.DELTA_FIELDS):
+            instance._loaded_delta_values = tuple(getattr(instance, field) for field in cls.DELTA_FIELDS)
+        return instance
 
 
 class ConsumptionRegister(models.Model):
@@ -85,6 +75,8 @@ class ConsumptionRegister(models.Model):
         ('m3', 'Cubic Meters'),
     ]
     
+    building = models.ForeignKey(Building, on_delete=models.CASCADE, related_name='consumption_registers',
+                                 null=True, blank=True)
     date = models.DateField()
     utility_type = models.CharField(max_length=20, choices=UTILITY_TYPE_CHOICES)
     gas_category = models.CharField(max_length=20, choices=CATEGORY_CHOICES, null=True, blank=True)
@@ -95,6 +87,12 @@ class ConsumptionRegister(models.Model):
     class Meta:
         db_table = 'consumptions_consumption_register'
         ordering = ['-date']
+        indexes = [
+            models.Index(fields=['date', 'id'], name='consumption_register_date_idx'),
+            # Time-series range scans (consumptions.series)
+            models.Index(fields=['utility_type', 'date'], name='consumption_register_util_idx'),
+            models.Index(fields=['building', 'utility_type', 'date'], name='consumption_register_bldg_idx'),
+        ]
     
     def __str__(self):
         return f"{self.utility_type} - {self.value} - {self.date}"
@@ -108,6 +106,8 @@ class ConsumptionAccount(models.Model):
     ]
     
     month = models.CharField(max_length=7)  # Format: YYYY-MM
+    # First day of `month`, kept in sync on save so months can be range-filtered and indexed
+    month_start = models.DateField(null=True, blank=True, editable=False)
     utility_type = models.CharField(max_length=20, choices=UTILITY_TYPE_CHOICES)
     amount = models.DecimalField(max_digits=10, decimal_places=2)
     payment_date = models.DateField()
@@ -117,6 +117,109 @@ class ConsumptionAccount(models.Model):
     class Meta:
         db_table = 'consumptions_consumption_account'
         ordering = ['-month']
+        indexes = [
+            models.Index(fields=['month', 'id'], name='consumption_account_month_idx'),
+            models.Index(fields=['utility_type', 'month_start'], name='consumption_account_util_idx'),
+        ]
     
     def __str__(self):
-        return f"{self.utility_type} - {self.amount} - {self.month}"
\ No newline at end of file
+        return f"{self.utility_type} - {self.amount} - {self.month}"
+
+    @staticmethod
+    def parse_month(month):
+        """First day of a 'YYYY-MM' month, or None if it isn't one."""
+        try:
+            return datetime.datetime.strptime(month, '%Y-%m').date()
+        except (TypeError, ValueError):
+            return None
+
+    def save(self, *args, **kwargs):
+        self.month_start = self.parse_month(self.month)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'month' in update_fields:
+            kwargs['update_fields'] = set(update_fields) | {'month_start'}
+        super().save(*args, **kwargs)
+
+
+class ConsumptionAnomaly(models.Model):
+    """
+    A monthly or daily reading flagged by consumptions.anomalies: far from the
+    rolling mean of the preceding readings (z-score) or from the same season
+    of previous years/weeks. Rebuilt per building by each scan.
+    """
+    KIND_CHOICES = [
+        ('spike', 'Spike'),
+        ('drop', 'Drop'),
+        ('seasonal', 'Seasonal Deviation'),
+    ]
+
+    building = models.ForeignKey(Building, on_delete=models.CASCADE, related_name='consumption_anomalies')
+    reading = models.OneToOneField(ConsumptionReading, on_delete=models.CASCADE, related_name='anomaly')
+    consumption_type = models.ForeignKey(ConsumptionType, on_delete=models.CASCADE)
+    period = models.CharField(max_length=10, choices=ConsumptionReading.PERIOD_CHOICES)
+    reading_date = models.DateField()
+    value = models.DecimalField(max_digits=10, decimal_places=2)
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    expected = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)  # Rolling mean
+    z_score = models.DecimalField(max_digits=8, decimal_places=2, null=True, blank=True)
+    seasonal_baseline = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
+    seasonal_deviation = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)  # Percent
+    detected_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'consumptions_consumption_anomaly'
+        ordering = ['-reading_date']
+        indexes = [
+            models.Index(fields=['building', 'reading_date', 'id'], name='consumption_anomaly_bldg_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.building_id} - {self.consumption_type_id} - {self.reading_date} - {self.kind}"
+
+
+class ConsumptionRollup(models.Model):
+    """
+    Consumption register totals per building (or unassigned), utility and
+    day, month or year, maintained by consumptions.rollups on every write.
+    Day rows also hold the `archived_*` totals of raw registers removed by
+    `manage.py compact_consumption_registers`; they are folded back in
+    whenever the day is recomputed.
+    """
+    GRANULARITY_CHOICES = [
+        ('day', 'Day'),
+        ('month', 'Month'),
+        ('year', 'Year'),
+    ]
+
+    building = models.ForeignKey(Building, on_delete=models.CASCADE, related_name='consumption_rollups',
+                                 null=True, blank=True)
+    utility_type = models.CharField(max_length=20, choices=ConsumptionRegister.UTILITY_TYPE_CHOICES)
+    granularity = models.CharField(max_length=5, choices=GRANULARITY_CHOICES)
+    period_start = models.DateField()
+    total = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    count = models.PositiveIntegerField(default=0)
+    minimum = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    maximum = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    archived_total = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    archived_count = models.PositiveIntegerField(default=0)
+    archived_minimum = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    archived_maximum = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'consumptions_consumption_rollup'
+        constraints = [
+            models.UniqueConstraint(fields=['building', 'utility_type', 'granularity', 'period_start'],
+                                    name='consumption_rollup_uniq'),
+            # NULLs are distinct in the constraint above
+            models.UniqueConstraint(fields=['utility_type', 'granularity', 'period_start'],
+                                    condition=models.Q(building__isnull=True),
+                                    name='consumption_rollup_unassigned_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['granularity', 'utility_type', 'period_start'], name='consumption_rollup_period_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.building_id} - {self.utility_type} - {self.granularity} {self.period_start}"
@@ -0,0 +1,148 @@
+"""
+Consumption vs billing reconciliation.
+
+Usage (the monthly ConsumptionRollup cells, which include compacted
+registers) and billing (ConsumptionAccount, keyed by its month_start date)
+are stacked with UNION ALL and grouped per utility and month in a single
+query, so no month of either side is lost to an inner join. The monthly
+rows then get their unit cost (billed / usage), month-over-month changes and
+the runs of months with usage but no bill.
+"""
+from decimal import Decimal
+
+from dateutil.relativedelta import relativedelta
+from django.db import connection
+from django.db.models import F, Value
+
+from .deltas import month_over_month
+from .models import ConsumptionAccount
+
+ZERO = Decimal('0.00')
+MONEY_PLACES = Decimal('0.01')
+UNIT_COST_PLACES = Decimal('0.0001')
+
+RECONCILIATION_SQL = """
+SELECT utility_type, period, SUM(usage), SUM(readings), SUM(billed), SUM(bills)
+FROM ({usage} UNION ALL {billing}) combined
+GROUP BY utility_type, period
+ORDER BY utility_type, period
+"""
+
+
+def _filtered(queryset, utility_field, month_field, utilities, start, end):
+    if utilities:
+        queryset = queryset.filter(**{f'{utility_field}__in': utilities})
+    if start:
+        queryset = queryset.filter(**{f'{month_field}__gte': start})
+    if end:
+        queryset = queryset.filter(**{f'{month_field}__lte': end})
+    return queryset.order_by()
+
+
+def _decimal(value, places=MONEY_PLACES):
+    # Raw SQL returns driver values (SQLite sums as floats or ints)
+    return Decimal(str(value)).quantize(places) if value is not None else None
+
+
+def _text(value):
+    return str(value) if value is not None else None
+
+
+def reconciliation_rows(rollups, utilities=None, start=None, end=None):
+    """
+    [(utility_type, month, usage, readings, billed, bills)] per utility and
+    month in [start, end] (first days of months), from the monthly cells of
+    `rollups` and every consumption account; one query.
+    """
+    usage = _filtered(rollups.filter(granularity='month'), 'utility_type', 'period_start', utilities, start, end)
+    usage = usage.values(
+        'utility_type', period=F('period_start'), usage=F('total'), readings=F('count'),
+        billed=Value(0), bills=Value(0),
+    )
+    billing = _filtered(ConsumptionAccount.objects.filter(month_start__isnull=False),
+                        'utility_type', 'month_start', utilities, start, end)
+    billing = billing.values(
+        'utility_type', period=F('month_start'), usage=Value(0), readings=Value(0),
+        billed=F('amount'), bills=Value(1),
+    )
+
+    usage_sql, usage_params = usage.query.sql_with_params()
+    billing_sql, billing_params = billing.query.sql_with_params()
+    month_field = ConsumptionAccount._meta.get_field('month_start')
+    with connection.cursor() as cursor:
+        cursor.execute(RECONCILIATION_SQL.format(usage=usage_sql, billing=billing_sql),
+                       (*usage_params, *billing_params))
+        return [
+            (utility, month_field.to_python(month), _decimal(usage_total), readings, _decimal(billed), bills)
+            for utility, month, usage_total, readings, billed, bills in cursor.fetchall()
+        ]
+
+
+def _gaps(missing):
+    """Runs of consecutive months in `missing` (sorted month dates)."""
+    gaps = []
+    for month in missing:
+        if gaps and gaps[-1][1] + relativedelta(months=1) == month:
+            gaps[-1][1] = month
+            gaps[-1][2] += 1
+        else:
+            gaps.append([month, month, 1])
+    return [{'start': first.strftime('%Y-%m'), 'end': last.strftime('%Y-%m'), 'months': count}
+            for first, last, count in gaps]
+
+
+def _change(value, previous, field, month):
+    """Percent change of `field` vs the previous calendar month's, when both are known."""
+    if value is None or previous is None or previous[field] is None:
+        return None
+    return month_over_month(value, previous[field], previous['month'], month)[1]
+
+
+def reconcile(rollups, utilities=None, start=None, end=None):
+    """
+    [{'utility', 'months': [...], 'totals': {...}, 'gaps': [...]}] with, per
+    month: usage, readings, billed, bills, unit_cost, usage_change and
+    unit_cost_change (percent vs the previous calendar month), missing_bill.
+    """
+    results = {}
+    for utility, month, usage, readings, billed, bills in reconciliation_rows(rollups, utilities, start, end):
+        result = results.setdefault(utility, {'months': [], 'missing': [], 'usage': ZERO, 'billed': ZERO,
+                                              'matched_usage': ZERO, 'matched_billed': ZERO, 'previous': None})
+        usage = usage if readings else None
+        unit_cost = (billed / usage).quantize(UNIT_COST_PLACES) if bills and usage else None
+        usage_change = _change(usage, result['previous'], 'usage', month)
+        cost_change = _change(unit_cost, result['previous'], 'unit_cost', month)
+        result['previous'] = {'month': month, 'usage': usage, 'unit_cost': unit_cost}
+
+        result['usage'] += usage or ZERO
+        result['billed'] += billed
+        if unit_cost is not None:
+            result['matched_usage'] += usage
+            result['matched_billed'] += billed
+        if readings and not bills:
+            result['missing'].append(month)
+        result['months'].append({
+            'month': month.strftime('%Y-%m'),
+            'usage': _text(usage),
+            'readings': readings,
+            'billed': _text(billed) if bills else None,
+            'bills': bills,
+            'unit_cost': _text(unit_cost),
+            'usage_change': _text(usage_change),
+            'unit_cost_change': _text(cost_change),
+            'missing_bill': bool(readings) and not bills,
+        })
+
+    return [{
+        'utility': utility,
+        'months': result['months'],
+        'totals': {
+            'usage': str(result['usage']),
+            'billed': str(result['billed']),
+            # Over the months with both usage and a bill
+            'unit_cost': _text((result['matched_billed'] / result['matched_usage']).quantize(UNIT_COST_PLACES)
+                               if result['matched_usage'] else None),
+            'missing_bills': len(result['missing']),
+        },
+        'gaps': _gaps(result['missing']),
+    } for utility, result in results.items()]
@@ -0,0 +1,239 @@
+"""
+Consumption register rollups.
+
+ConsumptionRollup keeps per building (or unassigned registers), utility and
+day / month / year the total, count, min and max of ConsumptionRegister
+values. Cells are recomputed from their source rows, never adjusted by
+deltas: refresh_rollups() aggregates the raw registers of whole months in one
+grouped query, derives the month cells from the day cells and the year cells
+from the month cells, and writes back only the cells that changed. The
+building row is locked while doing so, so concurrent writers of a building
+serialize instead of overwriting each other's cells.
+
+Single saves and deletes are handled by consumptions.signals, bulk ingest by
+consumptions.ingest; migration 0007 backfilled the registers that existed
+before and `manage.py rebuild_consumption_rollups` recomputes everything. Raw registers older than CONSUMPTION_RAW_RETENTION_DAYS are
+folded into the `archived_*` columns of their day cells and deleted by
+compact_registers() (`manage.py compact_consumption_registers`).
+"""
+import datetime
+
+from dateutil.relativedelta import relativedelta
+from django.db import transaction
+from django.db.models import Count, Max, Min, Q, Sum
+from django.utils import timezone
+
+from building_mgmt.models import Building
+from sindipro_backend.caching import invalidate_tags
+from .models import ConsumptionRegister, ConsumptionRollup
+
+STAT_FIELDS = ('total', 'count', 'minimum', 'maximum')
+ARCHIVED_FIELDS = ('archived_total', 'archived_count', 'archived_minimum', 'archived_maximum')
+EMPTY = (0, 0, None, None)
+
+
+def _combine(stats):
+    """Merge (total, count, minimum, maximum) tuples."""
+    total = count = 0
+    minimum = maximum = None
+    for cell_total, cell_count, cell_minimum, cell_maximum in stats:
+        if not cell_count:
+            continue
+        total += cell_total
+        count += cell_count
+        minimum = cell_minimum if minimum is None else min(minimum, cell_minimum)
+        maximum = cell_maximum if maximum is None else max(maximum, cell_maximum)
+    return total, count, minimum, maximum
+
+
+def _registers(building_id, utility_type):
+    registers = ConsumptionRegister.objects.filter(utility_type=utility_type)
+    if building_id is None:
+        return registers.filter(building__isnull=True)
+    return registers.filter(building_id=building_id)
+
+
+def _rollups(building_id, utility_type):
+    rollups = ConsumptionRollup.objects.filter(utility_type=utility_type)
+    if building_id is None:
+        return rollups.filter(building__isnull=True)
+    return rollups.filter(building_id=building_id)
+
+
+def _daily_raw(registers):
+    """{date: (total, count, minimum, maximum)} of raw registers, one grouped query."""
+    rows = registers.values('date').annotate(
+        total=Sum('value'), count=Count('id'), minimum=Min('value'), maximum=Max('value')
+    ).order_by()
+    return {row['date']: tuple(row[field] for field in STAT_FIELDS) for row in rows}
+
+
+def _lock_building(building_id):
+    if building_id is not None:
+        list(Building.objects.select_for_update().filter(id=building_id).values_list('id'))
+
+
+def refresh_rollups(building_id, utility_type, start, end):
+    """
+    Recompute the rollups of one building (None: unassigned registers) and
+    utility for the months spanning [start, end], plus the years they fall in.
+    Returns the number of cells created, updated or deleted.
+    """
+    start = start.replace(day=1)
+    end = end.replace(day=1) + relativedelta(months=1) - datetime.timedelta(days=1)
+    year_start, year_end = start.replace(month=1), end.replace(month=12, day=31)
+
+    with transaction.atomic():
+        _lock_building(building_id)
+        raw = _daily_raw(_registers(building_id, utility_type).filter(date__gte=start, date__lte=end))
+        cells = {
+            (cell.granularity, cell.period_start): cell
+            for cell in _rollups(building_id, utility_type).filter(
+                Q(granularity='day', period_start__gte=start, period_start__lte=end)
+                | Q(granularity__in=('month', 'year'), period_start__gte=year_start, period_start__lte=year_end)
+            ).select_for_update()
+        }
+
+        wanted = {}
+        days = {date for date in raw} | {period for granularity, period in cells if granularity == 'day'}
+        for date in days:
+            cell = cells.get(('day', date))
+            archived = tuple(getattr(cell, field) for field in ARCHIVED_FIELDS) if cell else EMPTY
+            wanted[('day', date)] = _combine([archived, raw.get(date, EMPTY)])
+
+        months = {}
+        for (_, date), stats in wanted.items():
+            months.setdefault(date.replace(day=1), []).append(stats)
+        month = start
+        while month <= end:
+            wanted[('month', month)] = _combine(months.get(month, []))
+            month += relativedelta(months=1)
+
+        years = {}
+        for (granularity, period), cell in cells.items():
+            if granularity == 'month' and not start <= period <= end:
+                years.setdefault(period.replace(month=1), []).append(
+                    tuple(getattr(cell, field) for field in STAT_FIELDS))
+        for (granularity, period), stats in wanted.items():
+            if granularity == 'month':
+                years.setdefault(period.replace(month=1), []).append(stats)
+        for year, stats in years.items():
+            wanted[('year', year)] = _combine(stats)
+
+        return _sync(building_id, utility_type, cells, wanted)
+
+
+def _sync(building_id, utility_type, cells, wanted):
+    created, updated, deleted = [], [], []
+    for key, stats in wanted.items():
+        cell = cells.get(key)
+        if not stats[1]:
+            # Day cells with archived totals never end up here: the archive counts
+            if cell is not None:
+                deleted.append(cell.id)
+            continue
+        if cell is None:
+            granularity, period_start = key
+            created.append(ConsumptionRollup(
+                building_id=building_id, utility_type=utility_type, granularity=granularity,
+                period_start=period_start, **dict(zip(STAT_FIELDS, stats)),
+            ))
+        elif tuple(getattr(cell, field) for field in STAT_FIELDS) != stats:
+            for field, value in zip(STAT_FIELDS, stats):
+                setattr(cell, field, value)
+            cell.updated_at = timezone.now()
+            updated.append(cell)
+
+    if deleted:
+        ConsumptionRollup.objects.filter(id__in=deleted).delete()
+    if created:
+        ConsumptionRollup.objects.bulk_create(created, batch_size=1000)
+    if updated:
+        ConsumptionRollup.objects.bulk_update(updated, STAT_FIELDS + ('updated_at',), batch_size=1000)
+    return len(created) + len(updated) + len(deleted)
+
+
+def refresh_after_insert(registers):
+    """Refresh what bulk-created `registers` affect: one call per building and utility."""
+    ranges = {}
+    for register in registers:
+        key = (register.building_id, register.utility_type)
+        first, last = ranges.get(key, (register.date, register.date))
+        ranges[key] = (min(first, register.date), max(last, register.date))
+    return sum(
+        refresh_rollups(building_id, utility_type, first, last)
+        for (building_id, utility_type), (first, last) in ranges.items()
+    )
+
+
+def rebuild_rollups(building_ids=None, include_unassigned=True):
+    """
+    Recompute every rollup cell of `building_ids` (all buildings when None)
+    from the raw registers and the archived totals. Returns the cells written.
+    """
+    series = ConsumptionRegister.objects.all()
+    archived = ConsumptionRollup.objects.filter(granularity='day', archived_count__gt=0)
+    stale = ConsumptionRollup.objects.all()
+    if building_ids is not None:
+        scope = Q(building_id__in=building_ids)
+        if include_unassigned:
+            scope |= Q(building__isnull=True)
+        series, archived, stale = series.filter(scope), archived.filter(scope), stale.filter(scope)
+
+    ranges = {}
+    for queryset, date_field in ((series, 'date'), (archived, 'period_start')):
+        rows = queryset.values('building_id', 'utility_type').annotate(
+            first=Min(date_field), last=Max(date_field)).order_by()
+        for row in rows:
+            key = (row['building_id'], row['utility_type'])
+            first, last = ranges.get(key, (row['first'], row['last']))
+            ranges[key] = (min(first, row['first']), max(last, row['last']))
+
+    written = 0
+    with transaction.atomic():
+        # Everything but the archived day cells is derived again from scratch
+        stale.filter(archived_count=0).delete()
+        for (building_id, utility_type), (first, last) in ranges.items():
+            written += refresh_rollups(building_id, utility_type, first, last)
+    return written
+
+
+def compact_registers(before, building_ids=None, dry_run=False):
+    """
+    Fold the raw registers dated before `before` into the archived totals of
+    their day cells and delete them, one building and utility at a time. The
+    rollups stay unchanged; only per-register detail is lost.
+    Returns {'registers': compacted rows, 'days': day cells touched}.
+    """
+    old = ConsumptionRegister.objects.filter(date__lt=before)
+    if building_ids is not None:
+        old = old.filter(building_id__in=building_ids)
+    series = list(old.values_list('building_id', 'utility_type').distinct().order_by('building_id', 'utility_type'))
+
+    summary = {'registers': 0, 'days': 0}
+    for building_id, utility_type in series:
+        with transaction.atomic():
+            _lock_building(building_id)
+            registers = _registers(building_id, utility_type).filter(date__lt=before)
+            raw = _daily_raw(registers)
+            summary['registers'] += sum(stats[1] for stats in raw.values())
+            summary['days'] += len(raw)
+            if dry_run or not raw:
+                continue
+
+            # Make sure the day cells hold the raw totals being archived
+            refresh_rollups(building_id, utility_type, min(raw), max(raw))
+            cells = list(_rollups(building_id, utility_type).filter(
+                granularity='day', period_start__in=list(raw)).select_for_update())
+            for cell in cells:
+                archived = tuple(getattr(cell, field) for field in ARCHIVED_FIELDS)
+                for field, value in zip(ARCHIVED_FIELDS, _combine([archived, raw[cell.period_start]])):
+                    setattr(cell, field, value)
+                cell.updated_at = timezone.now()
+            ConsumptionRollup.objects.bulk_update(cells, ARCHIVED_FIELDS + ('updated_at',), batch_size=1000)
+            # Skips the per-row delete signals: the rollups already account for these rows
+            registers._raw_delete(registers.db)
+
+            transaction.on_commit(lambda building_id=building_id: invalidate_tags(
+                'consumption_register', building_id=building_id))
+    return summary
@@ -1,11 +1,14 @@
 from rest_framework import serializers
-from .models import ConsumptionRegister, ConsumptionAccount
+from .models import ConsumptionAnomaly, ConsumptionRegister, ConsumptionAccount
 
 
 class ConsumptionRegisterSerializer(serializers.ModelSerializer):
+    # Plain id: existence and access are checked by the caller (one query per batch)
+    building_id = serializers.IntegerField(required=False, allow_null=True)
+
     class Meta:
         model = ConsumptionRegister
-        fields = ['id', 'date', 'utility_type', 'gas_category', 'value', 'created_at', 'updated_at']
+        fields = ['id', 'building_id', 'date', 'utility_type', 'gas_category', 'value', 'created_at', 'updated_at']
         read_only_fields = ['id', 'created_at', 'updated_at']
     
     def to_internal_value(self, data):
@@ -17,6 +20,9 @@ class ConsumptionRegisterSerializer(serializers.ModelSerializer):
         
         if 'utilityType' in data:
             internal_data['utility_type'] = data['utilityType']
+
+        if 'buildingId' in data:
+            internal_data['building_id'] = data['buildingId']
             
         return super().to_internal_value(internal_data)
 
@@ -37,4 +43,14 @@ class ConsumptionAccountSerializer(serializers.ModelSerializer):
         if 'paymentDate' in data:
             internal_data['payment_date'] = data['paymentDate']
             
-        return super().to_internal_value(internal_data)
\ No newline at end of file
+        return super().to_internal_value(internal_data)
+
+
+class ConsumptionAnomalySerializer(serializers.ModelSerializer):
+    utility = serializers.CharField(source='consumption_type.name', read_only=True)
+
+    class Meta:
+        model = ConsumptionAnomaly
+        fields = ['id', 'building_id', 'reading_id', 'utility', 'period', 'reading_date', 'value', 'kind',
+                  'expected', 'z_score', 'seasonal_baseline', 'seasonal_deviation', 'detected_at']
+        read_only_fields = fields
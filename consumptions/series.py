@@ -0,0 +1,154 @@
+"""
+Consumption time series.
+
+ConsumptionRegister rows are bucketed per utility by day, week, month or
+year and aggregated in one grouped query (sum/avg/min/max/count computed by
+the database); range filters hit the (utility_type, date) and
+(building, utility_type, date) indexes, so the cost follows the size of the
+requested range rather than the whole history.
+
+Long or open-ended ranges, and ranges reaching past the raw retention
+horizon, are answered from the ConsumptionRollup cells instead
+(consumptions.rollups): the coarsest granularity aligned with the range is
+read and regrouped into the requested buckets, so a ten-year monthly series
+reads 120 month cells per utility instead of every register.
+"""
+import datetime
+from decimal import Decimal
+
+from django.conf import settings
+from django.db.models import Avg, Count, F, Max, Min, Q, Sum
+from django.db.models.functions import TruncMonth, TruncWeek, TruncYear
+
+from .models import ConsumptionRegister, ConsumptionRollup
+
+# Bucket -> expression of the bucket's first day, given the date field
+BUCKETS = {
+    'day': lambda field: F(field),
+    'week': lambda field: TruncWeek(field),
+    'month': lambda field: TruncMonth(field),
+    'year': lambda field: TruncYear(field),
+}
+
+# Rollup granularities that can answer a bucket, coarsest first
+ROLLUP_GRANULARITIES = {
+    'day': ('day',),
+    'week': ('day',),
+    'month': ('month', 'day'),
+    'year': ('year', 'month', 'day'),
+}
+
+UTILITY_TYPES = [choice for choice, _ in ConsumptionRegister.UTILITY_TYPE_CHOICES]
+
+VALUE_PLACES = Decimal('0.01')
+
+
+def _decimal(value):
+    # Avg comes back as a float on some backends
+    return str(Decimal(str(value)).quantize(VALUE_PLACES)) if value is not None else None
+
+
+def _scoped(queryset, access, building_id):
+    if building_id is not None:
+        return queryset.filter(building_id=building_id)
+    ids = access.building_ids()
+    if ids is None:
+        return queryset
+    return queryset.filter(Q(building__isnull=True) | Q(building_id__in=ids))
+
+
+def scoped_registers(access, building_id=None):
+    """
+    Registers visible through a building access resolver: one building's, or
+    every accessible building's plus the entries not tied to any building.
+    """
+    return _scoped(ConsumptionRegister.objects.all(), access, building_id)
+
+
+def scoped_rollups(access, building_id=None):
+    """Rollup cells visible through a building access resolver, scoped like scoped_registers()."""
+    return _scoped(ConsumptionRollup.objects.all(), access, building_id)
+
+
+def use_rollups(start=None, end=None):
+    """
+    Whether a range is answered from the rollups: open-ended, longer than
+    CONSUMPTION_ROLLUP_MIN_DAYS, or starting before the raw retention horizon.
+    """
+    if start is None:
+        return True
+    today = datetime.date.today()
+    horizon = today - datetime.timedelta(days=settings.CONSUMPTION_RAW_RETENTION_DAYS)
+    return start < horizon or ((end or today) - start).days > settings.CONSUMPTION_ROLLUP_MIN_DAYS
+
+
+def _period_start(granularity, date):
+    return date.replace(day=1) if granularity == 'month' else date.replace(month=1, day=1)
+
+
+def _aligned(granularity, start, end):
+    """Whether [start, end] covers whole cells of `granularity`."""
+    if granularity == 'day':
+        return True
+    if start is not None and start != _period_start(granularity, start):
+        return False
+    following = end + datetime.timedelta(days=1) if end is not None else None
+    return following is None or following == _period_start(granularity, following)
+
+
+def _series(rows):
+    series = {}
+    for row in rows:
+        series.setdefault(row['utility_type'], []).append({
+            'start': row['period'],
+            'sum': _decimal(row['total']),
+            'avg': _decimal(row['average']),
+            'min': _decimal(row['minimum']),
+            'max': _decimal(row['maximum']),
+            'count': row['count'],
+        })
+    return [{'utility': utility, 'buckets': buckets} for utility, buckets in series.items()]
+
+
+def consumption_series(registers, bucket='month', utilities=None, start=None, end=None):
+    """
+    [{'utility', 'buckets': [{'start', 'sum', 'avg', 'min', 'max', 'count'}]}]
+    for `registers` between `start` and `end` (inclusive dates), one entry per utility.
+    """
+    if utilities:
+        registers = registers.filter(utility_type__in=utilities)
+    if start:
+        registers = registers.filter(date__gte=start)
+    if end:
+        registers = registers.filter(date__lte=end)
+
+    rows = (
+        registers.annotate(period=BUCKETS[bucket]('date'))
+        .values('utility_type', 'period')
+        .annotate(total=Sum('value'), average=Avg('value'), minimum=Min('value'),
+                  maximum=Max('value'), count=Count('id'))
+        .order_by('utility_type', 'period')
+    )
+    return _series(rows)
+
+
+def rollup_series(rollups, bucket='month', utilities=None, start=None, end=None):
+    """consumption_series() computed from rollup cells, archived registers included."""
+    granularity = next(g for g in ROLLUP_GRANULARITIES[bucket] if _aligned(g, start, end))
+    rollups = rollups.filter(granularity=granularity)
+    if utilities:
+        rollups = rollups.filter(utility_type__in=utilities)
+    if start:
+        rollups = rollups.filter(period_start__gte=start)
+    if end:
+        rollups = rollups.filter(period_start__lte=end)
+
+    rows = list(
+        rollups.annotate(period=BUCKETS[bucket]('period_start'))
+        .values('utility_type', 'period')
+        .annotate(total=Sum('total'), minimum=Min('minimum'), maximum=Max('maximum'), count=Sum('count'))
+        .order_by('utility_type', 'period')
+    )
+    for row in rows:
+        row['average'] = row['total'] / row['count']
+    return _series(rows)
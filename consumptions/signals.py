@@ -0,0 +1,94 @@
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .deltas import deltas_around, following_month_end, recompute_reading_deltas, write_deltas
+from .models import ConsumptionReading, ConsumptionRegister
+from .rollups import refresh_rollups
+
+
+def _cascaded(sender, origin):
+    """Whether a delete cascades from another model (a Building or ConsumptionType): no series is left."""
+    if origin is None:
+        return False
+    origin_model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    return origin_model is not sender
+
+
+def _delta_values(reading):
+    """The reading's DELTA_FIELDS, typed as loaded from the database."""
+    return tuple(
+        ConsumptionReading._meta.get_field(field).to_python(getattr(reading, field))
+        for field in ConsumptionReading.DELTA_FIELDS
+    )
+
+
+def _recompute_following(building_id, consumption_type_id, period, reading_date, consumption_value=None):
+    """Recompute the readings whose deltas depended on a monthly reading that moved away or was deleted."""
+    if period == 'monthly':
+        recompute_reading_deltas(building_id, consumption_type_id, start=reading_date,
+                                 end=following_month_end(reading_date))
+
+
+@receiver(pre_save, sender=ConsumptionReading)
+def compute_reading_deltas(sender, instance, update_fields=None, **kwargs):
+    instance._delta_updates, instance._moved_from = [], None
+    loaded = None
+    if not instance._state.adding and instance.pk is not None:
+        loaded = getattr(instance, '_loaded_delta_values', None)
+        if loaded is None:
+            # Not loaded by the ORM (or with deferred fields): read what the row was
+            loaded = sender.objects.filter(pk=instance.pk).values_list(*sender.DELTA_FIELDS).first()
+    current = _delta_values(instance)
+    if loaded == current or 'monthly' not in (current[2], loaded and loaded[2]):
+        return  # Daily readings and saves that change none of the delta inputs cost no query
+    if loaded and loaded[:4] != current[:4]:
+        instance._moved_from = loaded
+    if instance.period == 'monthly':
+        instance._delta_updates = deltas_around(instance)
+        if update_fields is not None and 'percentage_change' not in update_fields:
+            instance._delta_updates.append(
+                (instance.pk, instance.previous_month_consumption, instance.percentage_change)
+            )
+
+
+@receiver(post_save, sender=ConsumptionReading)
+def write_reading_deltas(sender, instance, **kwargs):
+    write_deltas(instance._delta_updates)
+    if instance._moved_from:
+        _recompute_following(*instance._moved_from)
+    instance._loaded_delta_values = _delta_values(instance)
+
+
+@receiver(post_delete, sender=ConsumptionReading)
+def recompute_deleted_reading_deltas(sender, instance, origin=None, **kwargs):
+    if not _cascaded(sender, origin):
+        _recompute_following(*getattr(instance, '_loaded_delta_values', None) or _delta_values(instance))
+
+
+def _refresh_rollups(instance):
+    cells = {(instance.building_id, instance.utility_type, instance.date)}
+    previous = getattr(instance, '_previous_rollup_cell', None)
+    if previous:
+        cells.add(previous)
+    for building_id, utility_type, date in cells:
+        refresh_rollups(building_id, utility_type, date, date)
+
+
+@receiver(pre_save, sender=ConsumptionRegister)
+def remember_register_cell(sender, instance, **kwargs):
+    previous = None
+    if not instance._state.adding and instance.pk is not None:
+        previous = sender.objects.filter(pk=instance.pk).values_list('building_id', 'utility_type', 'date').first()
+    instance._previous_rollup_cell = previous
+
+
+@receiver(post_save, sender=ConsumptionRegister)
+def refresh_saved_register_rollups(sender, instance, **kwargs):
+    _refresh_rollups(instance)
+
+
+@receiver(post_delete, sender=ConsumptionRegister)
+def refresh_deleted_register_rollups(sender, instance, origin=None, **kwargs):
+    if not _cascaded(sender, origin):
+        _refresh_rollups(instance)
@@ -0,0 +1,7 @@
+from jobs.queue import register_job
+from .anomalies import scan_buildings
+
+
+@register_job('consumption_anomaly_scan')
+def scan_anomalies_job(job):
+    return scan_buildings(job.payload.get('building_ids'))
@@ -0,0 +1,431 @@
+import datetime
+import importlib
+from decimal import Decimal
+
+from dateutil.relativedelta import relativedelta
+from django.apps import apps
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from building_mgmt.tests import create_building, create_user
+from .anomalies import detect_series, scan_buildings
+from .deltas import recompute_reading_deltas
+from .ingest import IngestError, read_csv_items
+from .reconciliation import reconcile
+from .models import (ConsumptionAccount, ConsumptionAnomaly, ConsumptionReading, ConsumptionRegister,
+                     ConsumptionRollup, ConsumptionType)
+from .rollups import compact_registers
+from .series import consumption_series, rollup_series
+
+backfill = importlib.import_module('consumptions.migrations.0007_backfill_consumption_rollups')
+
+ROLLUP_FIELDS = ('building_id', 'utility_type', 'granularity', 'period_start', 'total', 'count', 'minimum',
+                 'maximum', 'archived_total', 'archived_count', 'archived_minimum', 'archived_maximum')
+
+
+class RollupBackfillTests(TestCase):
+    def test_backfill_matches_the_maintained_rollups(self):
+        building = create_building(create_user('master@example.com'), 'Rollups', '00.000.000/0001-30')
+        with self.captureOnCommitCallbacks(execute=True):
+            for building_id in (building.id, None):
+                for day, value in ((1, '10.00'), (1, '4.50'), (20, '7.00'), (45, '3.25'), (400, '8.00')):
+                    ConsumptionRegister.objects.create(
+                        building_id=building_id, utility_type='water', value=Decimal(value),
+                        date=datetime.date(2024, 1, 1) + datetime.timedelta(days=day),
+                    )
+            # Archive the oldest registers, then add one more on an archived day
+            compact_registers(datetime.date(2024, 1, 15))
+            ConsumptionRegister.objects.create(building=building, utility_type='water', value=Decimal('1.00'),
+                                               date=datetime.date(2024, 1, 2))
+        expected = list(ConsumptionRollup.objects.values_list(*ROLLUP_FIELDS))
+        self.assertTrue(ConsumptionRollup.objects.filter(archived_count__gt=0).exists())
+
+        # Rollups as migration 0006 left them (plus archived day cells from a compaction)
+        ConsumptionRollup.objects.filter(archived_count=0).delete()
+        ConsumptionRollup.objects.update(total=0, count=0, minimum=None, maximum=None)
+        backfill.backfill_rollups(apps, None)
+        self.assertCountEqual(ConsumptionRollup.objects.values_list(*ROLLUP_FIELDS), expected)
+
+
+def per_row_deltas(readings):
+    """{id: (previous, change)} as the former ConsumptionReading.save computed them, one query per row."""
+    result = {}
+    for reading in readings:
+        month = reading.reading_date - relativedelta(months=1)
+        previous = ConsumptionReading.objects.filter(
+            building_id=reading.building_id, consumption_type_id=reading.consumption_type_id, period='monthly',
+            reading_date__year=month.year, reading_date__month=month.month
+        ).first()
+        if previous is None:
+            result[reading.id] = (None, None)
+        elif previous.consumption_value > 0:
+            change = (reading.consumption_value - previous.consumption_value) / previous.consumption_value * 100
+            result[reading.id] = (previous.consumption_value, round(change, 2))
+        else:
+            result[reading.id] = (previous.consumption_value, None)
+    return result
+
+
+class ReadingDeltaTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('master@example.com')
+        cls.building = create_building(cls.user, 'Deltas', '00.000.000/0001-31')
+        cls.water = ConsumptionType.objects.create(name='water', unit='m3')
+
+    def reading(self, date, value, period='monthly'):
+        return ConsumptionReading.objects.create(
+            building=self.building, consumption_type=self.water, period=period, reading_date=date,
+            consumption_value=Decimal(value)
+        )
+
+    def deltas(self):
+        return {
+            reading_id: (previous, change)
+            for reading_id, previous, change in ConsumptionReading.objects.filter(period='monthly').values_list(
+                'id', 'previous_month_consumption', 'percentage_change')
+        }
+
+    def delta_of(self, date):
+        return ConsumptionReading.objects.filter(reading_date=date, period='monthly').values_list(
+            'previous_month_consumption', 'percentage_change').get()
+
+    def test_deltas_match_the_per_row_computation(self):
+        # Out of order, with a gap (no May) and a zero month
+        values = {1: '100.00', 3: '80.00', 2: '120.00', 4: '0.00', 6: '55.50', 7: '61.25', 9: '40.00', 8: '40.00'}
+        for month, value in values.items():
+            self.reading(datetime.date(2025, month, 10), value)
+        expected = per_row_deltas(ConsumptionReading.objects.all())
+        self.assertEqual(self.deltas(), expected)
+
+        # The set-wise backfill agrees, and finds nothing to change
+        ConsumptionReading.objects.update(previous_month_consumption=None, percentage_change=None)
+        recompute_reading_deltas(self.building.id)
+        self.assertEqual(self.deltas(), expected)
+        self.assertEqual(recompute_reading_deltas(self.building.id), 0)
+
+    def test_saved_instance_carries_its_deltas(self):
+        self.reading(datetime.date(2025, 1, 10), '100.00')
+        reading = self.reading(datetime.date(2025, 2, 10), '150.00')
+        self.assertEqual((reading.previous_month_consumption, reading.percentage_change),
+                         (Decimal('100.00'), Decimal('50.00')))
+
+    def test_edit_move_and_delete_fix_the_next_month(self):
+        january = self.reading(datetime.date(2025, 1, 10), '100.00')
+        self.reading(datetime.date(2025, 2, 10), '150.00')
+
+        january.consumption_value = Decimal('200.00')
+        january.save()
+        self.assertEqual(self.delta_of(datetime.date(2025, 2, 10)), (Decimal('200.00'), Decimal('-25.00')))
+
+        january.reading_date = datetime.date(2024, 12, 10)
+        january.save()
+        self.assertEqual(self.delta_of(datetime.date(2025, 2, 10)), (None, None))
+
+        january.reading_date = datetime.date(2025, 1, 5)
+        january.save()
+        self.assertEqual(self.delta_of(datetime.date(2025, 2, 10)), (Decimal('200.00'), Decimal('-25.00')))
+
+        january.delete()
+        self.assertEqual(self.delta_of(datetime.date(2025, 2, 10)), (None, None))
+
+    def test_change_outside_the_column_leaves_percentage_empty(self):
+        self.reading(datetime.date(2025, 1, 10), '1.00')
+        reading = self.reading(datetime.date(2025, 2, 10), '50.00')
+        self.assertEqual(self.delta_of(reading.reading_date), (Decimal('1.00'), None))
+        self.assertIsNone(reading.percentage_change)
+
+    def test_single_saves_run_a_fixed_number_of_queries(self):
+        self.reading(datetime.date(2025, 1, 10), '100.00')
+        self.reading(datetime.date(2025, 3, 10), '100.00')
+        # Series window read, INSERT, UPDATE of March
+        with self.assertNumQueries(3):
+            february = self.reading(datetime.date(2025, 2, 10), '80.00')
+        # Series window read, UPDATE, UPDATE of March; the loaded values tell the row did not move
+        february.consumption_value = Decimal('90.00')
+        with self.assertNumQueries(3):
+            february.save()
+        # Nothing the deltas depend on changed
+        february.notes = 'Checked'
+        with self.assertNumQueries(1):
+            february.save()
+        with self.assertNumQueries(1):
+            self.reading(datetime.date(2025, 2, 10), '3.00', period='daily')
+
+
+class RegisterIngestTests(TestCase):
+    url = '/api/consumption/register/bulk/'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager = create_user('manager@example.com', role='manager')
+        cls.building = create_building(cls.manager, 'Mine', '00.000.000/0001-32')
+        cls.other = create_building(create_user('other@example.com', role='manager'), 'Other', '00.000.000/0001-33')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.manager)
+
+    def item(self, **fields):
+        return {'date': '2025-03-01', 'utilityType': 'water', 'value': '10.50', 'buildingId': self.building.id,
+                **fields}
+
+    def test_batch_is_all_or_nothing_with_errors_per_index(self):
+        items = [
+            self.item(),
+            self.item(value='not a number'),
+            self.item(buildingId=self.other.id),
+            'not an object',
+            self.item(buildingId=None, utilityType='gas', gasCategory='m3'),
+        ]
+        response = self.client.post(self.url, items, format='json')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['error'], 'Invalid data')
+        details = response.json()['details']
+        self.assertEqual([error['index'] for error in details], [1, 2, 3])
+        self.assertIn('value', details[0]['errors'])
+        self.assertEqual(details[1]['errors'], {'buildingId': ['Building not found or access denied']})
+        self.assertFalse(ConsumptionRegister.objects.exists())
+
+        response = self.client.post(self.url, [items[0], items[4]], format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['created'], 2)
+        # bulk_create skips signals: the rollups are refreshed by the ingest
+        self.assertEqual(ConsumptionRollup.objects.get(building=self.building, granularity='month').total,
+                         Decimal('10.50'))
+
+    def test_csv_dialect_and_header(self):
+        for delimiter in (',', ';', '\t'):
+            with self.subTest(delimiter=delimiter):
+                rows = [['date', ' utilityType', 'value', 'gasCategory', 'buildingId'],
+                        ['2025-03-01', 'water', '1.25', '', str(self.building.id)],
+                        ['', '', '', '', ''],
+                        ['2025-03-02', 'gas', '2.00', 'm3', '']]
+                content = '\n'.join(delimiter.join(row) for row in rows).encode('utf-8-sig')
+                items = read_csv_items(SimpleUploadedFile('registers.csv', content))
+                self.assertEqual(items, [
+                    {'date': '2025-03-01', 'utilityType': 'water', 'value': '1.25', 'buildingId': str(self.building.id)},
+                    {'date': '2025-03-02', 'utilityType': 'gas', 'value': '2.00', 'gasCategory': 'm3'},
+                ])
+
+        upload = SimpleUploadedFile('registers.csv', content)
+        response = self.client.post(self.url, {'file': upload}, format='multipart')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(ConsumptionRegister.objects.count(), 2)
+
+    def test_undecodable_csv(self):
+        with self.assertRaisesMessage(IngestError, 'Error reading CSV file'):
+            read_csv_items(SimpleUploadedFile('registers.csv', b'date,value\n\xff\xfe,1'), encoding='utf-8')
+
+    @override_settings(CONSUMPTION_BULK_MAX_ITEMS=2)
+    def test_item_limit(self):
+        response = self.client.post(self.url, [self.item()] * 3, format='json')
+        self.assertEqual((response.status_code, response.json()), (400, {'error': 'At most 2 items per request'}))
+
+        content = b'date,utilityType,value\n' + b'2025-03-01,water,1\n' * 3
+        response = self.client.post(self.url, {'file': SimpleUploadedFile('r.csv', content)}, format='multipart')
+        self.assertEqual((response.status_code, response.json()), (400, {'error': 'At most 2 items per request'}))
+        self.assertFalse(ConsumptionRegister.objects.exists())
+
+
+class SeriesTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.building = create_building(create_user('master@example.com'), 'Series', '00.000.000/0001-34')
+        values = {
+            datetime.date(2025, 1, 5): ['10.00', '2.00'],
+            datetime.date(2025, 1, 20): ['6.00'],
+            datetime.date(2025, 2, 3): ['4.50'],
+            datetime.date(2025, 3, 31): ['1.00', '9.00'],
+        }
+        with TestCase.captureOnCommitCallbacks(execute=True):
+            for date, day_values in values.items():
+                for value in day_values:
+                    ConsumptionRegister.objects.create(building=cls.building, utility_type='water', date=date,
+                                                       value=Decimal(value))
+            ConsumptionRegister.objects.create(building=cls.building, utility_type='gas',
+                                               date=datetime.date(2025, 2, 10), value=Decimal('3.00'))
+
+    def test_month_buckets(self):
+        series = consumption_series(ConsumptionRegister.objects.all(), 'month', ['water'])
+        self.assertEqual(series, [{'utility': 'water', 'buckets': [
+            {'start': datetime.date(2025, 1, 1), 'sum': '18.00', 'avg': '6.00', 'min': '2.00', 'max': '10.00',
+             'count': 3},
+            {'start': datetime.date(2025, 2, 1), 'sum': '4.50', 'avg': '4.50', 'min': '4.50', 'max': '4.50',
+             'count': 1},
+            {'start': datetime.date(2025, 3, 1), 'sum': '10.00', 'avg': '5.00', 'min': '1.00', 'max': '9.00',
+             'count': 2},
+        ]}])
+
+    def test_range_and_utilities(self):
+        series = consumption_series(ConsumptionRegister.objects.all(), 'year',
+                                    start=datetime.date(2025, 1, 10), end=datetime.date(2025, 2, 28))
+        self.assertEqual([(entry['utility'], entry['buckets'][0]['sum'], entry['buckets'][0]['count'])
+                          for entry in series], [('gas', '3.00', 1), ('water', '10.50', 2)])
+
+    def test_rollups_agree_over_aligned_ranges(self):
+        ranges = [
+            ('day', datetime.date(2025, 1, 1), datetime.date(2025, 3, 31)),
+            ('week', datetime.date(2025, 1, 6), datetime.date(2025, 3, 30)),
+            ('month', datetime.date(2025, 1, 1), datetime.date(2025, 3, 31)),
+            ('month', datetime.date(2025, 1, 15), datetime.date(2025, 2, 20)),  # read from day cells
+            ('year', None, None),
+        ]
+        for bucket, start, end in ranges:
+            with self.subTest(bucket=bucket, start=start, end=end):
+                self.assertEqual(
+                    rollup_series(ConsumptionRollup.objects.all(), bucket, start=start, end=end),
+                    consumption_series(ConsumptionRegister.objects.all(), bucket, start=start, end=end),
+                )
+
+
+class ReconciliationTests(TestCase):
+    url = '/api/consumption/reconciliation/'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.master = create_user('master@example.com')
+        cls.manager = create_user('manager@example.com', role='manager')
+        cls.building = create_building(cls.manager, 'Usage', '00.000.000/0001-35')
+        usage = {1: '100.00', 2: '150.00', 3: '60.00', 4: '30.00', 5: '50.00'}
+        with TestCase.captureOnCommitCallbacks(execute=True):
+            for month, value in usage.items():
+                ConsumptionRegister.objects.create(building=cls.building, utility_type='water',
+                                                   date=datetime.date(2025, month, 10), value=Decimal(value))
+            ConsumptionRegister.objects.create(building=cls.building, utility_type='gas',
+                                               date=datetime.date(2025, 1, 10), value=Decimal('5.00'))
+        for month, amount in (('2025-01', '200.00'), ('2025-02', '300.00'), ('2025-05', '100.00'),
+                              ('2025-06', '80.00')):
+            ConsumptionAccount.objects.create(month=month, utility_type='water', amount=Decimal(amount),
+                                              payment_date=datetime.date(2025, 7, 1))
+
+    def water(self, start=None, end=None):
+        with CaptureQueriesContext(connection) as queries:
+            results = reconcile(ConsumptionRollup.objects.all(), ['water'], start, end)
+        self.assertEqual(len(queries), 1)
+        self.assertIn('UNION ALL', queries[0]['sql'])
+        self.assertEqual([result['utility'] for result in results], ['water'])
+        return results[0]
+
+    def test_usage_and_billing_months_are_all_kept(self):
+        result = self.water()
+        months = {month['month']: month for month in result['months']}
+        self.assertEqual(list(months), ['2025-01', '2025-02', '2025-03', '2025-04', '2025-05', '2025-06'])
+        self.assertEqual(months['2025-01'], {
+            'month': '2025-01', 'usage': '100.00', 'readings': 1, 'billed': '200.00', 'bills': 1,
+            'unit_cost': '2.0000', 'usage_change': None, 'unit_cost_change': None, 'missing_bill': False,
+        })
+        # Billing without usage
+        self.assertEqual(months['2025-06'], {
+            'month': '2025-06', 'usage': None, 'readings': 0, 'billed': '80.00', 'bills': 1,
+            'unit_cost': None, 'usage_change': None, 'unit_cost_change': None, 'missing_bill': False,
+        })
+        self.assertEqual(result['totals'], {'usage': '390.00', 'billed': '680.00', 'unit_cost': '2.0000',
+                                            'missing_bills': 2})
+
+    def test_month_over_month_changes(self):
+        months = self.water()['months']
+        self.assertEqual([month['usage_change'] for month in months], [None, '50.00', '-60.00', '-50.00', '66.67', None])
+        # Only between consecutive billed months
+        self.assertEqual([month['unit_cost_change'] for month in months], [None, '0.00', None, None, None, None])
+
+        # The month before the range is not read
+        months = self.water(start=datetime.date(2025, 2, 1), end=datetime.date(2025, 3, 1))['months']
+        self.assertEqual([(month['month'], month['usage_change']) for month in months],
+                         [('2025-02', None), ('2025-03', '-60.00')])
+
+    def test_gaps(self):
+        result = self.water()
+        self.assertEqual(result['gaps'], [{'start': '2025-03', 'end': '2025-04', 'months': 2}])
+        self.assertEqual([month['month'] for month in result['months'] if month['missing_bill']], ['2025-03', '2025-04'])
+
+    def test_restricted_users_are_denied(self):
+        client = APIClient()
+        client.force_authenticate(self.manager)
+        response = client.get(self.url)
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(response.json()['error'], 'Access denied')
+
+        client.force_authenticate(self.master)
+        response = client.get(self.url, {'utility': 'water,gas', 'start': '2025-01', 'end': '2025-01'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([(result['utility'], result['totals']['missing_bills']) for result in response.json()['results']],
+                         [('gas', 1), ('water', 0)])
+
+
+def monthly_points(values, start=datetime.date(2023, 1, 1)):
+    """(id, date, value) points of consecutive months."""
+    return [(index, start + relativedelta(months=index), Decimal(value)) for index, value in enumerate(values)]
+
+
+@override_settings(CONSUMPTION_ANOMALY_Z_THRESHOLD=3.0, CONSUMPTION_ANOMALY_SEASONAL_THRESHOLD=50.0,
+                   CONSUMPTION_ANOMALY_MIN_HISTORY=6)
+class AnomalyDetectionTests(TestCase):
+    BASE = ['100', '102', '98', '101', '99', '100']
+
+    def kinds(self, period, points):
+        return [(found['reading_id'], found['kind']) for found in detect_series(period, points)]
+
+    def test_spike_and_drop(self):
+        found = list(detect_series('monthly', monthly_points(self.BASE + ['300'])))
+        self.assertEqual([(item['reading_id'], item['kind']) for item in found], [(6, 'spike')])
+        self.assertAlmostEqual(found[0]['expected'], 100.0)
+        self.assertGreater(found[0]['z_score'], 3)
+
+        self.assertEqual(self.kinds('monthly', monthly_points(self.BASE + ['10'])), [(6, 'drop')])
+        # Not enough history for a z-score
+        self.assertEqual(self.kinds('monthly', monthly_points(self.BASE[:5] + ['300'])), [])
+
+    def test_flat_series(self):
+        # std == 0: no z-score rather than a division by zero
+        found = list(detect_series('monthly', monthly_points(['100'] * 8 + ['150'])))
+        self.assertEqual(found, [])
+        self.assertEqual(self.kinds('daily', [(day, datetime.date(2025, 1, 1) + datetime.timedelta(days=day),
+                                               Decimal('0')) for day in range(60)]), [])
+
+    @override_settings(CONSUMPTION_ANOMALY_Z_THRESHOLD=10.0)
+    def test_seasonal(self):
+        # Januaries use twice the other months; the third one does not
+        values = ['200' if month == 0 else '100' for _ in range(2) for month in range(12)] + ['100']
+        found = list(detect_series('monthly', monthly_points(values)))
+        self.assertEqual([(item['reading_id'], item['kind']) for item in found], [(24, 'seasonal')])
+        self.assertEqual(found[0]['seasonal_baseline'], 200.0)
+        self.assertEqual(found[0]['seasonal_deviation'], -50.0)
+
+    def test_spikes_are_left_out_of_the_season(self):
+        values = ['99' if month % 2 else '101' for month in range(25)]
+        values[12] = '500'
+        # Had the spike counted, the third January would deviate from a (101 + 500) / 2 baseline
+        self.assertEqual(self.kinds('monthly', monthly_points(values)), [(12, 'spike')])
+
+    def test_scan_replaces_only_the_scanned_buildings(self):
+        user = create_user('master@example.com')
+        water = ConsumptionType.objects.create(name='water', unit='m3')
+        buildings = [create_building(user, f'Scan {index}', f'00.000.000/0001-6{index}') for index in range(2)]
+        readings = {}
+        for building in buildings:
+            for reading_id, date, value in monthly_points(self.BASE + ['300']):
+                readings[building.id, reading_id] = ConsumptionReading.objects.create(
+                    building=building, consumption_type=water, period='monthly', reading_date=date,
+                    consumption_value=value,
+                )
+        first, second = buildings
+        stale = ConsumptionAnomaly.objects.create(
+            building=second, reading=readings[second.id, 0], consumption_type=water, period='monthly',
+            reading_date=readings[second.id, 0].reading_date, value=Decimal('100'), kind='drop',
+        )
+
+        summary = scan_buildings([first.id])
+        self.assertEqual(summary, {'series': 1, 'readings': 7, 'anomalies': 1})
+        self.assertCountEqual(ConsumptionAnomaly.objects.values_list('building_id', 'reading_id', 'kind'), [
+            (first.id, readings[first.id, 6].id, 'spike'),
+            (second.id, stale.reading_id, 'drop'),
+        ])
+
+        self.assertEqual(scan_buildings()['anomalies'], 2)
+        self.assertCountEqual(ConsumptionAnomaly.objects.values_list('reading_id', flat=True),
+                              [readings[first.id, 6].id, readings[second.id, 6].id])
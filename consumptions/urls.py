@@ -3,5 +3,9 @@ from . import views
 
 urlpatterns = [
     path('register/', views.consumption_register, name='consumption_register'),
+    path('register/bulk/', views.consumption_register_bulk, name='consumption_register_bulk'),
+    path('anomalies/', views.consumption_anomalies, name='consumption_anomalies'),
+    path('series/', views.consumption_series_view, name='consumption_series'),
+    path('reconciliation/', views.consumption_reconciliation, name='consumption_reconciliation'),
     path('account/', views.consumption_account, name='consumption_account'),
 ]
@@ -1,34 +1,279 @@
+import datetime
+
+from django.conf import settings
 from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
-from .models import ConsumptionRegister, ConsumptionAccount
-from .serializers import ConsumptionRegisterSerializer, ConsumptionAccountSerializer
+from building_mgmt.access import building_access
+from jobs.queue import enqueue_job
+from jobs.views import job_accepted_response
+from sindipro_backend.caching import cache_response
+from sindipro_backend.instrumentation import query_budget
+from sindipro_backend.pagination import KeysetCursorPagination
+from .anomalies import scan_buildings
+from .ingest import IngestError, ingest_registers, read_csv_items
+from .models import ConsumptionAnomaly, ConsumptionRegister, ConsumptionAccount
+from .reconciliation import reconcile
+from .serializers import ConsumptionAnomalySerializer, ConsumptionRegisterSerializer, ConsumptionAccountSerializer
+from .series import (BUCKETS, UTILITY_TYPES, consumption_series, rollup_series, scoped_registers,
+                     scoped_rollups, use_rollups)
 
 
 @api_view(['GET', 'POST'])
 @permission_classes([IsAuthenticated])
+@cache_response(depends_on=('consumption_register',))
 def consumption_register(request):
     """
     GET: Retrieve all consumption register entries.
+         Optional query parameter: building_id to filter by building
     POST: Create a new consumption register entry.
-    Expected POST data: {date, gasCategory, utilityType, value}
+    Expected POST data: {date, gasCategory, utilityType, value, buildingId (optional)}
     """
     if request.method == 'GET':
         registers = ConsumptionRegister.objects.all()
+
+        building_id = request.GET.get('building_id')
+        if building_id:
+            if not building_access(request).can_access(building_id):
+                return Response({
+                    'error': 'Building not found or access denied'
+                }, status=status.HTTP_404_NOT_FOUND)
+            registers = registers.filter(building_id=building_id)
+
+        # Opt-in cursor pagination (?cursor= / ?limit=)
+        paginator = KeysetCursorPagination(ordering=('-date', '-id'))
+        page = paginator.paginate_queryset(registers, request)
+        if page is not None:
+            return paginator.get_paginated_response(ConsumptionRegisterSerializer(page, many=True).data)
+
         serializer = ConsumptionRegisterSerializer(registers, many=True)
         return Response(serializer.data)
     
     elif request.method == 'POST':
         serializer = ConsumptionRegisterSerializer(data=request.data)
         if serializer.is_valid():
+            building_id = serializer.validated_data.get('building_id')
+            if building_id is not None and not building_access(request).get_building(building_id, edit=True):
+                return Response({
+                    'error': 'Building not found or access denied'
+                }, status=status.HTTP_404_NOT_FOUND)
             serializer.save()
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def consumption_register_bulk(request):
+    """
+    POST: Create many consumption register entries at once, from a JSON list of
+          {date, utilityType, value, gasCategory, buildingId} objects or from a CSV
+          upload (`file`) with those column names. Nothing is created unless every
+          item is valid; errors are returned per item index (0 = first data row).
+    """
+    try:
+        if 'file' in request.FILES:
+            items = read_csv_items(request.FILES['file'])
+        else:
+            items = request.data
+        created = ingest_registers(request, items)
+    except IngestError as e:
+        body = {'error': e.message}
+        if e.details:
+            body['details'] = e.details
+        return Response(body, status=status.HTTP_400_BAD_REQUEST)
+
+    return Response({
+        'message': f'{len(created)} consumption entries created successfully',
+        'created': len(created),
+        'ids': [register.id for register in created],
+    }, status=status.HTTP_201_CREATED)
+
+
+def _parse_date(value):
+    return datetime.date.fromisoformat(value) if value else None
+
+
+@query_budget(3)
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@cache_response(depends_on=('consumption_register',))
+def consumption_series_view(request):
+    """
+    GET: Consumption per utility in daily, weekly, monthly or yearly buckets
+         with sum/avg/min/max/count computed in SQL, from the raw registers or,
+         for long/open-ended ranges, the rollups (`source` says which).
+         Query parameters: bucket (day|week|month|year, default month),
+         start/end (YYYY-MM-DD, inclusive), utility (comma separated),
+         building_id (without it: every accessible building plus unassigned entries)
+    """
+    bucket = request.GET.get('bucket', 'month')
+    if bucket not in BUCKETS:
+        return Response({
+            'error': 'Invalid bucket',
+            'details': f"Expected one of: {', '.join(BUCKETS)}"
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    utilities = [u for u in request.GET.get('utility', '').split(',') if u]
+    unknown = sorted(set(utilities) - set(UTILITY_TYPES))
+    if unknown:
+        return Response({
+            'error': 'Invalid utility',
+            'details': f"Unknown: {', '.join(unknown)}. Expected: {', '.join(UTILITY_TYPES)}"
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        start = _parse_date(request.GET.get('start'))
+        end = _parse_date(request.GET.get('end'))
+    except ValueError:
+        return Response({
+            'error': 'Invalid date range',
+            'details': 'start and end must be YYYY-MM-DD dates'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    access = building_access(request)
+    building_id = request.GET.get('building_id')
+    if building_id:
+        if not access.can_access(building_id):
+            return Response({
+                'error': 'Building not found or access denied'
+            }, status=status.HTTP_404_NOT_FOUND)
+        building_id = int(building_id)
+
+    if use_rollups(start, end):
+        source = 'rollup'
+        series = rollup_series(scoped_rollups(access, building_id or None), bucket, utilities, start, end)
+    else:
+        source = 'raw'
+        series = consumption_series(scoped_registers(access, building_id or None), bucket, utilities, start, end)
+    return Response({
+        'bucket': bucket,
+        'start': start,
+        'end': end,
+        'building_id': building_id or None,
+        'source': source,
+        'series': series,
+    })
+
+
+@query_budget(3)
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@cache_response(depends_on=('consumption_register', 'consumption_account'))
+def consumption_reconciliation(request):
+    """
+    GET: Usage vs billing per utility and month in one aggregated query:
+         usage, billed amount, unit cost, month-over-month changes and the
+         months with usage but no bill (gaps).
+         Query parameters: start/end (YYYY-MM, inclusive), utility (comma separated).
+         Consumption accounts are not tied to a building, so billing is
+         system-wide: only users with access to every building (master) may
+         reconcile it against the usage of every building.
+    """
+    access = building_access(request)
+    if access.building_ids() is not None:
+        return Response({
+            'error': 'Access denied',
+            'details': 'Reconciliation covers billing for every building'
+        }, status=status.HTTP_403_FORBIDDEN)
+
+    utilities = [u for u in request.GET.get('utility', '').split(',') if u]
+    unknown = sorted(set(utilities) - set(UTILITY_TYPES))
+    if unknown:
+        return Response({
+            'error': 'Invalid utility',
+            'details': f"Unknown: {', '.join(unknown)}. Expected: {', '.join(UTILITY_TYPES)}"
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    months = {}
+    for name in ('start', 'end'):
+        value = request.GET.get(name)
+        months[name] = ConsumptionAccount.parse_month(value) if value else None
+        if value and months[name] is None:
+            return Response({
+                'error': 'Invalid month range',
+                'details': 'start and end must be YYYY-MM months'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+    rollups = scoped_rollups(access)
+    return Response({
+        'start': request.GET.get('start') or None,
+        'end': request.GET.get('end') or None,
+        'results': reconcile(rollups, utilities, months['start'], months['end']),
+    })
+
+
+@query_budget(3)
+@api_view(['GET', 'POST'])
+@permission_classes([IsAuthenticated])
+def consumption_anomalies(request):
+    """
+    GET: Anomalous consumption readings found by the last scan, newest first.
+         Optional query parameters: building_id, utility, kind (spike|drop|seasonal),
+         start/end (YYYY-MM-DD, inclusive)
+    POST: Queue an anomaly scan (202), or run it in the request (200) without
+          JOBS_ENABLED. Body/query: building_id; only master users may omit it
+          to scan every building.
+    """
+    access = building_access(request)
+    building_id = request.data.get('building_id') if request.method == 'POST' else None
+    building_id = building_id or request.query_params.get('building_id')
+    if building_id:
+        try:
+            building_id = int(building_id)
+        except (TypeError, ValueError):
+            return Response({
+                'error': 'building_id must be an integer'
+            }, status=status.HTTP_400_BAD_REQUEST)
+    if building_id and not access.can_access(building_id, edit=request.method == 'POST'):
+        return Response({
+            'error': 'Building not found or access denied'
+        }, status=status.HTTP_404_NOT_FOUND)
+
+    if request.method == 'POST':
+        if not building_id and not access.is_master:
+            return Response({
+                'error': 'building_id parameter is required'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        building_ids = [building_id] if building_id else None
+        if not settings.JOBS_ENABLED:
+            return Response(scan_buildings(building_ids), status=status.HTTP_200_OK)
+        job = enqueue_job('consumption_anomaly_scan', {'building_ids': building_ids}, user=request.user)
+        return job_accepted_response(job)
+
+    anomalies = access.filter_queryset(ConsumptionAnomaly.objects.select_related('consumption_type'))
+    if building_id:
+        anomalies = anomalies.filter(building_id=building_id)
+    if request.GET.get('utility'):
+        anomalies = anomalies.filter(consumption_type__name=request.GET['utility'])
+    if request.GET.get('kind'):
+        anomalies = anomalies.filter(kind=request.GET['kind'])
+    try:
+        start = _parse_date(request.GET.get('start'))
+        end = _parse_date(request.GET.get('end'))
+    except ValueError:
+        return Response({
+            'error': 'Invalid date range',
+            'details': 'start and end must be YYYY-MM-DD dates'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    if start:
+        anomalies = anomalies.filter(reading_date__gte=start)
+    if end:
+        anomalies = anomalies.filter(reading_date__lte=end)
+
+    # Opt-in cursor pagination (?cursor= / ?limit=)
+    paginator = KeysetCursorPagination(ordering=('-reading_date', '-id'))
+    page = paginator.paginate_queryset(anomalies, request)
+    if page is not None:
+        return paginator.get_paginated_response(ConsumptionAnomalySerializer(page, many=True).data)
+
+    return Response(ConsumptionAnomalySerializer(anomalies, many=True).data)
+
+
 @api_view(['GET', 'POST'])
 @permission_classes([IsAuthenticated])
+@cache_response(depends_on=('consumption_account',))
 def consumption_account(request):
     """
     GET: Retrieve all consumption account entries.
@@ -37,6 +282,13 @@ def consumption_account(request):
     """
     if request.method == 'GET':
         accounts = ConsumptionAccount.objects.all()
+
+        # Opt-in cursor pagination (?cursor= / ?limit=)
+        paginator = KeysetCursorPagination(ordering=('-month', '-id'))
+        page = paginator.paginate_queryset(accounts, request)
+        if page is not None:
+            return paginator.get_paginated_response(ConsumptionAccountSerializer(page, many=True).data)
+
         serializer = ConsumptionAccountSerializer(accounts, many=True)
         return Response(serializer.data)
     
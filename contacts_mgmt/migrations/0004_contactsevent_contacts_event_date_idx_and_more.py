@@ -0,0 +1,23 @@
+# Generated by Django 5.2.4 on 2026-10-18 20:53
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contacts_mgmt', '0003_contactssupplier'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='contactsevent',
+            index=models.Index(fields=['date_time', 'id'], name='contacts_event_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='contactssupplier',
+            index=models.Index(fields=['created_at', 'id'], name='contacts_supplier_created_idx'),
+        ),
+    ]
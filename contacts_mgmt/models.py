@@ -21,6 +21,9 @@ class ContactsEvent(models.Model):
     class Meta:
         db_table = 'contacts_mgmt_event'
         ordering = ['-date_time']
+        indexes = [
+            models.Index(fields=['date_time', 'id'], name='contacts_event_date_idx'),
+        ]
 
 class ContactsSupplier(models.Model):
     company_name = models.CharField(max_length=255)
@@ -41,3 +44,6 @@ class ContactsSupplier(models.Model):
     class Meta:
         db_table = 'contacts_mgmt_supplier'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='contacts_supplier_created_idx'),
+        ]
@@ -3,6 +3,7 @@ from rest_framework.response import Response
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from django.shortcuts import get_object_or_404
+from sindipro_backend.pagination import KeysetCursorPagination
 from .models import ContactsEvent, ContactsSupplier
 from .serializers import ContactsEventSerializer, ContactsSupplierSerializer
 
@@ -11,6 +12,13 @@ from .serializers import ContactsEventSerializer, ContactsSupplierSerializer
 def event_handler(request):
     if request.method == 'GET':
         events = ContactsEvent.objects.all()
+
+        # Opt-in cursor pagination (?cursor= / ?limit=)
+        paginator = KeysetCursorPagination(ordering=('-date_time', '-id'))
+        page = paginator.paginate_queryset(events, request)
+        if page is not None:
+            return paginator.get_paginated_response(ContactsEventSerializer(page, many=True).data)
+
         serializer = ContactsEventSerializer(events, many=True)
         return Response(serializer.data, status=status.HTTP_200_OK)
     
@@ -60,6 +68,13 @@ def event_detail_handler(request, id):
 def supplier_handler(request):
     if request.method == 'GET':
         suppliers = ContactsSupplier.objects.all()
+
+        # Opt-in cursor pagination (?cursor= / ?limit=)
+        paginator = KeysetCursorPagination(ordering=('-created_at', '-id'))
+        page = paginator.paginate_queryset(suppliers, request)
+        if page is not None:
+            return paginator.get_paginated_response(ContactsSupplierSerializer(page, many=True).data)
+
         serializer = ContactsSupplierSerializer(suppliers, many=True)
         return Response(serializer.data, status=status.HTTP_200_OK)
     
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.4 on 2026-10-18 20:53
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('equipment_mgmt', '0009_add_repair_status_choice'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='equipment',
+            index=models.Index(fields=['created_by', 'created_at', 'id'], name='equipment_owner_created_idx'),
+        ),
+    ]
@@ -53,6 +53,11 @@ class Equipment(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_by', 'created_at', 'id'], name='equipment_owner_created_idx'),
+        ]
+    
     def __str__(self):
         return f"{self.name} - Building {self.building_id}"
     
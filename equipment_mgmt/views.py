@@ -4,6 +4,7 @@ from rest_framework import viewsets, status
 from rest_framework.response import Response
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
+from sindipro_backend.pagination import KeysetCursorPagination
 from .models import Equipment, MaintenanceRecord, EquipmentDocument
 from .serializers import EquipmentSerializer, MaintenanceRecordSerializer, EquipmentDocumentSerializer
 
@@ -13,6 +14,13 @@ from .serializers import EquipmentSerializer, MaintenanceRecordSerializer, Equip
 def equipment_list_create(request):
     if request.method == 'GET':
         equipment = Equipment.objects.filter(created_by=request.user)
+
+        # Opt-in cursor pagination (?cursor= / ?limit=)
+        paginator = KeysetCursorPagination(ordering=('-created_at', '-id'))
+        page = paginator.paginate_queryset(equipment, request)
+        if page is not None:
+            return paginator.get_paginated_response(EquipmentSerializer(page, many=True).data)
+
         serializer = EquipmentSerializer(equipment, many=True)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class Field_mgmtConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'field_mgmt'
+
+    def ready(self):
+        # Image variant generation/cleanup hooks
+        from . import signals  # noqa: F401
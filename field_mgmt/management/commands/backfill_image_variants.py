@@ -0,0 +1,91 @@
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.core.management.base import BaseCommand
+
+from jobs.worker import init_worker
+
+logger = logging.getLogger(__name__)
+
+SOURCES = ('technical', 'photos', 'avatars')
+
+
+def render_source(source, object_id, force):
+    """
+    Pool entry point: render the variants of one image.
+    Returns (source, object_id, variants written, error message).
+    """
+    from django.db import close_old_connections
+    from sindipro_backend.image_variants import generate_variants
+
+    close_old_connections()
+    try:
+        if source == 'technical':
+            from field_mgmt.models import FieldMgmtTechnicalImage
+            image = FieldMgmtTechnicalImage.objects.get(id=object_id)
+            key, original = image.variant_key, image.image_data
+        elif source == 'photos':
+            from field_mgmt.models import FieldRequestPhoto
+            photo = FieldRequestPhoto.objects.get(id=object_id)
+            key, original = photo.variant_key, photo.photo.path
+        else:
+            from users_mgmt.models import UserProfile
+            profile = UserProfile.objects.get(id=object_id)
+            key, original = profile.avatar_variant_key, profile.avatar.path
+        return source, object_id, generate_variants(key, original, force=force), None
+    except Exception as e:
+        return source, object_id, [], str(e)
+    finally:
+        close_old_connections()
+
+
+class Command(BaseCommand):
+    help = 'Generate missing thumb/medium/WebP variants for existing photos using a process pool'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=multiprocessing.cpu_count(),
+                            help='Number of worker processes')
+        parser.add_argument('--source', choices=SOURCES, action='append',
+                            help='Only backfill this kind of image (repeatable); defaults to all')
+        parser.add_argument('--force', action='store_true',
+                            help='Re-render variants that already exist')
+
+    def collect_work(self, sources):
+        from field_mgmt.models import FieldMgmtTechnicalImage, FieldRequestPhoto
+        from users_mgmt.models import UserProfile
+
+        # Only ids are read here; each worker loads its own image
+        querysets = {
+            'technical': FieldMgmtTechnicalImage.objects.all(),
+            'photos': FieldRequestPhoto.objects.exclude(photo=''),
+            'avatars': UserProfile.objects.exclude(avatar='').exclude(avatar__isnull=True),
+        }
+        for source in sources:
+            for object_id in querysets[source].order_by('id').values_list('id', flat=True).iterator():
+                yield source, object_id
+
+    def handle(self, *args, **options):
+        processes = max(options['processes'], 1)
+        sources = options['source'] or SOURCES
+        work = list(self.collect_work(sources))
+
+        self.stdout.write(f'Backfilling variants for {len(work)} image(s) with {processes} process(es)...')
+
+        rendered = skipped = failed = 0
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=processes, mp_context=context, initializer=init_worker) as pool:
+            futures = [pool.submit(render_source, source, object_id, options['force']) for source, object_id in work]
+            for future in as_completed(futures):
+                source, object_id, variants, error = future.result()
+                if error:
+                    failed += 1
+                    self.stderr.write(f'{source} #{object_id}: {error}')
+                elif variants:
+                    rendered += 1
+                else:
+                    skipped += 1
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Done: {rendered} rendered, {skipped} already up to date, {failed} failed'
+        ))
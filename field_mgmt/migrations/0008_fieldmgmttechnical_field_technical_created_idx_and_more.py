@@ -0,0 +1,22 @@
+# Generated by Django 5.2.4 on 2026-10-18 20:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('building_mgmt', '0012_pagination_indexes'),
+        ('field_mgmt', '0007_alter_fieldmgmttechnical_code'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='fieldmgmttechnical',
+            index=models.Index(fields=['created_at', 'id'], name='field_technical_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='fieldrequest',
+            index=models.Index(fields=['created_at', 'id'], name='field_request_created_idx'),
+        ),
+    ]
@@ -23,6 +23,9 @@ class FieldRequest(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='field_request_created_idx'),
+        ]
 
 class FieldRequestPhoto(models.Model):
     field_request = models.ForeignKey(FieldRequest, on_delete=models.CASCADE, related_name='photos')
@@ -32,6 +35,11 @@ class FieldRequestPhoto(models.Model):
     
     def __str__(self):
         return f"Photo for {self.field_request.title}"
+    
+    @property
+    def variant_key(self):
+        """Directory of the resized variants under MEDIA_ROOT/variants/"""
+        return self.photo.name
 
 class FieldRequestComment(models.Model):
     field_request = models.ForeignKey(FieldRequest, on_delete=models.CASCADE, related_name='comments')
@@ -146,6 +154,9 @@ class FieldMgmtTechnical(models.Model):
     class Meta:
         ordering = ['-created_at']
         db_table = 'field_mgmt_technical'
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='field_technical_created_idx'),
+        ]
 
 
 class FieldMgmtTechnicalImage(models.Model):
@@ -158,5 +169,10 @@ class FieldMgmtTechnicalImage(models.Model):
     def __str__(self):
         return f"Image for {self.technical_request.title}"
     
+    @property
+    def variant_key(self):
+        """Directory of the resized variants under MEDIA_ROOT/variants/"""
+        return f"technical/{self.id}"
+    
     class Meta:
         db_table = 'field_mgmt_fieldmgmttechnicalimage'
\ No newline at end of file
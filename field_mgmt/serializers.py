@@ -2,7 +2,15 @@ from rest_framework import serializers
 from .models import FieldRequest, FieldMgmtTechnical, FieldMgmtTechnicalImage
 from building_mgmt.models import Building
 import base64
+import binascii
+import logging
 from django.core.files.base import ContentFile
+from django.conf import settings
+from django.template.defaultfilters import filesizeformat
+from django.urls import reverse
+from .uploads import bulk_insert_images, sniff_image_type
+
+logger = logging.getLogger(__name__)
 
 
 class FieldRequestSerializer(serializers.ModelSerializer):
@@ -38,21 +46,31 @@ class FieldRequestSerializer(serializers.ModelSerializer):
 
 
 class FieldMgmtTechnicalImageSerializer(serializers.ModelSerializer):
-    image_data_url = serializers.SerializerMethodField()
+    image_url = serializers.SerializerMethodField()
+    thumbnail_url = serializers.SerializerMethodField()
+    size = serializers.SerializerMethodField()
     
     class Meta:
         model = FieldMgmtTechnicalImage
-        fields = ['id', 'image_data_url', 'mime_type', 'filename', 'uploaded_at']
+        fields = ['id', 'image_url', 'thumbnail_url', 'mime_type', 'filename', 'size', 'uploaded_at']
         read_only_fields = ['id', 'uploaded_at']
     
-    def get_image_data_url(self, obj):
-        """Convert binary image data back to data URL format for frontend"""
-        if obj.image_data:
-            # Encode binary data to base64
-            base64_data = base64.b64encode(obj.image_data).decode('utf-8')
-            # Return as data URL
-            return f"data:{obj.mime_type};base64,{base64_data}"
-        return None
+    def get_image_url(self, obj):
+        """URL of the binary image endpoint; the bytes are never inlined in JSON"""
+        url = reverse('field-technical-image', args=[obj.id])
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
+    
+    def get_thumbnail_url(self, obj):
+        return f"{self.get_image_url(obj)}?size=thumb"
+    
+    def get_size(self, obj):
+        # List querysets annotate the size so the blob itself is never loaded
+        if hasattr(obj, 'size'):
+            return obj.size
+        if 'image_data' in obj.get_deferred_fields():
+            return None
+        return len(obj.image_data) if obj.image_data else 0
 
 
 class FieldMgmtTechnicalSerializer(serializers.ModelSerializer):
@@ -69,35 +87,52 @@ class FieldMgmtTechnicalSerializer(serializers.ModelSerializer):
                  'priority', 'images', 'photos', 'created_at', 'updated_at']
         read_only_fields = ['id', 'code', 'created_at', 'updated_at', 'images']
     
+    def validate_photos(self, value):
+        """
+        Decode the base64 data URLs into (mime_type, bytes); photos are checked
+        like multipart uploads (see uploads.TechnicalImageUploadHandler).
+        """
+        max_bytes = settings.TECHNICAL_IMAGE_MAX_BYTES
+        if len(value) > settings.TECHNICAL_IMAGE_MAX_FILES:
+            raise serializers.ValidationError(
+                f'At most {settings.TECHNICAL_IMAGE_MAX_FILES} photos can be uploaded at once')
+
+        photos, errors = [], []
+        for idx, image_data_url in enumerate(value):
+            if not image_data_url.startswith('data:'):
+                continue
+            # Format: data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAA...
+            try:
+                binary_data = base64.b64decode(image_data_url.split(',', 1)[1], validate=True)
+            except (IndexError, binascii.Error):
+                errors.append({'index': idx, 'error': 'Invalid base64 data URL'})
+                continue
+            if not binary_data:
+                errors.append({'index': idx, 'error': 'File is empty'})
+            elif len(binary_data) > max_bytes:
+                errors.append({'index': idx, 'error': f'File exceeds the {filesizeformat(max_bytes)} limit'})
+            else:
+                # Trust the file signature rather than the MIME type in the header
+                mime_type = sniff_image_type(binary_data)
+                if mime_type is None:
+                    errors.append({'index': idx, 'error': 'File is not a JPEG, PNG, GIF or WebP image'})
+                else:
+                    photos.append((idx, mime_type, binary_data))
+
+        if errors:
+            logger.warning("Rejected technical request photos: %s", errors)
+            raise serializers.ValidationError(errors)
+        return photos
+
     def create(self, validated_data):
-        photos_list = validated_data.pop('photos', [])
+        photos = validated_data.pop('photos', [])
         technical_request = FieldMgmtTechnical.objects.create(**validated_data)
-        
-        for idx, image_data_url in enumerate(photos_list):
-            if image_data_url.startswith('data:'):
-                # Parse the data URL
-                # Format: data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAA...
-                try:
-                    # Split header and data
-                    header, encoded_data = image_data_url.split(',', 1)
-                    # Extract MIME type
-                    mime_type = header.split(':')[1].split(';')[0]
-                    # Decode base64 to binary
-                    binary_data = base64.b64decode(encoded_data)
-                    
-                    # Generate filename
-                    ext = mime_type.split('/')[-1]
-                    filename = f'technical_{technical_request.id}_{idx}.{ext}'
-                    
-                    # Create image record
-                    FieldMgmtTechnicalImage.objects.create(
-                        technical_request=technical_request,
-                        image_data=binary_data,
-                        mime_type=mime_type,
-                        filename=filename
-                    )
-                except Exception as e:
-                    print(f"Error processing image {idx}: {str(e)}")
-                    continue
-        
-        return technical_request
\ No newline at end of file
+
+        images = [
+            (f'technical_{technical_request.id}_{idx}.{mime_type.split("/")[-1]}', mime_type, binary_data)
+            for idx, mime_type, binary_data in photos
+        ]
+
+        # One bulk INSERT for all images instead of one per image
+        bulk_insert_images(technical_request, images)
+        return technical_request
@@ -0,0 +1,30 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from sindipro_backend.image_variants import delete_variants, generate_variants_safely
+from .models import FieldMgmtTechnicalImage, FieldRequestPhoto
+
+
+@receiver(post_save, sender=FieldMgmtTechnicalImage)
+def technical_image_saved(sender, instance, created, **kwargs):
+    # Render thumb/medium/WebP once the upload is committed
+    if created and instance.image_data:
+        transaction.on_commit(
+            lambda: generate_variants_safely(instance.variant_key, instance.image_data)
+        )
+
+
+@receiver(post_save, sender=FieldRequestPhoto)
+def field_request_photo_saved(sender, instance, **kwargs):
+    if instance.photo:
+        transaction.on_commit(
+            lambda: generate_variants_safely(instance.variant_key, instance.photo.path)
+        )
+
+
+@receiver(post_delete, sender=FieldMgmtTechnicalImage)
+@receiver(post_delete, sender=FieldRequestPhoto)
+def image_deleted(sender, instance, **kwargs):
+    if instance.variant_key:
+        transaction.on_commit(lambda: delete_variants(instance.variant_key))
@@ -0,0 +1,188 @@
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils.http import http_date
+from rest_framework.test import APIClient
+
+from building_mgmt.tests import create_user
+from users_mgmt.tests import GIF
+from .models import FieldMgmtTechnical, FieldMgmtTechnicalImage
+from .uploads import bulk_insert_images
+
+IMAGE = GIF + bytes(range(40))
+PNG = b'\x89PNG\r\n\x1a\n' + bytes(52)
+
+
+def create_technical_request():
+    return FieldMgmtTechnical.objects.create(
+        company_email='tech@example.com', title='Leak', description='Garage leak', location='Garage'
+    )
+
+
+@override_settings(TECHNICAL_IMAGE_STREAM_CHUNK_BYTES=16)
+class TechnicalImageTests(TestCase):
+    """technical_image streams the blob with conditional requests and single byte ranges."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('master@example.com')
+        cls.technical_request = create_technical_request()
+        cls.image = FieldMgmtTechnicalImage.objects.create(
+            technical_request=cls.technical_request, image_data=IMAGE, mime_type='image/gif', filename='leak.gif'
+        )
+        cls.url = f'/api/field/technical/images/{cls.image.id}/'
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def content(self, response):
+        return b''.join(response.streaming_content) if response.streaming else response.content
+
+    def test_full_image(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.content(response), IMAGE)
+        self.assertEqual(response['Content-Type'], 'image/gif')
+        self.assertEqual(response['Content-Length'], str(len(IMAGE)))
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertEqual(response['Content-Disposition'], 'inline; filename="leak.gif"')
+        self.assertEqual(response['Last-Modified'], http_date(self.image.uploaded_at.timestamp()))
+
+    def test_not_found(self):
+        response = self.client.get('/api/field/technical/images/0/')
+        self.assertEqual((response.status_code, response.json()), (404, {'error': 'Image not found'}))
+
+    def test_conditional_requests(self):
+        etag = self.client.get(self.url)['ETag']
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH='"stale"')
+        self.assertEqual(response.status_code, 200)
+
+        last_modified = http_date(self.image.uploaded_at.timestamp())
+        self.assertEqual(self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 304)
+
+    def test_single_range(self):
+        # Spans several database slices
+        response = self.client.get(self.url, HTTP_RANGE='bytes=10-39')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(self.content(response), IMAGE[10:40])
+        self.assertEqual(response['Content-Range'], f'bytes 10-39/{len(IMAGE)}')
+        self.assertEqual(response['Content-Length'], '30')
+
+        response = self.client.get(self.url, HTTP_RANGE='bytes=-5')
+        self.assertEqual((response.status_code, self.content(response)), (206, IMAGE[-5:]))
+
+        # Multi-range requests are answered with the whole image
+        response = self.client.get(self.url, HTTP_RANGE='bytes=0-1,4-5')
+        self.assertEqual((response.status_code, self.content(response)), (200, IMAGE))
+
+    def test_unsatisfiable_range(self):
+        response = self.client.get(self.url, HTTP_RANGE=f'bytes={len(IMAGE)}-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], f'bytes */{len(IMAGE)}')
+
+    def test_if_range(self):
+        etag = self.client.get(self.url)['ETag']
+        response = self.client.get(self.url, HTTP_RANGE='bytes=0-3', HTTP_IF_RANGE=etag)
+        self.assertEqual((response.status_code, self.content(response)), (206, IMAGE[:4]))
+
+        last_modified = http_date(self.image.uploaded_at.timestamp())
+        response = self.client.get(self.url, HTTP_RANGE='bytes=0-3', HTTP_IF_RANGE=last_modified)
+        self.assertEqual(response.status_code, 206)
+
+        response = self.client.get(self.url, HTTP_RANGE='bytes=0-3', HTTP_IF_RANGE='"stale"')
+        self.assertEqual((response.status_code, self.content(response)), (200, IMAGE))
+
+    def test_head(self):
+        response = self.client.head(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, b'')
+        self.assertEqual(response['Content-Length'], str(len(IMAGE)))
+
+        response = self.client.head(self.url, HTTP_RANGE='bytes=0-9')
+        self.assertEqual((response.status_code, response['Content-Length']), (206, '10'))
+
+    def test_list_defers_the_blobs(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/field/technical/')
+        self.assertEqual(response.status_code, 200)
+        image = response.json()[0]['images'][0]
+        self.assertEqual(image['size'], len(IMAGE))
+        self.assertTrue(image['image_url'].endswith(self.url))
+
+        column = connection.ops.quote_name('image_data')
+        image_queries = [query['sql'] for query in queries if FieldMgmtTechnicalImage._meta.db_table in query['sql']]
+        self.assertEqual(len(image_queries), 1)
+        # Only read through LENGTH()
+        self.assertNotIn(f'.{column},', image_queries[0])
+        self.assertNotIn(f'.{column} FROM', image_queries[0])
+
+
+class TechnicalUploadTests(TestCase):
+    """Multipart photos go through TechnicalImageUploadHandler and bulk_insert_images."""
+
+    url = '/api/field/technical/'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('master@example.com')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def post(self, **files):
+        data = {'company_email': 'tech@example.com', 'title': 'Leak', 'description': 'Garage leak',
+                'location': 'Garage', **files}
+        return self.client.post(self.url, data, format='multipart')
+
+    def assert_rejected(self, response, *errors):
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['error'], 'Invalid photos')
+        self.assertEqual([rejected['error'] for rejected in response.json()['details']], list(errors))
+        self.assertFalse(FieldMgmtTechnical.objects.exists())
+
+    def test_sniffed_type_replaces_the_claimed_one(self):
+        response = self.post(photos=[SimpleUploadedFile('leak.jpg', PNG, content_type='image/jpeg'),
+                                     SimpleUploadedFile('leak.gif', IMAGE, content_type='image/gif')])
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual([(image['filename'], image['mime_type'], image['size']) for image in response.json()['images']],
+                         [('leak.jpg', 'image/png', len(PNG)), ('leak.gif', 'image/gif', len(IMAGE))])
+        self.assertEqual(bytes(FieldMgmtTechnicalImage.objects.get(filename='leak.jpg').image_data), PNG)
+
+    def test_not_an_image(self):
+        response = self.post(photos=SimpleUploadedFile('leak.png', b'<html></html>', content_type='image/png'))
+        self.assert_rejected(response, 'File is not a JPEG, PNG, GIF or WebP image')
+
+    @override_settings(TECHNICAL_IMAGE_MAX_BYTES=len(PNG) - 1)
+    def test_max_bytes(self):
+        response = self.post(photos=SimpleUploadedFile('leak.png', PNG))
+        self.assert_rejected(response, f'File exceeds the {len(PNG) - 1}\xa0bytes limit')
+
+    @override_settings(TECHNICAL_IMAGE_MAX_FILES=1)
+    def test_max_files(self):
+        response = self.post(photos=[SimpleUploadedFile('a.png', PNG), SimpleUploadedFile('b.png', PNG)])
+        self.assert_rejected(response, 'At most 1 photos can be uploaded at once')
+
+    def test_unexpected_field(self):
+        response = self.post(attachment=SimpleUploadedFile('leak.png', PNG))
+        self.assert_rejected(response, "Unexpected file field 'attachment'")
+
+    def test_batches_are_split_by_bytes(self):
+        technical_request = create_technical_request()
+        images = [(f'{index}.png', 'image/png', PNG) for index in range(5)]
+        table = FieldMgmtTechnicalImage._meta.db_table
+        for batch_bytes, inserts in ((len(PNG), 5), (len(PNG) * 2, 3), (len(PNG) * 5, 1), (1, 5)):
+            with self.subTest(batch_bytes=batch_bytes), \
+                    override_settings(TECHNICAL_IMAGE_INSERT_BATCH_BYTES=batch_bytes), \
+                    CaptureQueriesContext(connection) as queries:
+                ids = bulk_insert_images(technical_request, iter(images))
+            self.assertEqual(len(ids), 5)
+            self.assertEqual(len([query for query in queries if query['sql'].startswith(f'INSERT INTO "{table}"')]),
+                             inserts)
+        self.assertEqual(technical_request.images.count(), 20)
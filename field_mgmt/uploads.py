@@ -0,0 +1,153 @@
+"""
+Streaming photo uploads for technical requests.
+
+Multipart files are streamed chunk by chunk to temporary files on disk by
+TechnicalImageUploadHandler, which enforces the size/count limits and checks
+the file signature while the upload is still in flight. The validated files
+are then written to the database with batched bulk INSERTs.
+"""
+from django.conf import settings
+from django.core.files.uploadhandler import SkipFile, TemporaryFileUploadHandler
+from django.db import transaction
+from django.template.defaultfilters import filesizeformat
+
+from sindipro_backend.image_variants import generate_variants_safely
+from .models import FieldMgmtTechnicalImage
+
+PHOTOS_FIELD = 'photos'
+
+# Leading bytes of the image formats browsers can display
+IMAGE_SIGNATURES = (
+    (b'\xff\xd8\xff', 'image/jpeg'),
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (b'GIF87a', 'image/gif'),
+    (b'GIF89a', 'image/gif'),
+)
+
+SNIFF_BYTES = 12
+
+
+def sniff_image_type(header):
+    """Return the MIME type implied by the file's first bytes, or None if it is not a supported image."""
+    header = bytes(header[:SNIFF_BYTES])
+    for signature, mime_type in IMAGE_SIGNATURES:
+        if header.startswith(signature):
+            return mime_type
+    if header[:4] == b'RIFF' and header[8:12] == b'WEBP':
+        return 'image/webp'
+    return None
+
+
+class TechnicalImageUploadHandler(TemporaryFileUploadHandler):
+    """
+    Upload handler that streams each photo to a temporary file.
+
+    Files that are too large, too many, not sent as `photos` or not recognised
+    as images are skipped as soon as that is known (the rest of their stream is
+    discarded) and reported in `rejected`.
+    """
+
+    def __init__(self, request=None):
+        super().__init__(request)
+        self.max_bytes = settings.TECHNICAL_IMAGE_MAX_BYTES
+        self.max_files = settings.TECHNICAL_IMAGE_MAX_FILES
+        self.accepted = 0
+        self.rejected = []
+
+    def reject(self, reason):
+        self.rejected.append({'filename': self.file_name, 'error': reason})
+        raise SkipFile()
+
+    def new_file(self, field_name, file_name, *args, **kwargs):
+        self.sniffed_type = None
+        self.received = 0
+        super().new_file(field_name, file_name, *args, **kwargs)
+        if field_name != PHOTOS_FIELD:
+            self.reject(f"Unexpected file field '{field_name}'")
+        if self.accepted >= self.max_files:
+            self.reject(f'At most {self.max_files} photos can be uploaded at once')
+        self.accepted += 1
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received > self.max_bytes:
+            self.reject(f'File exceeds the {filesizeformat(self.max_bytes)} limit')
+
+        if self.sniffed_type is None:
+            # Chunks are 64 KB, so the signature is always in the first one
+            self.sniffed_type = sniff_image_type(raw_data)
+            if self.sniffed_type is None:
+                self.reject('File is not a JPEG, PNG, GIF or WebP image')
+
+        self.file.write(raw_data)
+
+    def file_complete(self, file_size):
+        if not file_size:
+            self.rejected.append({'filename': self.file_name, 'error': 'File is empty'})
+            self.file.close()
+            return None
+        uploaded = super().file_complete(file_size)
+        # The sniffed type replaces whatever the client claimed
+        uploaded.content_type = self.sniffed_type
+        return uploaded
+
+
+def install_upload_handler(request):
+    """
+    Route the multipart body of `request` (a DRF Request) through
+    TechnicalImageUploadHandler. Must run before request.data is accessed.
+    """
+    handler = TechnicalImageUploadHandler(request._request)
+    request._request.upload_handlers = [handler]
+    return handler
+
+
+def bulk_insert_images(technical_request, images):
+    """
+    Insert images for `technical_request` with as few INSERTs as possible.
+
+    `images` yields (filename, mime_type, source) where source is raw bytes or
+    the path of a temporary file. Files are only read when their batch is
+    written and a batch holds at most TECHNICAL_IMAGE_INSERT_BATCH_BYTES, so
+    memory stays bounded regardless of the number of photos.
+    Returns the ids of the created images.
+    """
+    batch_limit = settings.TECHNICAL_IMAGE_INSERT_BATCH_BYTES
+    created = []  # (image id, source) pairs; the image bytes are not kept around
+    batch, batch_sources = [], []
+    batch_bytes = 0
+
+    def flush():
+        for image, source in zip(FieldMgmtTechnicalImage.objects.bulk_create(batch), batch_sources):
+            created.append((image.id, source))
+        batch.clear()
+        batch_sources.clear()
+
+    with transaction.atomic():
+        for filename, mime_type, source in images:
+            if isinstance(source, (bytes, bytearray)):
+                data = bytes(source)
+            else:
+                with open(source, 'rb') as f:
+                    data = f.read()
+            if batch and batch_bytes + len(data) > batch_limit:
+                flush()
+                batch_bytes = 0
+            batch.append(FieldMgmtTechnicalImage(
+                technical_request=technical_request,
+                image_data=data,
+                mime_type=mime_type,
+                filename=filename
+            ))
+            batch_sources.append(source)
+            batch_bytes += len(data)
+        if batch:
+            flush()
+
+        # bulk_create skips post_save, so render the variants here once committed
+        for image_id, source in created:
+            variant_key = FieldMgmtTechnicalImage(id=image_id).variant_key
+            transaction.on_commit(
+                lambda variant_key=variant_key, source=source: generate_variants_safely(variant_key, source)
+            )
+    return [image_id for image_id, _ in created]
@@ -1,7 +1,11 @@
+from django.conf import settings
 from django.urls import path
 from . import views
 
 urlpatterns = [
     path('requests/', views.field_requests, name='field-requests'),
     path('technical/', views.technical_requests, name='field-technical'),
+    path('requests/photos/<int:id>/', views.field_request_photo, name='field-request-photo'),
+    path('technical/images/<int:id>/', views.technical_image_async if settings.ASYNC_VIEWS else views.technical_image,
+         name='field-technical-image'),
 ]
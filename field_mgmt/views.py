@@ -2,12 +2,34 @@ from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
+import logging
+import re
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Prefetch
+from django.db.models.functions import Length, Substr
+from django.http import FileResponse, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
 from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_safe
 from django.utils.decorators import method_decorator
-from .models import FieldRequest, FieldMgmtTechnical
+from sindipro_backend.async_views import authenticated, stream_async
+from sindipro_backend.image_variants import ORIGINAL, invalid_size_response, variant_response
+from sindipro_backend.instrumentation import query_budget
+from sindipro_backend.pagination import KeysetCursorPagination
+from building_mgmt.access import building_access
+from building_mgmt.views import user_can_access_building
+from .models import FieldRequest, FieldRequestPhoto, FieldMgmtTechnical, FieldMgmtTechnicalImage
 from .serializers import FieldRequestSerializer, FieldMgmtTechnicalSerializer
+from .uploads import PHOTOS_FIELD, bulk_insert_images, install_upload_handler
+
+logger = logging.getLogger(__name__)
 
 
+@query_budget(3)
 @csrf_exempt
 @api_view(['GET', 'POST'])
 @permission_classes([IsAuthenticated])
@@ -18,23 +40,39 @@ def field_requests(request):
     Expected POST data: {building_id, caretaker, title, items}
     """
     if request.method == 'GET':
-        requests = FieldRequest.objects.all().order_by('-created_at')
+        requests = building_access(request).filter_queryset(
+            FieldRequest.objects.select_related('building'), module='field_requests'
+        ).order_by('-created_at')
+
+        # Opt-in cursor pagination (?cursor= / ?limit=)
+        paginator = KeysetCursorPagination(ordering=('-created_at', '-id'))
+        page = paginator.paginate_queryset(requests, request)
+        if page is not None:
+            return paginator.get_paginated_response(FieldRequestSerializer(page, many=True).data)
+
         serializer = FieldRequestSerializer(requests, many=True)
         return Response(serializer.data)
     
     elif request.method == 'POST':
-        print(f"Request data: {request.data}")  # Debug logging
-        print(f"Request content type: {request.content_type}")  # Debug logging
+        logger.debug("field_requests: content type %s, data %s", request.content_type, request.data)
         
         serializer = FieldRequestSerializer(data=request.data)
+        if serializer.is_valid() and not user_can_access_building(
+            request, serializer.validated_data['building'].id, module='field_requests', edit=True
+        ):
+            return Response({
+                'error': 'Building not found or access denied'
+            }, status=status.HTTP_404_NOT_FOUND)
+        
         if serializer.is_valid():
             serializer.save()
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         
-        print(f"Serializer errors: {serializer.errors}")  # Debug logging
+        logger.debug("field_requests: serializer errors %s", serializer.errors)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+@query_budget(3)
 @csrf_exempt
 @api_view(['GET', 'POST'])
 @permission_classes([IsAuthenticated])
@@ -43,19 +81,303 @@ def technical_requests(request):
     GET: Retrieve all technical field requests.
     POST: Create a new technical field request.
     Expected POST data: {company_email, title, description, location, priority, photos}
+    Photos are sent either as multipart/form-data files (streamed to disk) or,
+    in a JSON body, as base64 data URLs.
     """
     if request.method == 'GET':
-        requests = FieldMgmtTechnical.objects.all().order_by('-created_at')
-        serializer = FieldMgmtTechnicalSerializer(requests, many=True)
+        requests = technical_requests_queryset().order_by('-created_at')
+
+        # Opt-in cursor pagination (?cursor= / ?limit=)
+        paginator = KeysetCursorPagination(ordering=('-created_at', '-id'))
+        page = paginator.paginate_queryset(requests, request)
+        if page is not None:
+            return paginator.get_paginated_response(
+                FieldMgmtTechnicalSerializer(page, many=True, context={'request': request}).data
+            )
+
+        serializer = FieldMgmtTechnicalSerializer(requests, many=True, context={'request': request})
         return Response(serializer.data)
     
     elif request.method == 'POST':
-        print(f"Technical request data: {request.data}")  # Debug logging
+        if request.content_type.startswith('multipart/form-data'):
+            return create_technical_request_multipart(request)
+
+        logger.debug("technical_requests: data %s", request.data)
         
-        serializer = FieldMgmtTechnicalSerializer(data=request.data)
+        serializer = FieldMgmtTechnicalSerializer(data=request.data, context={'request': request})
         if serializer.is_valid():
-            serializer.save()
-            return Response(serializer.data, status=status.HTTP_201_CREATED)
+            technical_request = serializer.save()
+            # Re-read with the listing queryset so the response does not load the image blobs
+            technical_request = technical_requests_queryset().get(id=technical_request.id)
+            return Response(
+                FieldMgmtTechnicalSerializer(technical_request, context={'request': request}).data,
+                status=status.HTTP_201_CREATED
+            )
         
-        print(f"Technical serializer errors: {serializer.errors}")  # Debug logging
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
\ No newline at end of file
+        logger.debug("technical_requests: serializer errors %s", serializer.errors)
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+def technical_requests_queryset():
+    """Technical requests with their image metadata; the blobs are served by technical_image."""
+    images = FieldMgmtTechnicalImage.objects.defer('image_data').annotate(size=Length('image_data'))
+    return FieldMgmtTechnical.objects.prefetch_related(Prefetch('images', queryset=images))
+
+
+def create_technical_request_multipart(request):
+    """
+    Create a technical request from a multipart/form-data body.
+    Photos (`photos` file fields) are streamed to temporary files, validated
+    while uploading and inserted with batched bulk INSERTs.
+    """
+    handler = install_upload_handler(request)
+    data = {key: value for key, value in request.data.items() if key != PHOTOS_FIELD}
+
+    if handler.rejected:
+        return Response({
+            'error': 'Invalid photos',
+            'details': handler.rejected
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    serializer = FieldMgmtTechnicalSerializer(data=data, context={'request': request})
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    photos = request.FILES.getlist(PHOTOS_FIELD)
+    with transaction.atomic():
+        technical_request = serializer.save()
+        bulk_insert_images(technical_request, (
+            (photo.name[:255], photo.content_type, photo.temporary_file_path())
+            for photo in photos
+        ))
+
+    technical_request = technical_requests_queryset().get(id=technical_request.id)
+    return Response(
+        FieldMgmtTechnicalSerializer(technical_request, context={'request': request}).data,
+        status=status.HTTP_201_CREATED
+    )
+
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def parse_byte_range(header, size):
+    """
+    Parse a single-range `Range: bytes=start-end` header.
+    Returns (start, end) inclusive, None when the header should be ignored
+    (missing, malformed or multi-range), or 'unsatisfiable'.
+    """
+    match = RANGE_RE.match(header.strip()) if header else None
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0:
+            return 'unsatisfiable'
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or end < start:
+        return 'unsatisfiable'
+    return start, end
+
+
+@api_view(['GET', 'HEAD'])
+@permission_classes([IsAuthenticated])
+def technical_image(request, id):
+    """
+    GET: Raw bytes of a technical request image, streamed from the database in
+    TECHNICAL_IMAGE_STREAM_CHUNK_BYTES slices.
+    Supports conditional requests (ETag / Last-Modified) and single byte ranges.
+    Query params: size=original|thumb|medium|webp (default original)
+    """
+    size = request.query_params.get('size', ORIGINAL)
+    error_response = invalid_size_response(size)
+    if error_response:
+        return error_response
+
+    image = (
+        FieldMgmtTechnicalImage.objects
+        .defer('image_data')
+        .annotate(size=Length('image_data'))
+        .filter(id=id)
+        .first()
+    )
+    if not image:
+        return Response({
+            'error': 'Image not found'
+        }, status=status.HTTP_404_NOT_FOUND)
+
+    if size != ORIGINAL:
+        return variant_response(
+            request, image.variant_key, size,
+            lambda: FieldMgmtTechnicalImage.objects.filter(id=id).values_list('image_data', flat=True).first()
+        )
+
+    etag, last_modified = image_validators(image)
+    not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if not_modified is not None:
+        return not_modified
+
+    size = image.size or 0
+    byte_range = requested_range(request, size, etag, last_modified)
+    if byte_range == 'unsatisfiable':
+        return unsatisfiable_response(size)
+
+    start, end = byte_range or (0, size - 1)
+    response_status = status.HTTP_206_PARTIAL_CONTENT if byte_range else status.HTTP_200_OK
+    if request.method == 'HEAD' or not size:
+        response = HttpResponse(b'', content_type=image.mime_type, status=response_status)
+    else:
+        # The database slices the blob: only one chunk is in memory at a time
+        response = StreamingHttpResponse(
+            read_image_data(id, start, end), content_type=image.mime_type, status=response_status
+        )
+    return image_response_headers(response, image, etag, last_modified, byte_range, size)
+
+
+def image_validators(image):
+    """(ETag, Last-Modified timestamp) of a technical image."""
+    # Images are never edited after upload, so id + upload time identifies the content
+    etag = quote_etag(f"{image.id}-{int(image.uploaded_at.timestamp())}-{image.size}")
+    return etag, int(image.uploaded_at.timestamp())
+
+
+def requested_range(request, size, etag, last_modified):
+    """The byte range to serve (see parse_byte_range), honouring If-Range."""
+    byte_range = parse_byte_range(request.META.get('HTTP_RANGE'), size)
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if byte_range and if_range and if_range not in (etag, http_date(last_modified)):
+        # Representation changed since the client's partial copy: send it whole
+        return None
+    return byte_range
+
+
+def unsatisfiable_response(size):
+    response = HttpResponse(status=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE)
+    response['Content-Range'] = f'bytes */{size}'
+    return response
+
+
+def image_response_headers(response, image, etag, last_modified, byte_range, size):
+    start, end = byte_range or (0, size - 1)
+    response['Content-Length'] = end - start + 1 if size else 0
+    if byte_range:
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    response['Accept-Ranges'] = 'bytes'
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    response['Cache-Control'] = 'private, max-age=86400'
+    if image.filename:
+        response['Content-Disposition'] = f'inline; filename="{image.filename}"'
+    return response
+
+
+def image_chunks(image_id, start, end):
+    """Querysets of the TECHNICAL_IMAGE_STREAM_CHUNK_BYTES slices covering bytes start..end of an image."""
+    images = FieldMgmtTechnicalImage.objects.filter(id=image_id)
+    chunk_bytes = settings.TECHNICAL_IMAGE_STREAM_CHUNK_BYTES
+    for position in range(start, end + 1, chunk_bytes):
+        length = min(chunk_bytes, end - position + 1)
+        yield images.annotate(chunk=Substr('image_data', position + 1, length)).values_list('chunk', flat=True)
+
+
+def read_image_data(image_id, start, end):
+    """Yield bytes start..end of an image blob, one database slice per chunk."""
+    for chunk_query in image_chunks(image_id, start, end):
+        chunk = chunk_query.first()
+        if not chunk:
+            return
+        yield bytes(chunk)
+
+
+async def stream_image_data(image_id, start, end):
+    """read_image_data() with the async ORM."""
+    for chunk_query in image_chunks(image_id, start, end):
+        chunk = await chunk_query.afirst()
+        if not chunk:
+            return
+        yield bytes(chunk)
+
+
+@require_safe
+@authenticated
+async def technical_image_async(request, id):
+    """
+    technical_image for ASGI mode (settings.ASYNC_VIEWS): same responses, with
+    the blob slices read by the async ORM, so sending a large image to a slow
+    client does not hold a worker thread.
+    """
+    size = request.GET.get('size', ORIGINAL)
+    error_response = invalid_size_response(size, JsonResponse)
+    if error_response:
+        return error_response
+
+    image = await (
+        FieldMgmtTechnicalImage.objects
+        .defer('image_data')
+        .annotate(size=Length('image_data'))
+        .filter(id=id)
+        .afirst()
+    )
+    if not image:
+        return JsonResponse({
+            'error': 'Image not found'
+        }, status=status.HTTP_404_NOT_FOUND)
+
+    if size != ORIGINAL:
+        # Variants are files on disk (rendered by Pillow on a miss)
+        return stream_async(await sync_to_async(variant_response)(
+            request, image.variant_key, size,
+            lambda: FieldMgmtTechnicalImage.objects.filter(id=id).values_list('image_data', flat=True).first(),
+            response_class=JsonResponse,
+        ))
+
+    etag, last_modified = image_validators(image)
+    not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if not_modified is not None:
+        return not_modified
+
+    size = image.size or 0
+    byte_range = requested_range(request, size, etag, last_modified)
+    if byte_range == 'unsatisfiable':
+        return unsatisfiable_response(size)
+
+    start, end = byte_range or (0, size - 1)
+    response_status = status.HTTP_206_PARTIAL_CONTENT if byte_range else status.HTTP_200_OK
+    if request.method == 'HEAD' or not size:
+        response = HttpResponse(b'', content_type=image.mime_type, status=response_status)
+    else:
+        response = StreamingHttpResponse(
+            stream_image_data(id, start, end), content_type=image.mime_type, status=response_status
+        )
+    return image_response_headers(response, image, etag, last_modified, byte_range, size)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def field_request_photo(request, id):
+    """
+    GET: A field request photo, from a building the user can view field requests of.
+    Query params: size=original|thumb|medium|webp (default original)
+    """
+    size = request.query_params.get('size', ORIGINAL)
+    error_response = invalid_size_response(size)
+    if error_response:
+        return error_response
+
+    photo = building_access(request).filter_queryset(
+        FieldRequestPhoto.objects.filter(id=id), field='field_request__building_id', module='field_requests'
+    ).first()
+    if not photo or not photo.photo:
+        return Response({
+            'error': 'Photo not found'
+        }, status=status.HTTP_404_NOT_FOUND)
+
+    if size == ORIGINAL:
+        return FileResponse(photo.photo.open('rb'))
+    return variant_response(request, photo.variant_key, size, lambda: photo.photo.path)
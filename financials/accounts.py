@@ -0,0 +1,117 @@
+"""
+Chart of accounts trees.
+
+A building's accounts are read flat in one query and assembled in O(n):
+children are attached through an id index, then one pass over the nodes in
+reverse breadth-first order rolls every subtree's expected/actual amounts up
+into its parent. A single subtree can be read with a recursive CTE instead of
+loading the whole chart.
+"""
+from collections import deque
+from decimal import Decimal
+
+from django.db import connection
+
+from .models import FinancialMainAccount
+
+ZERO = Decimal('0.00')
+
+ACCOUNT_FIELDS = ('id', 'code', 'name', 'type', 'parent_id', 'expected_amount', 'actual_amount')
+
+SUBTREE_SQL = """
+WITH RECURSIVE subtree AS (
+    SELECT {fields} FROM {table} WHERE id = %s AND building_id = %s
+    UNION
+    SELECT {child_fields} FROM {table} child
+    JOIN subtree ON child.parent_id = subtree.id
+    WHERE child.building_id = %s
+)
+SELECT {fields} FROM subtree ORDER BY code
+"""
+
+
+def account_rows(building_id):
+    """Every account of a building, ordered by code (one query)."""
+    return list(
+        FinancialMainAccount.objects.filter(building_id=building_id).order_by('code').values(*ACCOUNT_FIELDS)
+    )
+
+
+def subtree_rows(building_id, root_id):
+    """The account `root_id` and all its descendants, ordered by code (one recursive query)."""
+    quote = connection.ops.quote_name
+    sql = SUBTREE_SQL.format(
+        table=quote(FinancialMainAccount._meta.db_table),
+        fields=', '.join(quote(field) for field in ACCOUNT_FIELDS),
+        child_fields=', '.join(f'child.{quote(field)}' for field in ACCOUNT_FIELDS),
+    )
+    # Raw SQL returns driver values (SQLite decimals as floats); normalise like the ORM
+    amount = FinancialMainAccount._meta.get_field('expected_amount')
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [root_id, building_id, building_id])
+        rows = [dict(zip(ACCOUNT_FIELDS, row)) for row in cursor.fetchall()]
+    for row in rows:
+        row['expected_amount'] = amount.to_python(row['expected_amount'])
+        row['actual_amount'] = amount.to_python(row['actual_amount'])
+    return rows
+
+
+def _money(value):
+    return str((value or ZERO).quantize(ZERO))
+
+
+def build_account_tree(rows):
+    """
+    Nest account rows (as returned above) by parent and precompute subtree totals.
+    Rows whose parent is not among them become roots, as does any account caught
+    in a parent cycle. Returns the list of root nodes.
+    """
+    nodes = {}
+    for row in rows:
+        nodes[row['id']] = {
+            'id': row['id'],
+            'code': row['code'],
+            'name': row['name'],
+            'type': row['type'],
+            'parentId': row['parent_id'],
+            'expectedAmount': row['expected_amount'] or ZERO,
+            'actualAmount': row['actual_amount'] or ZERO,
+            'totalExpectedAmount': row['expected_amount'] or ZERO,
+            'totalActualAmount': row['actual_amount'] or ZERO,
+            'children': [],
+        }
+
+    roots = [node for node in nodes.values() if node['parentId'] not in nodes]
+    root_ids = {node['id'] for node in roots}
+    for node in nodes.values():
+        if node['parentId'] in nodes:
+            nodes[node['parentId']]['children'].append(node)
+
+    # Breadth-first order from the roots; parents always come before their children
+    order = []
+    visited = set()
+    queue = deque(roots)
+    while queue or len(visited) < len(nodes):
+        if not queue:
+            # Only accounts in a parent cycle are left: promote one to a root
+            orphan = next(node for node_id, node in nodes.items() if node_id not in visited)
+            parent = nodes[orphan['parentId']]
+            parent['children'] = [child for child in parent['children'] if child is not orphan]
+            roots.append(orphan)
+            root_ids.add(orphan['id'])
+            queue.append(orphan)
+        node = queue.popleft()
+        visited.add(node['id'])
+        order.append(node)
+        queue.extend(node['children'])
+
+    for node in reversed(order):
+        if node['id'] not in root_ids:
+            parent = nodes[node['parentId']]
+            parent['totalExpectedAmount'] += node['totalExpectedAmount']
+            parent['totalActualAmount'] += node['totalActualAmount']
+
+    for node in order:
+        for key in ('expectedAmount', 'actualAmount', 'totalExpectedAmount', 'totalActualAmount'):
+            node[key] = _money(node[key])
+    return roots
@@ -4,3 +4,19 @@ from django.apps import AppConfig
 class FinancialsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'financials'
+
+    def ready(self):
+        # MonthlyFinancialSnapshot maintenance
+        from . import signals  # noqa: F401
+
+        # Cached financial lists (sindipro_backend.caching)
+        from sindipro_backend.caching import register_cache_dependency
+        from .models import AnnualBudget, BudgetCategory, Collection, Expense, FinancialMainAccount
+
+        register_cache_dependency(FinancialMainAccount, 'financial_account')
+        register_cache_dependency(AnnualBudget, 'annual_budget')
+        register_cache_dependency(Expense, 'expense')
+        register_cache_dependency(Collection, 'collection')
+        # Categories are shared by every building
+        register_cache_dependency(BudgetCategory, 'annual_budget', building_field=None)
+        register_cache_dependency(BudgetCategory, 'expense', building_field=None)
@@ -0,0 +1,159 @@
+"""
+Batch creation of expenses, budgets and collections.
+
+A batch is validated as a whole with the single-item serializers (plus the
+building access and budget uniqueness checks) and every problem is reported
+per item; only a fully valid batch is written. Category names are resolved
+with one query plus one bulk_create for the missing ones, rows are inserted
+with bulk_create in one transaction, and since bulk_create skips model
+signals the touched snapshot cells and cache tags are refreshed here.
+"""
+from django.conf import settings
+from django.db import IntegrityError, transaction
+
+from building_mgmt.access import building_access
+from building_mgmt.models import Building
+from sindipro_backend.caching import invalidate_tags
+from . import snapshots
+from .models import AnnualBudget, BudgetCategory, Expense
+
+
+class BatchError(Exception):
+    """The batch was rejected; `details` lists {'index', 'errors'} per failing item."""
+
+    def __init__(self, message, details=None):
+        super().__init__(message)
+        self.message = message
+        self.details = details or []
+
+
+def resolve_categories(names):
+    """{name: BudgetCategory} for `names`, creating the missing ones."""
+    names = set(names)
+    categories = {category.name: category for category in BudgetCategory.objects.filter(name__in=names)}
+    missing = [
+        BudgetCategory(name=name, description=f'Category for {name}')
+        for name in sorted(names - categories.keys())
+    ]
+    if missing:
+        try:
+            with transaction.atomic():
+                created = BudgetCategory.objects.bulk_create(missing)
+            categories.update((category.name, category) for category in created)
+        except IntegrityError:
+            # Created concurrently: read them back
+            BudgetCategory.objects.bulk_create(missing, ignore_conflicts=True)
+            categories.update(
+                (category.name, category)
+                for category in BudgetCategory.objects.filter(name__in=[c.name for c in missing])
+            )
+    return categories
+
+
+def validate_batch(request, items, serializer_class):
+    """Validate every item; returns [(index, serializer)] or raises BatchError."""
+    if not isinstance(items, list) or not items:
+        raise BatchError('Expected a non-empty list of items')
+    if len(items) > settings.FINANCIAL_BULK_MAX_ITEMS:
+        raise BatchError(f'At most {settings.FINANCIAL_BULK_MAX_ITEMS} items per request')
+
+    access = building_access(request)
+    valid, errors = [], []
+    for index, item in enumerate(items):
+        serializer = serializer_class(data=item, context={'request': request})
+        if not serializer.is_valid():
+            errors.append({'index': index, 'errors': serializer.errors})
+        else:
+            valid.append((index, serializer))
+
+    # Access grants alone don't prove the building exists (master users may reach any id)
+    building_ids = {serializer.validated_data['building_id'] for _, serializer in valid}
+    existing = set(Building.objects.filter(id__in=building_ids).values_list('id', flat=True))
+    for index, serializer in valid:
+        building_id = serializer.validated_data['building_id']
+        if building_id not in existing or not access.can_access(building_id, module='financial', edit=True):
+            errors.append({'index': index, 'errors': {'buildingId': ['Building not found or access denied']}})
+    if errors:
+        errors.sort(key=lambda error: error['index'])
+        raise BatchError('Invalid data', errors)
+    return valid
+
+
+def check_budget_duplicates(budgets):
+    """Reject budgets clashing with each other or with stored ones (unique per building/year/category/sub-item)."""
+    keys = {}
+    errors = []
+    for index, budget in budgets:
+        key = (budget.building_id, budget.year, budget.category_id, budget.sub_item)
+        if key in keys:
+            errors.append({'index': index, 'errors': {'non_field_errors': [
+                f'Duplicates item {keys[key]} (same building, year, category and sub item)'
+            ]}})
+        keys.setdefault(key, index)
+
+    existing = set(
+        AnnualBudget.objects.filter(
+            building_id__in={key[0] for key in keys},
+            year__in={key[1] for key in keys},
+            category_id__in={key[2] for key in keys},
+            sub_item__in={key[3] for key in keys},
+        ).values_list('building_id', 'year', 'category_id', 'sub_item')
+    )
+    for key in existing & keys.keys():
+        errors.append({'index': keys[key], 'errors': {'non_field_errors': [
+            'A budget for this building, year, category and sub item already exists'
+        ]}})
+    if errors:
+        raise BatchError('Invalid data', sorted(errors, key=lambda error: error['index']))
+
+
+def refresh_after_insert(model, objects):
+    """Redo what post_save would have done for `objects`: snapshot cells and cache tags."""
+    building_ids = {obj.building_id for obj in objects}
+    if model is Expense:
+        cells = {(e.building_id, e.category_id, e.expense_date.year, e.expense_date.month) for e in objects}
+        for cell in cells:
+            snapshots.refresh_expense_cell(*cell)
+        tag = 'expense'
+    elif model is AnnualBudget:
+        for cell in {(b.building_id, b.category_id, b.year) for b in objects}:
+            snapshots.refresh_budget_cells(*cell)
+        tag = 'annual_budget'
+    else:
+        for building_id in building_ids:
+            snapshots.refresh_collection_cells(building_id)
+        tag = 'collection'
+
+    def invalidate():
+        for building_id in building_ids:
+            invalidate_tags(tag, building_id=building_id)
+    transaction.on_commit(invalidate)
+
+
+def create_batch(request, items, serializer_class):
+    """
+    Validate and insert a batch with `serializer_class` (ExpenseSerializer,
+    AnnualBudgetSerializer or CollectionSerializer). Returns the created objects
+    in input order; raises BatchError without writing anything.
+    """
+    valid = validate_batch(request, items, serializer_class)
+    model = serializer_class.Meta.model
+    category_field = serializer_class.category_field
+
+    with transaction.atomic():
+        categories = resolve_categories(
+            serializer.validated_data[category_field] for _, serializer in valid
+        ) if category_field else {}
+        objects = [
+            (index, serializer.build(
+                serializer.validated_data,
+                categories[serializer.validated_data[category_field]] if category_field else None,
+            ))
+            for index, serializer in valid
+        ]
+        if model is AnnualBudget:
+            check_budget_duplicates(objects)
+
+        created = model.objects.bulk_create([obj for _, obj in objects], batch_size=settings.FINANCIAL_BULK_BATCH_SIZE)
+        refresh_after_insert(model, created)
+    return created
@@ -0,0 +1,592 @@
+"""
+CSV/XLSX import of expenses, annual budgets and the chart of accounts.
+
+Files are streamed: CSV lines are decoded lazily and XLSX sheets are read
+with a read-only workbook, so only one chunk of FINANCIAL_BULK_BATCH_SIZE rows
+is parsed at a time. Every row is validated with the model fields' own
+clean(); valid chunks are written with bulk_create while the file is being
+read, all inside one transaction that is rolled back on any row error (or on
+a dry run), so an import is all-or-nothing and errors are reported per row.
+
+What is kept across chunks is small: category ids, the touched snapshot cells
+and, for the chart of accounts, one code -> id entry per account so parent
+codes are resolved in memory. A parent that appears later in the file than
+its child is linked with bulk_update once the whole file has been read.
+"""
+import abc
+import codecs
+import csv
+import datetime
+import itertools
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from openpyxl import load_workbook
+from rest_framework import status
+
+from sindipro_backend.caching import invalidate_tags
+from . import snapshots
+from .bulk import resolve_categories
+from .models import AnnualBudget, BudgetCategory, Expense, FinancialMainAccount
+
+IMPORT_EXTENSIONS = ('.csv', '.xlsx')
+CSV_DELIMITERS = ',;\t'
+
+
+class FinancialImportError(Exception):
+    """The file can't be imported at all (unreadable, unknown columns...)."""
+
+
+class RowError(Exception):
+    def __init__(self, errors):
+        super().__init__(errors)
+        self.errors = errors
+
+
+def _normalize_header(value):
+    return str(value).strip().lower().replace(' ', '_') if value is not None else ''
+
+
+def _normalize_decimal(value):
+    """Accept both 1234.56 and the Brazilian 1.234,56 notation."""
+    if isinstance(value, (int, float, Decimal)):
+        return str(value)
+    value = str(value).strip().replace(' ', '')
+    if ',' in value:
+        if '.' in value and value.rfind('.') > value.rfind(','):
+            value = value.replace(',', '')
+        else:
+            value = value.replace('.', '').replace(',', '.')
+    return value
+
+
+def _normalize_date(value):
+    """Accept spreadsheet dates, ISO dates and DD/MM/YYYY."""
+    if isinstance(value, datetime.datetime):
+        return value.date()
+    if isinstance(value, datetime.date):
+        return value
+    value = str(value).strip()
+    try:
+        return datetime.datetime.strptime(value, '%d/%m/%Y').date()
+    except ValueError:
+        return value
+
+
+def _normalize_int(value):
+    # Spreadsheets store whole numbers as floats (2024.0)
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return str(value).strip()
+
+
+def _normalize_text(value):
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip()
+
+
+class ImportSource:
+    """Header and data rows of an uploaded CSV or XLSX file."""
+
+    def __init__(self, upload, filename, encoding='utf-8-sig'):
+        self.upload = upload
+        self.workbook = None
+        name = filename.lower()
+        try:
+            if name.endswith('.xlsx'):
+                self.workbook = load_workbook(upload, read_only=True, data_only=True)
+                sheet = self.workbook.active
+                self.total = max((sheet.max_row or 0) - 1, 0)
+                self._rows = sheet.iter_rows(values_only=True)
+            elif name.endswith('.csv'):
+                self.total = None
+                self._rows = self._csv_rows(encoding)
+            else:
+                raise FinancialImportError(
+                    f"Invalid file type. Please upload one of: {', '.join(IMPORT_EXTENSIONS)}"
+                )
+            self.header = [_normalize_header(value) for value in next(self._rows, None) or []]
+        except FinancialImportError:
+            self.close()
+            raise
+        except (LookupError, UnicodeDecodeError, csv.Error) as e:
+            self.close()
+            raise FinancialImportError(f'Error reading CSV file: {e}')
+        except Exception as e:
+            self.close()
+            raise FinancialImportError(f'Error reading file: {e}')
+        if not any(self.header):
+            self.close()
+            raise FinancialImportError('The file has no header row')
+
+    def _csv_rows(self, encoding):
+        self.upload.seek(0)
+        lines = codecs.iterdecode(self.upload, encoding)
+        first = next(lines, '')
+        try:
+            dialect = csv.Sniffer().sniff(first, delimiters=CSV_DELIMITERS)
+        except csv.Error:
+            dialect = csv.excel
+        return csv.reader(itertools.chain([first], lines), dialect)
+
+    def rows(self):
+        """Yield (row_number, values) for every non-empty data row; the header is row 1."""
+        try:
+            for row_num, values in enumerate(self._rows, 2):
+                if any(value not in (None, '') for value in values):
+                    yield row_num, values
+        except (UnicodeDecodeError, csv.Error) as e:
+            raise FinancialImportError(f'Error reading CSV file: {e}')
+
+    def progress(self, rows_done):
+        """(done, total) for progress reporting: rows for XLSX, bytes for CSV."""
+        if self.total is not None:
+            return rows_done, self.total
+        try:
+            return self.upload.tell(), self.upload.size
+        except (AttributeError, OSError):
+            return 0, 0
+
+    def close(self):
+        if self.workbook is not None:
+            self.workbook.close()
+            self.workbook = None
+
+
+class ImportReport:
+    """Counters and per-row errors (capped at FINANCIAL_IMPORT_MAX_ERRORS)."""
+
+    def __init__(self):
+        self.rows = 0
+        self.created = 0
+        self.error_count = 0
+        self.errors = []
+
+    def add_error(self, row_num, errors):
+        self.error_count += 1
+        if len(self.errors) < settings.FINANCIAL_IMPORT_MAX_ERRORS:
+            self.errors.append({'row': row_num, 'errors': errors})
+
+
+class RowImporter(abc.ABC):
+    """
+    Base importer: `fields` maps every column to (model field, normalizer,
+    required, default); subclasses build model instances and finish the import.
+    """
+    model = None
+    fields = {}
+
+    def __init__(self, building, user, report, write):
+        self.building = building
+        self.user = user
+        self.report = report
+        self.write = write
+
+    def clean_row(self, values):
+        cleaned, errors = {}, {}
+        for column, (field_name, normalize, required, default) in self.fields.items():
+            raw = values.get(column)
+            if raw is None or (isinstance(raw, str) and not raw.strip()):
+                if required:
+                    errors[column] = ['This field is required.']
+                else:
+                    cleaned[column] = default() if callable(default) else default
+                continue
+            model, _, name = field_name.rpartition('.')
+            field = (BudgetCategory if model == 'category' else self.model)._meta.get_field(name)
+            try:
+                cleaned[column] = field.clean(normalize(raw), None)
+            except ValidationError as e:
+                errors[column] = e.messages
+        if errors:
+            raise RowError(errors)
+        return cleaned
+
+    @abc.abstractmethod
+    def build(self, rows):
+        """[(row_num, cleaned)] -> [(row_num, unsaved instance)]; may report row errors."""
+
+    def process(self, chunk):
+        """Validate a chunk of (row_num, values) and insert it while the import is still clean."""
+        cleaned = []
+        for row_num, values in chunk:
+            self.report.rows += 1
+            try:
+                cleaned.append((row_num, self.clean_row(values)))
+            except RowError as e:
+                self.report.add_error(row_num, e.errors)
+        objects = self.build(cleaned)
+        if self.write and not self.report.error_count and objects:
+            self.insert(objects)
+
+    def insert(self, objects):
+        self.model.objects.bulk_create([obj for _, obj in objects])
+        self.report.created += len(objects)
+        self.inserted(objects)
+
+    def inserted(self, objects):
+        pass
+
+    def finish(self):
+        pass
+
+
+class CategoryImporter(RowImporter):
+    """Importers of rows carrying a budget category name."""
+    tag = None
+
+    def __init__(self, *args):
+        super().__init__(*args)
+        self.categories = {}
+
+    def category_ids(self, names):
+        missing = set(names) - self.categories.keys()
+        if missing:
+            self.categories.update(
+                (name, category.id) for name, category in resolve_categories(missing).items()
+            )
+        return self.categories
+
+    def finish(self):
+        building_id = self.building.id
+        transaction.on_commit(lambda: invalidate_tags(self.tag, building_id=building_id))
+
+
+class ExpenseImporter(CategoryImporter):
+    model = Expense
+    tag = 'expense'
+    fields = {
+        'date': ('expense_date', _normalize_date, True, None),
+        'amount': ('amount', _normalize_decimal, True, None),
+        'category': ('category.name', _normalize_text, True, None),
+        'description': ('description', _normalize_text, False, ''),
+        'expense_type': ('expense_type', _normalize_text, False, 'operational'),
+        'vendor': ('vendor', _normalize_text, False, ''),
+        'invoice_number': ('invoice_number', _normalize_text, False, ''),
+        'payment_method': ('payment_method', _normalize_text, False, ''),
+        'notes': ('notes', _normalize_text, False, ''),
+    }
+
+    def __init__(self, *args):
+        super().__init__(*args)
+        self.cells = set()
+
+    def build(self, rows):
+        categories = self.category_ids(row['category'] for _, row in rows)
+        return [
+            (row_num, Expense(
+                building=self.building,
+                category_id=categories[row['category']],
+                expense_type=row['expense_type'],
+                description=row['description'] or f"{row['category']} expense for {row['date']:%Y-%m}",
+                amount=row['amount'],
+                expense_date=row['date'],
+                vendor=row['vendor'],
+                invoice_number=row['invoice_number'],
+                payment_method=row['payment_method'],
+                notes=row['notes'],
+                created_by=self.user,
+            ))
+            for row_num, row in rows
+        ]
+
+    def inserted(self, objects):
+        self.cells.update(
+            (obj.category_id, obj.expense_date.year, obj.expense_date.month) for _, obj in objects
+        )
+
+    def finish(self):
+        if self.report.error_count:
+            return
+        # bulk_create skips the signals that maintain the snapshot
+        for category_id, year, month in sorted(self.cells):
+            snapshots.refresh_expense_cell(self.building.id, category_id, year, month)
+        super().finish()
+
+
+class AnnualBudgetImporter(CategoryImporter):
+    model = AnnualBudget
+    tag = 'annual_budget'
+    fields = {
+        'year': ('year', _normalize_int, False, lambda: datetime.date.today().year),
+        'category': ('category.name', _normalize_text, True, None),
+        'sub_item': ('sub_item', _normalize_text, False, ''),
+        'budgeted_amount': ('budgeted_amount', _normalize_decimal, True, None),
+    }
+
+    def __init__(self, *args):
+        super().__init__(*args)
+        self.seen = {}
+        self.cells = set()
+
+    def build(self, rows):
+        categories = self.category_ids(row['category'] for _, row in rows)
+        budgets = [
+            (row_num, AnnualBudget(
+                building=self.building,
+                year=row['year'],
+                category_id=categories[row['category']],
+                sub_item=row['sub_item'],
+                budgeted_amount=row['budgeted_amount'],
+                created_by=self.user,
+            ))
+            for row_num, row in rows
+        ]
+
+        keys = {(b.year, b.category_id, b.sub_item) for _, b in budgets}
+        stored = set(
+            AnnualBudget.objects.filter(
+                building=self.building,
+                year__in={key[0] for key in keys},
+                category_id__in={key[1] for key in keys},
+                sub_item__in={key[2] for key in keys},
+            ).values_list('year', 'category_id', 'sub_item')
+        ) if keys else set()
+
+        unique = []
+        for row_num, budget in budgets:
+            key = (budget.year, budget.category_id, budget.sub_item)
+            if key in self.seen:
+                self.report.add_error(row_num, {'non_field_errors': [
+                    f'Duplicates row {self.seen[key]} (same year, category and sub item)'
+                ]})
+            elif key in stored:
+                self.report.add_error(row_num, {'non_field_errors': [
+                    'A budget for this year, category and sub item already exists'
+                ]})
+            else:
+                self.seen[key] = row_num
+                unique.append((row_num, budget))
+        return unique
+
+    def inserted(self, objects):
+        self.cells.update((obj.category_id, obj.year) for _, obj in objects)
+
+    def finish(self):
+        if self.report.error_count:
+            return
+        for category_id, year in sorted(self.cells):
+            snapshots.refresh_budget_cells(self.building.id, category_id, year)
+        super().finish()
+
+
+class AccountImporter(RowImporter):
+    """
+    Chart of accounts rows. The parent is the `parent_code` column, or else
+    the code minus its last dotted segment ("1.2.3" -> "1.2") when such an
+    account exists; an explicit parent that can't be found is an error.
+    """
+    model = FinancialMainAccount
+    fields = {
+        'code': ('code', _normalize_text, True, None),
+        'name': ('name', _normalize_text, True, None),
+        'type': ('type', _normalize_text, True, None),
+        'parent_code': ('code', _normalize_text, False, ''),
+        'expected_amount': ('expected_amount', _normalize_decimal, False, Decimal('0.00')),
+        'actual_amount': ('actual_amount', _normalize_decimal, False, Decimal('0.00')),
+    }
+
+    def __init__(self, *args):
+        super().__init__(*args)
+        self.stored = dict(
+            FinancialMainAccount.objects.filter(building=self.building).values_list('code', 'id')
+        )
+        # code -> id of the file's accounts (None until inserted) and their row numbers
+        self.ids = {}
+        self.row_nums = {}
+        # (row_num, code, parent_code, explicit) of parents not known when the row was read
+        self.pending = []
+        self.parents = {}
+        # Children of an earlier row of the current chunk, linked once that row is inserted
+        self.chunk_parents = {}
+
+    def known(self, code):
+        return code in self.stored or code in self.ids
+
+    def id_of(self, code):
+        return self.stored[code] if code in self.stored else self.ids[code]
+
+    def build(self, rows):
+        accounts = []
+        self.chunk_parents = {}
+        for row_num, row in rows:
+            code = row['code']
+            if code in self.stored:
+                self.report.add_error(row_num, {'code': [f"Account '{code}' already exists"]})
+                continue
+            if code in self.ids:
+                self.report.add_error(row_num, {'code': [f"Duplicates account '{code}' of row {self.row_nums[code]}"]})
+                continue
+            if row['parent_code'] == code:
+                self.report.add_error(row_num, {'parent_code': ['An account cannot be its own parent']})
+                continue
+
+            self.ids[code] = None
+            self.row_nums[code] = row_num
+            explicit = bool(row['parent_code'])
+            parent_code = row['parent_code'] or (code.rpartition('.')[0] if '.' in code else '')
+            account = FinancialMainAccount(
+                building=self.building, code=code, name=row['name'], type=row['type'],
+                expected_amount=row['expected_amount'], actual_amount=row['actual_amount'],
+            )
+            if parent_code:
+                self.parents[code] = parent_code
+                if not self.known(parent_code):
+                    self.pending.append((row_num, code, parent_code, explicit))
+                elif self.id_of(parent_code) is not None:
+                    account.parent_id = self.id_of(parent_code)
+                else:
+                    self.chunk_parents[code] = parent_code
+            accounts.append((row_num, account))
+        return accounts
+
+    def insert(self, objects):
+        # Insert the chunk level by level so every parent has an id before its children
+        remaining = objects
+        while remaining:
+            waiting = {account.code for _, account in remaining}
+            level = [(row_num, account) for row_num, account in remaining
+                     if self.chunk_parents.get(account.code) not in waiting]
+            remaining = [(row_num, account) for row_num, account in remaining
+                         if self.chunk_parents.get(account.code) in waiting]
+            for _, account in level:
+                if account.code in self.chunk_parents:
+                    account.parent_id = self.ids[self.chunk_parents[account.code]]
+            super().insert(level)
+
+    def inserted(self, objects):
+        for _, account in objects:
+            self.ids[account.code] = account.id
+
+    def finish(self):
+        updates = []
+        for row_num, code, parent_code, explicit in self.pending:
+            if self.known(parent_code):
+                updates.append(FinancialMainAccount(id=self.ids[code], parent_id=self.id_of(parent_code)))
+            elif explicit:
+                self.report.add_error(row_num, {'parent_code': [f"Parent account '{parent_code}' not found"]})
+            else:
+                del self.parents[code]
+
+        # Only file rows can form a cycle: stored accounts never point at them
+        for code in self._cycles():
+            self.report.add_error(self.row_nums[code], {'parent_code': ['Account is part of a parent cycle']})
+
+        if self.write and not self.report.error_count and updates:
+            FinancialMainAccount.objects.bulk_update(updates, ['parent'], batch_size=settings.FINANCIAL_BULK_BATCH_SIZE)
+        building_id = self.building.id
+        transaction.on_commit(lambda: invalidate_tags('financial_account', building_id=building_id))
+
+    def _cycles(self):
+        state = {}
+        in_cycle = []
+        for start in self.parents:
+            path = {}
+            code = start
+            while code in self.parents and code not in state:
+                state[code] = start
+                path[code] = len(path)
+                code = self.parents[code]
+            if code in path:
+                in_cycle.extend(list(path)[path[code]:])
+        return sorted(in_cycle, key=self.row_nums.get)
+
+
+IMPORTERS = {
+    'expense': ExpenseImporter,
+    'annual': AnnualBudgetImporter,
+    'account': AccountImporter,
+}
+
+
+def resolve_columns(header, importer_class, mapping=None):
+    """
+    Map file columns to importer fields: `mapping` ({file header: field}) first,
+    then headers equal to a field name (case and spaces ignored).
+    Returns {field: column index}.
+    """
+    fields = importer_class.fields
+    mapping = {_normalize_header(column): field for column, field in (mapping or {}).items()}
+    unknown = sorted(set(mapping.values()) - fields.keys())
+    if unknown:
+        raise FinancialImportError(
+            f"Unknown fields in mapping: {', '.join(unknown)}. Expected: {', '.join(fields)}"
+        )
+
+    columns = {}
+    for index, column in enumerate(header):
+        field = mapping.get(column, column if column not in mapping.values() else None)
+        if field in fields and field not in columns:
+            columns[field] = index
+
+    missing = [field for field, spec in fields.items() if spec[2] and field not in columns]
+    if missing:
+        raise FinancialImportError(
+            f"Missing required columns: {', '.join(missing)}. Use 'mapping' to map your file's headers"
+        )
+    return columns
+
+
+def import_financial_file(kind, building, upload, filename, user=None, mapping=None, dry_run=False,
+                          encoding='utf-8-sig', progress_callback=None):
+    """
+    Import an uploaded CSV/XLSX file of `kind` ('expense', 'annual' or 'account')
+    into `building`. With `dry_run` the file is fully validated and nothing is kept.
+    `progress_callback`, if given, is called with (done, total) after every chunk.
+
+    Returns (response_data, http_status).
+    """
+    importer_class = IMPORTERS[kind]
+    try:
+        source = ImportSource(upload, filename, encoding)
+    except FinancialImportError as e:
+        return {'error': str(e)}, status.HTTP_400_BAD_REQUEST
+
+    report = ImportReport()
+    try:
+        columns = resolve_columns(source.header, importer_class, mapping)
+        batch_size = settings.FINANCIAL_BULK_BATCH_SIZE
+
+        with transaction.atomic():
+            importer = importer_class(building, user, report, not dry_run)
+            rows = (
+                (row_num, {field: values[index] if index < len(values) else None
+                           for field, index in columns.items()})
+                for row_num, values in source.rows()
+            )
+            while True:
+                chunk = list(itertools.islice(rows, batch_size))
+                if not chunk:
+                    break
+                importer.process(chunk)
+                if progress_callback:
+                    progress_callback(*source.progress(report.rows))
+            importer.finish()
+
+            if dry_run or report.error_count:
+                transaction.set_rollback(True)
+    except FinancialImportError as e:
+        return {'error': str(e)}, status.HTTP_400_BAD_REQUEST
+    finally:
+        source.close()
+
+    summary = {
+        'kind': kind,
+        'dry_run': dry_run,
+        'rows': report.rows,
+        'created': 0 if dry_run or report.error_count else report.created,
+    }
+    if report.error_count:
+        return {
+            'error': 'Data validation failed; nothing was imported',
+            'summary': {**summary, 'errors': report.error_count},
+            'details': sorted(report.errors, key=lambda error: error['row']),
+        }, status.HTTP_400_BAD_REQUEST
+    if not report.rows:
+        return {'error': 'No data rows found in the file', 'summary': summary}, status.HTTP_400_BAD_REQUEST
+    if dry_run:
+        return {'message': f'{report.rows} rows are valid', 'summary': summary}, status.HTTP_200_OK
+    return {'message': f'Successfully imported {report.created} rows', 'summary': summary}, status.HTTP_201_CREATED
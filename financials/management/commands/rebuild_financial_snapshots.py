@@ -0,0 +1,64 @@
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.core.management.base import BaseCommand
+
+from jobs.worker import init_worker
+
+logger = logging.getLogger(__name__)
+
+
+def rebuild_building(building_id):
+    """
+    Pool entry point: recompute the snapshots of one building.
+    Returns (building_id, rows written, error message).
+    """
+    from django.db import close_old_connections
+    from financials.snapshots import rebuild_building as rebuild
+
+    close_old_connections()
+    try:
+        return building_id, rebuild(building_id), None
+    except Exception as e:
+        return building_id, 0, str(e)
+    finally:
+        close_old_connections()
+
+
+class Command(BaseCommand):
+    help = (
+        'Recompute MonthlyFinancialSnapshot rows from expenses, budgets and collections, '
+        'one building per worker process. Run it after bulk writes that skip signals.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=multiprocessing.cpu_count(),
+                            help='Number of worker processes')
+        parser.add_argument('--building', type=int, action='append', dest='buildings',
+                            help='Only rebuild this building id (repeatable); defaults to all')
+
+    def handle(self, *args, **options):
+        from building_mgmt.models import Building
+
+        processes = max(options['processes'], 1)
+        buildings = options['buildings'] or list(Building.objects.order_by('id').values_list('id', flat=True))
+
+        self.stdout.write(f'Rebuilding financial snapshots for {len(buildings)} building(s) '
+                          f'with {processes} process(es)...')
+
+        rows = failed = 0
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=processes, mp_context=context, initializer=init_worker) as pool:
+            futures = [pool.submit(rebuild_building, building_id) for building_id in buildings]
+            for future in as_completed(futures):
+                building_id, written, error = future.result()
+                if error:
+                    failed += 1
+                    self.stderr.write(f'Building #{building_id}: {error}')
+                else:
+                    rows += written
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Done: {rows} snapshot row(s) written, {failed} building(s) failed'
+        ))
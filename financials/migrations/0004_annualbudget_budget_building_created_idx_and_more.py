@@ -0,0 +1,28 @@
+# Generated by Django 5.2.4 on 2026-10-18 20:53
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('building_mgmt', '0012_pagination_indexes'),
+        ('financials', '0003_collection'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='annualbudget',
+            index=models.Index(fields=['building', 'created_at', 'id'], name='budget_building_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='collection',
+            index=models.Index(fields=['building', 'start_date', 'id'], name='collection_building_start_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='expense',
+            index=models.Index(fields=['building', 'expense_date', 'id'], name='expense_building_date_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.4 on 2026-10-18 21:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('financials', '0004_annualbudget_budget_building_created_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='expense',
+            index=models.Index(fields=['building', 'expense_date', 'category', 'amount'], name='expense_building_rollup_idx'),
+        ),
+    ]
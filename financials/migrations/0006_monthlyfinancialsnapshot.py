@@ -0,0 +1,34 @@
+# Generated by Django 5.2.4 on 2026-10-18 21:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('building_mgmt', '0012_pagination_indexes'),
+        ('financials', '0005_expense_rollup_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MonthlyFinancialSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.PositiveIntegerField()),
+                ('month', models.PositiveSmallIntegerField()),
+                ('budgeted', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('spent', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('expense_count', models.PositiveIntegerField(default=0)),
+                ('collected', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('building', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='financial_snapshots', to='building_mgmt.building')),
+                ('category', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='financials.budgetcategory')),
+            ],
+            options={
+                'db_table': 'financials_monthly_snapshot',
+                'constraints': [models.UniqueConstraint(fields=('building', 'year', 'month', 'category'), name='snapshot_building_month_uniq'), models.UniqueConstraint(condition=models.Q(('category__isnull', True)), fields=('building', 'year', 'month'), name='snapshot_building_month_total_uniq')],
+            },
+        ),
+    ]
@@ -0,0 +1,65 @@
+import datetime
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.db import migrations
+from django.db.models import Count, Sum
+
+
+def backfill_snapshots(apps, schema_editor):
+    # MonthlyFinancialSnapshot is only maintained on writes: compute it for the existing rows
+    # (same rules as financials.snapshots.rebuild_building, frozen here)
+    Expense = apps.get_model('financials', 'Expense')
+    AnnualBudget = apps.get_model('financials', 'AnnualBudget')
+    Collection = apps.get_model('financials', 'Collection')
+    MonthlyFinancialSnapshot = apps.get_model('financials', 'MonthlyFinancialSnapshot')
+
+    cells = {}
+
+    def cell(building_id, year, month, category_id):
+        key = (building_id, year, month, category_id)
+        if key not in cells:
+            cells[key] = MonthlyFinancialSnapshot(building_id=building_id, year=year, month=month,
+                                                  category_id=category_id)
+        return cells[key]
+
+    spent = (
+        Expense.objects.values('building_id', 'category_id', 'expense_date')
+        .annotate(total=Sum('amount'), count=Count('id')).order_by()
+    )
+    for row in spent.iterator():
+        entry = cell(row['building_id'], row['expense_date'].year, row['expense_date'].month, row['category_id'])
+        entry.spent += row['total']
+        entry.expense_count += row['count']
+
+    budgets = (
+        AnnualBudget.objects.values('building_id', 'category_id', 'year')
+        .annotate(total=Sum('budgeted_amount')).order_by()
+    )
+    for row in budgets.iterator():
+        # Monthly shares; the rounding remainder goes to December
+        share = (row['total'] / 12).quantize(Decimal('0.00'), rounding=ROUND_HALF_UP)
+        for month, amount in enumerate([share] * 11 + [row['total'] - share * 11], start=1):
+            cell(row['building_id'], row['year'], month, row['category_id']).budgeted = amount
+
+    horizon = (datetime.date.today().year, 12)
+    collections = Collection.objects.filter(active=True).values_list('building_id', 'start_date', 'monthly_amount')
+    for building_id, start_date, amount in collections.iterator():
+        year, month = start_date.year, start_date.month
+        while (year, month) <= horizon:
+            cell(building_id, year, month, None).collected += amount
+            year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+
+    # Rows written by signals since 0006 are recomputed as well
+    MonthlyFinancialSnapshot.objects.all().delete()
+    MonthlyFinancialSnapshot.objects.bulk_create(cells.values(), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('financials', '0006_monthlyfinancialsnapshot'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_snapshots, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.4 on 2026-10-18 22:30
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('financials', '0007_backfill_monthly_snapshots'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='budgetcategory',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+    ]
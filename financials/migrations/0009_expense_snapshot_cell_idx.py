@@ -0,0 +1,21 @@
+# Generated by Django 5.2.4 on 2026-10-18 22:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('financials', '0008_budgetcategory_updated_at'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='expense',
+            name='expense_building_rollup_idx',
+        ),
+        migrations.AddIndex(
+            model_name='expense',
+            index=models.Index(fields=['building', 'category', 'expense_date', 'amount'], name='expense_snapshot_cell_idx'),
+        ),
+    ]
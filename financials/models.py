@@ -7,6 +7,8 @@ User = get_user_model()
 class BudgetCategory(models.Model):
     name = models.CharField(max_length=100, unique=True)
     description = models.TextField(blank=True)
+    # Report caches are keyed on it: a rename changes every report listing the category
+    updated_at = models.DateTimeField(auto_now=True)
     
     def __str__(self):
         return self.name
@@ -27,6 +29,9 @@ class AnnualBudget(models.Model):
     
     class Meta:
         unique_together = ('building', 'year', 'category', 'sub_item')
+        indexes = [
+            models.Index(fields=['building', 'created_at', 'id'], name='budget_building_created_idx'),
+        ]
     
     def __str__(self):
         return f"{self.building.name} - {self.year} - {self.category.name}"
@@ -62,6 +67,12 @@ class Expense(models.Model):
     
     class Meta:
         ordering = ['-expense_date']
+        indexes = [
+            models.Index(fields=['building', 'expense_date', 'id'], name='expense_building_date_idx'),
+            # Covers snapshots.refresh_expense_cell: building and category equal, one month of
+            # expense_date, amount summed from the index (index-only scan on PostgreSQL)
+            models.Index(fields=['building', 'category', 'expense_date', 'amount'], name='expense_snapshot_cell_idx'),
+        ]
 
 class Revenue(models.Model):
     REVENUE_TYPE_CHOICES = [
@@ -133,6 +144,42 @@ class Collection(models.Model):
     class Meta:
         db_table = 'financials_collection'
         ordering = ['-start_date']
+        indexes = [
+            models.Index(fields=['building', 'start_date', 'id'], name='collection_building_start_idx'),
+        ]
     
     def __str__(self):
-        return f"{self.building.building_name} - {self.name} - {self.monthly_amount}"
\ No newline at end of file
+        return f"{self.building.building_name} - {self.name} - {self.monthly_amount}"
+
+
+class MonthlyFinancialSnapshot(models.Model):
+    """
+    Materialized monthly rollup per building and budget category: the month's share
+    of the annual budget, what was spent and how many expenses. Rows without a
+    category carry the amount collected that month. Maintained by
+    financials.snapshots; rebuild with `manage.py rebuild_financial_snapshots`.
+    """
+    building = models.ForeignKey(Building, on_delete=models.CASCADE, related_name='financial_snapshots')
+    year = models.PositiveIntegerField()
+    month = models.PositiveSmallIntegerField()
+    category = models.ForeignKey(BudgetCategory, on_delete=models.CASCADE, null=True, blank=True)
+    budgeted = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    spent = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    expense_count = models.PositiveIntegerField(default=0)
+    collected = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'financials_monthly_snapshot'
+        constraints = [
+            models.UniqueConstraint(fields=['building', 'year', 'month', 'category'],
+                                    name='snapshot_building_month_uniq'),
+            # NULLs are distinct in the constraint above
+            models.UniqueConstraint(fields=['building', 'year', 'month'], condition=models.Q(category__isnull=True),
+                                    name='snapshot_building_month_total_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.building_id} - {self.year}-{self.month:02d} - {self.category_id or 'collections'}"
+
@@ -41,6 +41,19 @@ class AnnualBudgetSerializer(serializers.ModelSerializer):
         model = AnnualBudget
         fields = ['account_category', 'building_id', 'sub_item', 'budgeted_amount']
         
+    category_field = 'account_category'
+
+    def build(self, validated_data, category):
+        """Unsaved budget for the current year (shared with the bulk endpoint)."""
+        return AnnualBudget(
+            building_id=validated_data['building_id'],
+            year=datetime.now().year,
+            category=category,
+            sub_item=validated_data['sub_item'],
+            budgeted_amount=validated_data['budgeted_amount'],
+            created_by=self.context.get('request').user if self.context.get('request') else None
+        )
+        
     def create(self, validated_data):
         account_category_name = validated_data.pop('account_category')
         
@@ -49,16 +62,8 @@ class AnnualBudgetSerializer(serializers.ModelSerializer):
             defaults={'description': f'Category for {account_category_name}'}
         )
         
-        current_year = datetime.now().year
-        
-        annual_budget = AnnualBudget.objects.create(
-            building_id=validated_data['building_id'],
-            year=current_year,
-            category=category,
-            sub_item=validated_data['sub_item'],
-            budgeted_amount=validated_data['budgeted_amount'],
-            created_by=self.context.get('request').user if self.context.get('request') else None
-        )
+        annual_budget = self.build(validated_data, category)
+        annual_budget.save()
         
         return annual_budget
 
@@ -71,31 +76,46 @@ class ExpenseSerializer(serializers.ModelSerializer):
         model = Expense
         fields = ['amount', 'buildingId', 'category', 'month']
         
-    def create(self, validated_data):
-        category_name = validated_data.pop('category')
-        month_str = validated_data.pop('month')
-        
-        # Get or create budget category
-        category, created = BudgetCategory.objects.get_or_create(
-            name=category_name,
-            defaults={'description': f'Category for {category_name}'}
-        )
+    category_field = 'category'
+
+    def validate_month(self, value):
+        # Format: YYYY-MM
+        try:
+            datetime.strptime(value, '%Y-%m')
+        except ValueError:
+            raise serializers.ValidationError('Month must be in YYYY-MM format')
+        return value
+
+    def build(self, validated_data, category):
+        """Unsaved expense dated the first day of its month (shared with the bulk endpoint)."""
+        month_str = validated_data['month']
         
         # Parse month string (format: YYYY-MM) and create expense_date as first day of month
         year, month = month_str.split('-')
         expense_date = datetime(int(year), int(month), 1).date()
         
-        # Create expense with required fields
-        expense = Expense.objects.create(
+        return Expense(
             building_id=validated_data['building_id'],
             category=category,
             amount=validated_data['amount'],
             expense_date=expense_date,
             expense_type='maintenance',  # Default type based on input
-            description=f'{category_name} expense for {month_str}',
+            description=f'{category.name} expense for {month_str}',
             created_by=self.context.get('request').user if self.context.get('request') else None
         )
         
+    def create(self, validated_data):
+        category_name = validated_data.pop('category')
+        
+        # Get or create budget category
+        category, created = BudgetCategory.objects.get_or_create(
+            name=category_name,
+            defaults={'description': f'Category for {category_name}'}
+        )
+        
+        expense = self.build(validated_data, category)
+        expense.save()
+        
         return expense
 
 class ExpenseReadSerializer(serializers.ModelSerializer):
@@ -128,17 +148,24 @@ class CollectionSerializer(serializers.ModelSerializer):
         model = Collection
         fields = ['buildingId', 'name', 'purpose', 'monthlyAmount', 'startDate', 'active']
         
-    def create(self, validated_data):
-        collection = Collection.objects.create(
+    category_field = None
+
+    def build(self, validated_data, category=None):
+        """Unsaved collection (shared with the bulk endpoint)."""
+        return Collection(
             building_id=validated_data['building_id'],
             name=validated_data['name'],
             purpose=validated_data['purpose'],
             monthly_amount=validated_data['monthly_amount'],
             start_date=validated_data['start_date'],
-            active=validated_data['active'],
+            active=validated_data.get('active', True),
             created_by=self.context.get('request').user if self.context.get('request') else None
         )
         
+    def create(self, validated_data):
+        collection = self.build(validated_data)
+        collection.save()
+        
         return collection
 
 class CollectionReadSerializer(serializers.ModelSerializer):
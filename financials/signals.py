@@ -0,0 +1,81 @@
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import snapshots
+from .models import AnnualBudget, Collection, Expense
+
+
+def _previous(instance, *fields):
+    """The stored values of `fields` before this save (None for new rows)."""
+    if instance._state.adding or instance.pk is None:
+        return None
+    return type(instance).objects.filter(pk=instance.pk).values(*fields).first()
+
+
+def _cascaded(sender, origin):
+    """
+    Whether a delete cascades from another model (a Building or BudgetCategory).
+    Snapshot rows cascade from those too, so there is nothing to refresh.
+    """
+    if origin is None:
+        return False
+    origin_model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    return origin_model is not sender
+
+
+def _expense_cell(building_id, category_id, expense_date):
+    return building_id, category_id, expense_date.year, expense_date.month
+
+
+@receiver(pre_save, sender=Expense)
+def remember_expense_cell(sender, instance, **kwargs):
+    previous = _previous(instance, 'building_id', 'category_id', 'expense_date')
+    instance._previous_snapshot_cell = _expense_cell(**previous) if previous else None
+
+
+@receiver(post_save, sender=Expense)
+@receiver(post_delete, sender=Expense)
+def refresh_expense_snapshot(sender, instance, origin=None, **kwargs):
+    if _cascaded(sender, origin):
+        return
+    cells = {_expense_cell(instance.building_id, instance.category_id, instance.expense_date)}
+    previous = getattr(instance, '_previous_snapshot_cell', None)
+    if previous:
+        cells.add(previous)
+    for cell in cells:
+        snapshots.refresh_expense_cell(*cell)
+
+
+@receiver(pre_save, sender=AnnualBudget)
+def remember_budget_cells(sender, instance, **kwargs):
+    previous = _previous(instance, 'building_id', 'category_id', 'year')
+    instance._previous_snapshot_cells = tuple(previous.values()) if previous else None
+
+
+@receiver(post_save, sender=AnnualBudget)
+@receiver(post_delete, sender=AnnualBudget)
+def refresh_budget_snapshot(sender, instance, origin=None, **kwargs):
+    if _cascaded(sender, origin):
+        return
+    cells = {(instance.building_id, instance.category_id, instance.year)}
+    previous = getattr(instance, '_previous_snapshot_cells', None)
+    if previous:
+        cells.add(previous)
+    for cell in cells:
+        snapshots.refresh_budget_cells(*cell)
+
+
+@receiver(pre_save, sender=Collection)
+def remember_collection_building(sender, instance, **kwargs):
+    previous = _previous(instance, 'building_id')
+    instance._previous_snapshot_building = previous['building_id'] if previous else None
+
+
+@receiver(post_save, sender=Collection)
+@receiver(post_delete, sender=Collection)
+def refresh_collection_snapshot(sender, instance, origin=None, **kwargs):
+    if _cascaded(sender, origin):
+        return
+    for building_id in {instance.building_id, getattr(instance, '_previous_snapshot_building', None)} - {None}:
+        snapshots.refresh_collection_cells(building_id)
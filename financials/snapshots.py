@@ -0,0 +1,201 @@
+"""
+MonthlyFinancialSnapshot maintenance.
+
+Each write to an Expense, AnnualBudget or Collection refreshes only the
+snapshot cells it touches (see financials.signals), recomputed from the
+source rows rather than adjusted by deltas so edits, moves between months or
+categories and deletions can never drift. Cells are locked before they are
+recomputed so concurrent writes to the same month serialize.
+
+Collections are open-ended, so their monthly amounts are materialized by the
+writes and rebuilds up to a horizon, December of the current year (never
+shrunk by a refresh). Readers asking for a later period get those months
+from projected_collections(), computed without writing anything.
+
+rebuild_building() recomputes a building from scratch; it backs
+`manage.py rebuild_financial_snapshots`.
+"""
+import datetime
+from collections import defaultdict
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.utils import timezone
+
+from building_mgmt.models import Building
+from .models import AnnualBudget, Collection, Expense, MonthlyFinancialSnapshot
+
+ZERO = Decimal('0.00')
+
+VALUE_FIELDS = ('budgeted', 'spent', 'expense_count', 'collected')
+
+
+def month_bounds(year, month):
+    """[start, end) dates of a month."""
+    return datetime.date(year, month, 1), datetime.date(year + (month == 12), month % 12 + 1, 1)
+
+
+def monthly_budget(annual_amount):
+    """
+    Split an annual budget into 12 monthly amounts that add back up exactly
+    (the rounding remainder goes to December).
+    """
+    share = (annual_amount / 12).quantize(ZERO, rounding=ROUND_HALF_UP)
+    return [share] * 11 + [annual_amount - share * 11]
+
+
+def _locked_cell(building_id, year, month, category_id):
+    cell, _ = MonthlyFinancialSnapshot.objects.select_for_update().get_or_create(
+        building_id=building_id, year=year, month=month, category_id=category_id
+    )
+    return cell
+
+
+def _save_cell(cell, fields):
+    if not any(getattr(cell, field) for field in VALUE_FIELDS):
+        cell.delete()
+    else:
+        cell.save(update_fields=list(fields) + ['updated_at'])
+
+
+def refresh_expense_cell(building_id, category_id, year, month):
+    """Recompute spent/expense_count of one building, category and month."""
+    start, end = month_bounds(year, month)
+    with transaction.atomic():
+        cell = _locked_cell(building_id, year, month, category_id)
+        totals = Expense.objects.filter(
+            building_id=building_id, category_id=category_id, expense_date__gte=start, expense_date__lt=end
+        ).aggregate(spent=Sum('amount'), count=Count('id'))
+        cell.spent = totals['spent'] or ZERO
+        cell.expense_count = totals['count']
+        _save_cell(cell, ['spent', 'expense_count'])
+
+
+def refresh_budget_cells(building_id, category_id, year):
+    """Recompute the monthly budget shares of one building, category and year."""
+    with transaction.atomic():
+        cells = [_locked_cell(building_id, year, month, category_id) for month in range(1, 13)]
+        annual = AnnualBudget.objects.filter(
+            building_id=building_id, category_id=category_id, year=year
+        ).aggregate(total=Sum('budgeted_amount'))['total'] or ZERO
+        for cell, amount in zip(cells, monthly_budget(annual)):
+            cell.budgeted = amount
+            _save_cell(cell, ['budgeted'])
+
+
+def collection_horizon(until=None):
+    """
+    Last month collections are materialized for: December of the current year,
+    or the month of `until` when that is later.
+    """
+    horizon = datetime.date(timezone.now().year, 12, 1)
+    return max(horizon, until.replace(day=1)) if until else horizon
+
+
+def materialized_until(building_id):
+    """First day of the last month a building's collections are materialized for, or None."""
+    last = (
+        MonthlyFinancialSnapshot.objects.filter(building_id=building_id, category__isnull=True)
+        .order_by('-year', '-month').values_list('year', 'month').first()
+    )
+    return datetime.date(*last, 1) if last else None
+
+
+def collection_months(collections, until):
+    """
+    {(year, month): collected} from the first collection's start up to `until`:
+    every active collection contributes its monthly amount from its start month on.
+    """
+    collected = defaultdict(lambda: ZERO)
+    for start_date, amount in collections:
+        year, month = start_date.year, start_date.month
+        while (year, month) <= (until.year, until.month):
+            collected[(year, month)] += amount
+            year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return collected
+
+
+def refresh_collection_cells(building_id):
+    """Recompute the collected amounts of a building (rows without a category) through the horizon."""
+    with transaction.atomic():
+        # The building row serializes concurrent collection refreshes
+        list(Building.objects.select_for_update().filter(id=building_id).values_list('id'))
+        collections = Collection.objects.filter(building_id=building_id, active=True).values_list(
+            'start_date', 'monthly_amount'
+        )
+        collected = collection_months(collections, collection_horizon(materialized_until(building_id)))
+        MonthlyFinancialSnapshot.objects.filter(building_id=building_id, category__isnull=True).delete()
+        MonthlyFinancialSnapshot.objects.bulk_create([
+            MonthlyFinancialSnapshot(building_id=building_id, year=year, month=month, collected=amount)
+            for (year, month), amount in collected.items()
+        ])
+
+
+def projected_collections(building_id, year, month=None):
+    """
+    {(year, month): collected} for the months of a period (a year, or one month
+    of it) past the materialized horizon, computed from the collections and not
+    stored. Collected rows are contiguous up to the horizon, so a materialized
+    period costs one query.
+    """
+    start, _ = month_bounds(year, month or 1)
+    last, end = month_bounds(year, month or 12)
+    until = materialized_until(building_id)
+    if until is not None and until >= last:
+        return {}
+    if until is not None:
+        start = max(start, month_bounds(until.year, until.month)[1])
+    collections = Collection.objects.filter(building_id=building_id, active=True, start_date__lt=end).values_list(
+        'start_date', 'monthly_amount'
+    )
+    return {
+        (y, m): amount for (y, m), amount in collection_months(collections, last).items()
+        if datetime.date(y, m, 1) >= start
+    }
+
+
+def rebuild_building(building_id):
+    """Recompute every snapshot row of a building. Returns the number of rows written."""
+    cells = {}
+
+    def cell(year, month, category_id):
+        key = (year, month, category_id)
+        if key not in cells:
+            cells[key] = MonthlyFinancialSnapshot(building_id=building_id, year=year, month=month,
+                                                  category_id=category_id)
+        return cells[key]
+
+    # Grouped per day and folded into months here (see financials.summary)
+    spent = (
+        Expense.objects.filter(building_id=building_id)
+        .values('category_id', 'expense_date')
+        .annotate(total=Sum('amount'), count=Count('id'))
+        .order_by()
+    )
+    for row in spent:
+        entry = cell(row['expense_date'].year, row['expense_date'].month, row['category_id'])
+        entry.spent += row['total']
+        entry.expense_count += row['count']
+
+    budgets = (
+        AnnualBudget.objects.filter(building_id=building_id)
+        .values('category_id', 'year')
+        .annotate(total=Sum('budgeted_amount'))
+        .order_by()
+    )
+    for row in budgets:
+        for month, amount in enumerate(monthly_budget(row['total']), start=1):
+            cell(row['year'], month, row['category_id']).budgeted = amount
+
+    collections = Collection.objects.filter(building_id=building_id, active=True).values_list(
+        'start_date', 'monthly_amount'
+    )
+    horizon = collection_horizon(materialized_until(building_id))
+    for (year, month), amount in collection_months(collections, horizon).items():
+        cell(year, month, None).collected = amount
+
+    with transaction.atomic():
+        MonthlyFinancialSnapshot.objects.filter(building_id=building_id).delete()
+        MonthlyFinancialSnapshot.objects.bulk_create(cells.values(), batch_size=1000)
+    return len(cells)
@@ -0,0 +1,124 @@
+"""
+Financial dashboard rollups.
+
+Budget vs actual comes from the MonthlyFinancialSnapshot rows of the period
+(see financials.snapshots), collection counts from one aggregate and the
+account chart from one flat read: three queries whatever the number of
+expense rows, plus one checking that collections are materialized through
+the period (and one reading them when it lies past the horizon). Nothing is
+written.
+"""
+import datetime
+import itertools
+from decimal import Decimal
+
+from django.db.models import Count, Q, Sum
+
+from .accounts import account_rows, build_account_tree
+from .models import Collection, MonthlyFinancialSnapshot
+from .snapshots import projected_collections
+
+ZERO = Decimal('0.00')
+
+
+def _money(value):
+    return str((value or ZERO).quantize(ZERO))
+
+
+def period_bounds(year, month=None):
+    """[start, end) dates of a year, or of one month of it."""
+    if month is None:
+        return datetime.date(year, 1, 1), datetime.date(year + 1, 1, 1)
+    start = datetime.date(year, month, 1)
+    end = datetime.date(year + (month == 12), month % 12 + 1, 1)
+    return start, end
+
+
+def budget_vs_actual(building_id, year, month=None):
+    """
+    Budgeted vs spent per category, plus spending and collections per month,
+    read from MonthlyFinancialSnapshot (at most 12 rows per category and year).
+    With a month filter the budget is that month's share of the annual budget.
+    """
+    snapshots = MonthlyFinancialSnapshot.objects.filter(building_id=building_id, year=year)
+    if month is not None:
+        snapshots = snapshots.filter(month=month)
+    rows = snapshots.values(
+        'category_id', 'category__name', 'month', 'budgeted', 'spent', 'expense_count', 'collected'
+    )
+    # Months past the materialized collection horizon
+    projected = [
+        {'category_id': None, 'month': month_number, 'collected': collected}
+        for (_, month_number), collected in projected_collections(building_id, year, month).items()
+    ]
+
+    categories = {}
+    months = {}
+    for row in itertools.chain(rows, projected):
+        month_key = f"{year}-{row['month']:02d}"
+        month_entry = months.setdefault(month_key, {
+            'month': month_key, 'actual': ZERO, 'expense_count': 0, 'collected': ZERO,
+        })
+        month_entry['collected'] += row['collected']
+        if row['category_id'] is None:
+            continue
+        month_entry['actual'] += row['spent']
+        month_entry['expense_count'] += row['expense_count']
+        entry = categories.setdefault(row['category_id'], {
+            'category_id': row['category_id'], 'category': row['category__name'],
+            'budgeted': ZERO, 'actual': ZERO, 'expense_count': 0,
+        })
+        entry['budgeted'] += row['budgeted']
+        entry['actual'] += row['spent']
+        entry['expense_count'] += row['expense_count']
+
+    by_category = []
+    for entry in sorted(categories.values(), key=lambda c: c['category']):
+        by_category.append({
+            **entry,
+            'budgeted': _money(entry['budgeted']),
+            'actual': _money(entry['actual']),
+            'variance': _money(entry['budgeted'] - entry['actual']),
+        })
+    by_month = [
+        {**entry, 'actual': _money(entry['actual']), 'collected': _money(entry['collected'])}
+        for _, entry in sorted(months.items())
+    ]
+    totals = {
+        'budgeted': _money(sum((c['budgeted'] for c in categories.values()), ZERO)),
+        'actual': _money(sum((c['actual'] for c in categories.values()), ZERO)),
+        'collected': _money(sum((m['collected'] for m in months.values()), ZERO)),
+    }
+    return by_category, by_month, totals
+
+
+def collection_totals(building_id, year, month=None):
+    """Active/total collections and the monthly amount expected by the end of the period."""
+    _, end = period_bounds(year, month)
+    active = Q(active=True, start_date__lt=end)
+    totals = Collection.objects.filter(building_id=building_id).aggregate(
+        total_count=Count('id'),
+        active_count=Count('id', filter=active),
+        active_monthly_amount=Sum('monthly_amount', filter=active),
+    )
+    totals['active_monthly_amount'] = _money(totals['active_monthly_amount'])
+    return totals
+
+
+def account_tree(building_id):
+    """The account chart nested by parent, ordered by code, with subtree totals."""
+    return build_account_tree(account_rows(building_id))
+
+
+def financial_summary(building_id, year, month=None):
+    by_category, by_month, totals = budget_vs_actual(building_id, year, month)
+    return {
+        'building_id': building_id,
+        'year': year,
+        'month': month,
+        'totals': totals,
+        'budget_vs_actual': by_category,
+        'expenses_by_month': by_month,
+        'collections': collection_totals(building_id, year, month),
+        'accounts': account_tree(building_id),
+    }
@@ -0,0 +1,26 @@
+from django.core.files.storage import default_storage
+
+from building_mgmt.models import Building
+from jobs.queue import register_job, set_job_progress
+from .importer import import_financial_file
+
+
+@register_job('financial_import')
+def import_financial_job(job):
+    payload = job.payload
+    building = Building.objects.get(id=payload['building_id'])
+    upload_name = payload['upload_name']
+
+    with default_storage.open(upload_name, 'rb') as upload:
+        response_data, status_code = import_financial_file(
+            payload['kind'], building, upload, upload_name, user=job.created_by,
+            mapping=payload.get('mapping'), dry_run=payload.get('dry_run', False),
+            encoding=payload.get('encoding', 'utf-8-sig'),
+            progress_callback=lambda done, total: set_job_progress(job, done, total),
+        )
+
+    default_storage.delete(upload_name)
+
+    # Validation problems are a finished import with a report, not a retryable failure
+    response_data['status_code'] = status_code
+    return response_data
@@ -0,0 +1,407 @@
+import datetime
+import importlib
+from decimal import Decimal
+
+from django.apps import apps
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from building_mgmt.tests import create_building, create_user
+from reporting.engine import raw_budget_sections, snapshot_budget_sections
+from .accounts import account_rows, build_account_tree, subtree_rows
+from .importer import RowImporter, import_financial_file
+from .models import (AnnualBudget, BudgetCategory, Collection, Expense, FinancialMainAccount,
+                     MonthlyFinancialSnapshot)
+from .snapshots import rebuild_building
+from .summary import budget_vs_actual
+
+backfill = importlib.import_module('financials.migrations.0007_backfill_monthly_snapshots')
+
+
+class SnapshotTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('master@example.com')
+        cls.building = create_building(cls.user, 'Snapshots', '00.000.000/0001-20')
+        cls.category = BudgetCategory.objects.create(name='Maintenance')
+
+    def add(self, model, **fields):
+        with self.captureOnCommitCallbacks(execute=True):
+            return model.objects.create(building=self.building, **fields)
+
+    def test_collections_past_the_horizon_are_computed_on_read(self):
+        this_year = timezone.now().year
+        self.add(Collection, name='Reserve', purpose='Reserve fund', monthly_amount=Decimal('100.00'),
+                 start_date=datetime.date(this_year, 1, 1))
+        self.add(Collection, name='Works', purpose='Facade', monthly_amount=Decimal('50.00'),
+                 start_date=datetime.date(this_year, 6, 1))
+        stored = MonthlyFinancialSnapshot.objects.filter(category__isnull=True)
+        self.assertEqual(max(stored.values_list('year', flat=True)), this_year)
+
+        # Materialized: the snapshot rows and the horizon check
+        with self.assertNumQueries(2):
+            _, by_month, totals = budget_vs_actual(self.building.id, this_year)
+        self.assertEqual((len(by_month), totals['collected']), (12, '1550.00'))
+
+        with CaptureQueriesContext(connection) as queries:
+            _, by_month, totals = budget_vs_actual(self.building.id, this_year + 2, 3)
+        self.assertEqual(totals['collected'], '150.00')
+        self.assertEqual(by_month, [{'month': f'{this_year + 2}-03', 'actual': '0.00', 'expense_count': 0,
+                                     'collected': '150.00'}])
+        self.assertTrue(all(query['sql'].startswith('SELECT') for query in queries))
+        self.assertEqual(max(stored.values_list('year', flat=True)), this_year)
+
+        _, by_month, totals = budget_vs_actual(self.building.id, this_year + 1)
+        self.assertEqual((len(by_month), totals['collected']), (12, '1800.00'))
+
+        # Starting past the horizon: nothing is materialized at all
+        self.add(Collection, name='Later', purpose='Roof', monthly_amount=Decimal('10.00'),
+                 start_date=datetime.date(this_year + 3, 2, 1))
+        _, _, totals = budget_vs_actual(self.building.id, this_year + 3)
+        self.assertEqual(totals['collected'], str(Decimal('1800.00') + Decimal('110.00')))
+
+    @override_settings(QUERY_BUDGET_STRICT=True)
+    def test_summary_view_is_within_its_budget(self):
+        this_year = timezone.now().year
+        self.add(Collection, name='Reserve', purpose='Reserve fund', monthly_amount=Decimal('100.00'),
+                 start_date=datetime.date(this_year, 1, 1))
+        client = APIClient()
+        client.force_authenticate(self.user)
+        for year in (this_year, this_year + 1):
+            with self.subTest(year=year):
+                cache.clear()
+                response = client.get('/api/financial/summary/', {'building_id': self.building.id, 'year': year})
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.json()['totals']['collected'], '1200.00')
+
+    def test_raw_report_budget_is_prorated_like_the_snapshots(self):
+        self.add(AnnualBudget, year=2025, category=self.category, budgeted_amount=Decimal('1200.00'))
+        self.add(Expense, category=self.category, description='Pump', amount=Decimal('40.00'),
+                 expense_date=datetime.date(2025, 3, 10))
+
+        start, end = datetime.date(2025, 3, 1), datetime.date(2025, 4, 30)
+        snapshot_rows, _ = snapshot_budget_sections(self.building, start, end)
+        raw_rows, _ = raw_budget_sections(self.building, start, end)
+        self.assertEqual(raw_rows, [['Maintenance', Decimal('200.00'), Decimal('40.00'), Decimal('160.00'), 1]])
+        self.assertEqual(raw_rows, [list(row) for row in snapshot_rows])
+
+        # Half of April
+        raw_rows, _ = raw_budget_sections(self.building, datetime.date(2025, 4, 1), datetime.date(2025, 4, 15))
+        self.assertEqual(raw_rows[0][1], Decimal('50.00'))
+
+    def test_backfill_matches_a_rebuild(self):
+        self.add(AnnualBudget, year=2025, category=self.category, budgeted_amount=Decimal('1000.00'))
+        self.add(Expense, category=self.category, description='Pump', amount=Decimal('40.00'),
+                 expense_date=datetime.date(2025, 3, 10))
+        self.add(Collection, name='Reserve', purpose='Reserve fund', monthly_amount=Decimal('100.00'),
+                 start_date=datetime.date(2025, 1, 1))
+        rebuild_building(self.building.id)
+        fields = ('building_id', 'year', 'month', 'category_id', 'budgeted', 'spent', 'expense_count', 'collected')
+        expected = list(MonthlyFinancialSnapshot.objects.values_list(*fields))
+
+        MonthlyFinancialSnapshot.objects.all().delete()
+        backfill.backfill_snapshots(apps, None)
+        self.assertCountEqual(MonthlyFinancialSnapshot.objects.values_list(*fields), expected)
+
+
+class BulkCreateTests(TestCase):
+    """create_batch validates a whole batch, then writes it with bulk_create."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('master@example.com')
+        cls.building = create_building(cls.user, 'Bulk', '00.000.000/0001-21')
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def expense(self, **fields):
+        return {'amount': '10.00', 'buildingId': self.building.id, 'category': 'Cleaning', 'month': '2025-03',
+                **fields}
+
+    def budget(self, **fields):
+        return {'account_category': 'Cleaning', 'building_id': self.building.id, 'sub_item': 'Staff',
+                'budgeted_amount': '1200.00', **fields}
+
+    def post(self, kind, items):
+        return self.client.post(f'/api/financial/{kind}/bulk/', items, format='json')
+
+    def test_errors_are_reported_per_item(self):
+        response = self.post('expense', [
+            self.expense(),
+            self.expense(month='March'),
+            self.expense(buildingId=0),
+            self.expense(amount=None),
+        ])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['error'], 'Invalid data')
+        details = response.json()['details']
+        self.assertEqual([error['index'] for error in details], [1, 2, 3])
+        self.assertEqual(details[0]['errors'], {'month': ['Month must be in YYYY-MM format']})
+        self.assertEqual(details[1]['errors'], {'buildingId': ['Building not found or access denied']})
+        self.assertIn('amount', details[2]['errors'])
+        self.assertFalse(Expense.objects.exists())
+        self.assertFalse(BudgetCategory.objects.exists())
+
+    def test_categories_are_resolved_in_one_query(self):
+        BudgetCategory.objects.create(name='Cleaning')
+        items = [self.expense(category=name) for name in ('Cleaning', 'Security', 'Gardening') * 10]
+        table = BudgetCategory._meta.db_table
+        with CaptureQueriesContext(connection) as queries:
+            response = self.post('expense', items)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['created'], 30)
+
+        category_queries = [query['sql'] for query in queries if f'"{table}"' in query['sql']]
+        self.assertEqual([sql.split()[0] for sql in category_queries], ['SELECT', 'INSERT'])
+        expense_inserts = [query for query in queries
+                           if query['sql'].startswith(f'INSERT INTO "{Expense._meta.db_table}"')]
+        self.assertEqual(len(expense_inserts), 1)
+        self.assertEqual(BudgetCategory.objects.count(), 3)
+        self.assertEqual(Expense.objects.filter(category__name='Security').count(), 10)
+
+    def test_budget_duplicates(self):
+        response = self.post('annual', [self.budget(), self.budget(sub_item='Supplies'), self.budget()])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['details'], [{'index': 2, 'errors': {'non_field_errors': [
+            'Duplicates item 0 (same building, year, category and sub item)'
+        ]}}])
+        self.assertFalse(AnnualBudget.objects.exists())
+
+        self.assertEqual(self.post('annual', [self.budget()]).status_code, 201)
+        response = self.post('annual', [self.budget(sub_item='Supplies'), self.budget()])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['details'], [{'index': 1, 'errors': {'non_field_errors': [
+            'A budget for this building, year, category and sub item already exists'
+        ]}}])
+        self.assertEqual(AnnualBudget.objects.count(), 1)
+
+    @override_settings(VIEW_CACHE_ENABLED=True, WEB_CONCURRENCY=1)
+    def test_snapshots_and_cache_are_refreshed(self):
+        list_url = f'/api/financial/expense/?building_id={self.building.id}'
+        self.assertEqual(self.client.get(list_url)['X-Cache'], 'MISS')
+        self.assertEqual(self.client.get(list_url)['X-Cache'], 'HIT')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.post('expense', [self.expense(), self.expense(amount='5.50'),
+                                             self.expense(month='2025-04', category='Security')])
+        self.assertEqual(response.status_code, 201)
+
+        cells = MonthlyFinancialSnapshot.objects.filter(building=self.building, category__isnull=False)
+        self.assertCountEqual(cells.values_list('category__name', 'month', 'spent', 'expense_count'), [
+            ('Cleaning', 3, Decimal('15.50'), 2),
+            ('Security', 4, Decimal('10.00'), 1),
+        ])
+        response = self.client.get(list_url)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(len(response.json()), 3)
+
+
+class FinancialImportTests(TestCase):
+    """import_financial_file streams a CSV/XLSX file into chunked bulk inserts, all or nothing."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('master@example.com')
+        cls.building = create_building(cls.user, 'Import', '00.000.000/0001-22')
+
+    def run_import(self, kind, lines, **options):
+        upload = SimpleUploadedFile('import.csv', '\n'.join(lines).encode('utf-8'))
+        with self.captureOnCommitCallbacks(execute=True):
+            return import_financial_file(kind, self.building, upload, upload.name, user=self.user, **options)
+
+    def inserts(self, queries, model):
+        return len([query for query in queries if query['sql'].startswith(f'INSERT INTO "{model._meta.db_table}"')])
+
+    def test_build_is_abstract(self):
+        with self.assertRaises(TypeError):
+            RowImporter(self.building, self.user, None, False)
+
+    def test_column_mapping(self):
+        data, status = self.run_import('expense', [
+            'Data;Valor;Categoria;Fornecedor',
+            '10/03/2025;1.234,56;Cleaning;ACME',
+            '2025-04-02;99.90;Security;',
+        ], mapping={'Data': 'date', 'Valor': 'amount', 'Categoria': 'category', 'Fornecedor': 'vendor'})
+        self.assertEqual((status, data['summary']['created']), (201, 2))
+        self.assertCountEqual(Expense.objects.values_list('expense_date', 'amount', 'category__name', 'vendor'), [
+            (datetime.date(2025, 3, 10), Decimal('1234.56'), 'Cleaning', 'ACME'),
+            (datetime.date(2025, 4, 2), Decimal('99.90'), 'Security', ''),
+        ])
+        self.assertEqual(MonthlyFinancialSnapshot.objects.get(month=3, category__name='Cleaning').spent,
+                         Decimal('1234.56'))
+
+        data, status = self.run_import('expense', ['Data,Valor', '10/03/2025,1'], mapping={'Data': 'day'})
+        self.assertEqual((status, data['error']), (400, 'Unknown fields in mapping: day. Expected: ' +
+                                                   'date, amount, category, description, expense_type, vendor, '
+                                                   'invoice_number, payment_method, notes'))
+        data, status = self.run_import('expense', ['Data,Valor', '10/03/2025,1'], mapping={'Data': 'date'})
+        self.assertEqual(status, 400)
+        self.assertTrue(data['error'].startswith('Missing required columns: amount, category.'))
+
+    def test_dry_run_writes_nothing(self):
+        lines = ['date,amount,category', '2025-03-10,10.00,Cleaning', '2025-03-11,5.00,Cleaning']
+        data, status = self.run_import('expense', lines, dry_run=True)
+        self.assertEqual((status, data['message']), (200, '2 rows are valid'))
+        self.assertEqual(data['summary'], {'kind': 'expense', 'dry_run': True, 'rows': 2, 'created': 0})
+        self.assertFalse(Expense.objects.exists())
+        self.assertFalse(BudgetCategory.objects.exists())
+        self.assertFalse(MonthlyFinancialSnapshot.objects.exists())
+
+    def test_row_errors_roll_back_every_chunk(self):
+        with override_settings(FINANCIAL_BULK_BATCH_SIZE=2):
+            data, status = self.run_import('expense', [
+                'date,amount,category', '2025-03-10,10.00,Cleaning', '2025-03-11,5.00,Cleaning',
+                '2025-03-12,oops,Cleaning',
+            ])
+        self.assertEqual(status, 400)
+        self.assertEqual([error['row'] for error in data['details']], [4])
+        self.assertFalse(Expense.objects.exists())
+
+    def test_chunked_inserts(self):
+        lines = ['date,amount,category'] + [f'2025-03-{day:02d},1.00,Cleaning' for day in range(1, 6)]
+        with override_settings(FINANCIAL_BULK_BATCH_SIZE=2), CaptureQueriesContext(connection) as queries:
+            data, status = self.run_import('expense', lines)
+        self.assertEqual((status, data['summary']['created']), (201, 5))
+        self.assertEqual(self.inserts(queries, Expense), 3)
+        self.assertEqual(self.inserts(queries, BudgetCategory), 1)
+
+    def test_account_parents_are_resolved_in_memory(self):
+        FinancialMainAccount.objects.create(building=self.building, code='9', name='Stored', type='main',
+                                            expected_amount=0, actual_amount=0)
+        lines = [
+            'code,name,type,parent_code',
+            '1.1.1,Elevators,detailed,',  # implicit parent, a chunk later
+            '2.1,Salaries,sub,',  # implicit parent later in the same chunk
+            '2,Staff,main,',
+            '9.1,Reserve,sub,',  # stored parent
+            '1.1,Upkeep,sub,',  # implicit parent later in the same chunk
+            '1,Maintenance,main,',
+            '3,Misc,main,1',  # explicit parent
+        ]
+        with override_settings(FINANCIAL_BULK_BATCH_SIZE=3), CaptureQueriesContext(connection) as queries:
+            data, status = self.run_import('account', lines)
+        self.assertEqual((status, data['summary']['created']), (201, 7))
+
+        accounts = FinancialMainAccount.objects.filter(building=self.building)
+        self.assertEqual(dict(accounts.values_list('code', 'parent__code')), {
+            '9': None, '9.1': '9', '1': None, '1.1': '1', '1.1.1': '1.1', '2': None, '2.1': '2', '3': '1',
+        })
+        table = f'"{FinancialMainAccount._meta.db_table}"'
+        selects = [query for query in queries if query['sql'].startswith('SELECT') and table in query['sql']]
+        self.assertEqual(len(selects), 1)  # the stored codes, read once
+
+    def test_account_parent_errors(self):
+        data, status = self.run_import('account', [
+            'code,name,type,parent_code',
+            '1,Loop,main,2',
+            '2,Loop,main,1',
+            '3,Orphan,main,8',
+            '4,Self,main,4',
+            '5.1,No implicit parent,sub,',
+        ])
+        self.assertEqual(status, 400)
+        self.assertEqual([(error['row'], error['errors']) for error in data['details']], [
+            (2, {'parent_code': ['Account is part of a parent cycle']}),
+            (3, {'parent_code': ['Account is part of a parent cycle']}),
+            (4, {'parent_code': ["Parent account '8' not found"]}),
+            (5, {'parent_code': ['An account cannot be its own parent']}),
+        ])
+        self.assertFalse(FinancialMainAccount.objects.exists())
+
+
+def walk(nodes):
+    for node in nodes:
+        yield node
+        yield from walk(node['children'])
+
+
+class AccountTreeTests(TestCase):
+    """build_account_tree nests the accounts and rolls subtree totals up in one pass."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('master@example.com')
+        cls.building = create_building(cls.user, 'Accounts', '00.000.000/0001-23')
+        cls.accounts = {}
+        # code -> (parent code, expected, actual)
+        chart = {
+            '1': (None, '100.00', '90.00'),
+            '1.1': ('1', '10.00', '12.50'),
+            '1.1.1': ('1.1', '1.00', '2.00'),
+            '1.1.2': ('1.1', '3.00', '0.00'),
+            '1.2': ('1', '20.00', '18.00'),
+            '2': (None, '50.00', '60.00'),
+            '2.1': ('2', '5.00', '4.00'),
+        }
+        for code, (parent, expected, actual) in chart.items():
+            cls.accounts[code] = cls.account(code, cls.accounts.get(parent), expected, actual)
+
+    @classmethod
+    def account(cls, code, parent=None, expected='0.00', actual='0.00'):
+        return FinancialMainAccount.objects.create(
+            building=cls.building, code=code, name=f'Account {code}', type='sub' if parent else 'main',
+            parent=parent, expected_amount=Decimal(expected), actual_amount=Decimal(actual),
+        )
+
+    def recursive_totals(self, account):
+        """(expected, actual) of an account's subtree, one query per level."""
+        expected, actual = account.expected_amount, account.actual_amount
+        for child in account.sub_accounts.all():
+            child_expected, child_actual = self.recursive_totals(child)
+            expected, actual = expected + child_expected, actual + child_actual
+        return expected, actual
+
+    def test_totals_match_the_subtree(self):
+        tree = build_account_tree(account_rows(self.building.id))
+        self.assertEqual([node['code'] for node in tree], ['1', '2'])
+        nodes = {node['code']: node for node in walk(tree)}
+        self.assertEqual(len(nodes), 7)
+        self.assertEqual((nodes['1']['totalExpectedAmount'], nodes['1']['totalActualAmount']), ('134.00', '122.50'))
+
+        for code, account in self.accounts.items():
+            with self.subTest(code=code):
+                subtree = build_account_tree(subtree_rows(self.building.id, account.id))
+                self.assertEqual(len(subtree), 1)
+                self.assertEqual(subtree[0], nodes[code])
+                self.assertEqual(
+                    (Decimal(nodes[code]['totalExpectedAmount']), Decimal(nodes[code]['totalActualAmount'])),
+                    self.recursive_totals(account),
+                )
+
+    def test_subtree_is_one_query(self):
+        with self.assertNumQueries(1):
+            rows = subtree_rows(self.building.id, self.accounts['1.1'].id)
+        self.assertEqual([row['code'] for row in rows], ['1.1', '1.1.1', '1.1.2'])
+        self.assertEqual(subtree_rows(self.building.id + 1, self.accounts['1.1'].id), [])
+
+    def test_rows_without_their_parent_become_roots(self):
+        rows = [row for row in account_rows(self.building.id) if row['code'] != '1.1']
+        tree = build_account_tree(rows)
+        self.assertEqual([node['code'] for node in tree], ['1', '1.1.1', '1.1.2', '2'])
+        self.assertEqual(tree[0]['totalExpectedAmount'], '120.00')
+
+    def test_parent_cycles(self):
+        first = self.account('8', expected='1.00')
+        second = self.account('8.1', first, expected='2.00')
+        third = self.account('8.1.1', second, expected='4.00')
+        FinancialMainAccount.objects.filter(id=first.id).update(parent=third)
+
+        tree = build_account_tree(account_rows(self.building.id))
+        nodes = list(walk(tree))
+        self.assertEqual(len(nodes), len({node['id'] for node in nodes}))
+        self.assertEqual(len(nodes), 10)
+        cycle = next(node for node in tree if node['code'].startswith('8'))
+        self.assertEqual(cycle['totalExpectedAmount'], '7.00')
+
+        # The recursive CTE stops at the first repeated row
+        rows = subtree_rows(self.building.id, second.id)
+        self.assertEqual([row['code'] for row in rows], ['8', '8.1', '8.1.1'])
+        self.assertEqual(len(list(walk(build_account_tree(rows)))), 3)
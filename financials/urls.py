@@ -3,7 +3,13 @@ from . import views
 
 urlpatterns = [
     path('account/', views.financial_account_view, name='financial_account_view'),
+    path('account/tree/', views.financial_account_tree_view, name='financial_account_tree'),
     path('annual/', views.annual_budget_view, name='annual_budget_view'),
+    path('annual/bulk/', views.annual_budget_bulk_view, name='annual_budget_bulk'),
     path('expense/', views.expense_view, name='expense_view'),
+    path('expense/bulk/', views.expense_bulk_view, name='expense_bulk'),
     path('collection/', views.collection_view, name='collection_view'),
+    path('collection/bulk/', views.collection_bulk_view, name='collection_bulk'),
+    path('import/<str:kind>/', views.financial_import_view, name='financial_import'),
+    path('summary/', views.financial_summary_view, name='financial_summary'),
 ]
@@ -1,14 +1,34 @@
+import datetime
+import json
+import os
+import uuid
+
+from django.core.files.storage import default_storage
+
 from rest_framework import status
 from rest_framework.response import Response
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
+from sindipro_backend.caching import cache_response
+from sindipro_backend.instrumentation import query_budget
+from sindipro_backend.pagination import KeysetCursorPagination
+from jobs.queue import enqueue_job, run_in_background
+from jobs.views import job_accepted_response
+from building_mgmt.access import building_access
+from building_mgmt.views import get_accessible_building, user_can_access_building
+from .accounts import account_rows, build_account_tree, subtree_rows
+from .bulk import BatchError, create_batch
+from .importer import IMPORT_EXTENSIONS, IMPORTERS, import_financial_file
+from .summary import financial_summary
 from .models import FinancialMainAccount, AnnualBudget, Expense, Collection
 from .serializers import (FinancialMainAccountSerializer, FinancialMainAccountReadSerializer, 
                           AnnualBudgetSerializer, ExpenseSerializer, ExpenseReadSerializer, 
                           AnnualBudgetReadSerializer, CollectionSerializer, CollectionReadSerializer)
 
+@query_budget(3)
 @api_view(['GET', 'POST'])
 @permission_classes([IsAuthenticated])
+@cache_response(depends_on=('financial_account', 'building'))
 def financial_account_view(request):
     """
     GET: Retrieve financial main accounts with building information
@@ -18,17 +38,33 @@ def financial_account_view(request):
     if request.method == 'GET':
         accounts = FinancialMainAccount.objects.select_related('building').all()
         
+        # Only buildings whose financial module the user can view
+        accounts = building_access(request).filter_queryset(accounts, module='financial')
+        
         # Filter by building_id if provided
         building_id = request.GET.get('building_id')
         if building_id:
             accounts = accounts.filter(building_id=building_id)
         
+        # Opt-in cursor pagination (?cursor= / ?limit=)
+        paginator = KeysetCursorPagination(ordering=('code', 'id'))
+        page = paginator.paginate_queryset(accounts, request)
+        if page is not None:
+            return paginator.get_paginated_response(FinancialMainAccountReadSerializer(page, many=True).data)
+        
         serializer = FinancialMainAccountReadSerializer(accounts, many=True)
         return Response(serializer.data, status=status.HTTP_200_OK)
     
     elif request.method == 'POST':
         serializer = FinancialMainAccountSerializer(data=request.data)
         
+        if serializer.is_valid() and not user_can_access_building(
+            request, serializer.validated_data['building_id'], module='financial', edit=True
+        ):
+            return Response({
+                'error': 'Building not found or access denied'
+            }, status=status.HTTP_404_NOT_FOUND)
+        
         if serializer.is_valid():
             account = serializer.save()
             return Response({
@@ -43,8 +79,10 @@ def financial_account_view(request):
             'details': serializer.errors
         }, status=status.HTTP_400_BAD_REQUEST)
 
+@query_budget(3)
 @api_view(['GET', 'POST'])
 @permission_classes([IsAuthenticated])
+@cache_response(depends_on=('annual_budget', 'building'))
 def annual_budget_view(request):
     """
     GET: Retrieve annual budget entries with building and category information
@@ -61,17 +99,33 @@ def annual_budget_view(request):
     if request.method == 'GET':
         budgets = AnnualBudget.objects.select_related('building', 'category').all()
         
+        # Only buildings whose financial module the user can view
+        budgets = building_access(request).filter_queryset(budgets, module='financial')
+        
         # Filter by building_id if provided
         building_id = request.GET.get('building_id')
         if building_id:
             budgets = budgets.filter(building_id=building_id)
         
+        # Opt-in cursor pagination (?cursor= / ?limit=)
+        paginator = KeysetCursorPagination(ordering=('-created_at', '-id'))
+        page = paginator.paginate_queryset(budgets, request)
+        if page is not None:
+            return paginator.get_paginated_response(AnnualBudgetReadSerializer(page, many=True).data)
+        
         serializer = AnnualBudgetReadSerializer(budgets, many=True)
         return Response(serializer.data, status=status.HTTP_200_OK)
     
     elif request.method == 'POST':
         serializer = AnnualBudgetSerializer(data=request.data, context={'request': request})
         
+        if serializer.is_valid() and not user_can_access_building(
+            request, serializer.validated_data['building_id'], module='financial', edit=True
+        ):
+            return Response({
+                'error': 'Building not found or access denied'
+            }, status=status.HTTP_404_NOT_FOUND)
+        
         if serializer.is_valid():
             annual_budget = serializer.save()
             return Response({
@@ -88,8 +142,10 @@ def annual_budget_view(request):
             'details': serializer.errors
         }, status=status.HTTP_400_BAD_REQUEST)
 
+@query_budget(3)
 @api_view(['GET', 'POST'])
 @permission_classes([IsAuthenticated])
+@cache_response(depends_on=('expense', 'building'))
 def expense_view(request):
     """
     GET: Retrieve expense entries with building and category information
@@ -106,17 +162,33 @@ def expense_view(request):
     if request.method == 'GET':
         expenses = Expense.objects.select_related('building', 'category').all()
         
+        # Only buildings whose financial module the user can view
+        expenses = building_access(request).filter_queryset(expenses, module='financial')
+        
         # Filter by building_id if provided
         building_id = request.GET.get('building_id')
         if building_id:
             expenses = expenses.filter(building_id=building_id)
         
+        # Opt-in cursor pagination (?cursor= / ?limit=)
+        paginator = KeysetCursorPagination(ordering=('-expense_date', '-id'))
+        page = paginator.paginate_queryset(expenses, request)
+        if page is not None:
+            return paginator.get_paginated_response(ExpenseReadSerializer(page, many=True).data)
+        
         serializer = ExpenseReadSerializer(expenses, many=True)
         return Response(serializer.data, status=status.HTTP_200_OK)
     
     elif request.method == 'POST':
         serializer = ExpenseSerializer(data=request.data, context={'request': request})
         
+        if serializer.is_valid() and not user_can_access_building(
+            request, serializer.validated_data['building_id'], module='financial', edit=True
+        ):
+            return Response({
+                'error': 'Building not found or access denied'
+            }, status=status.HTTP_404_NOT_FOUND)
+        
         if serializer.is_valid():
             expense = serializer.save()
             return Response({
@@ -132,8 +204,10 @@ def expense_view(request):
             'error': 'Invalid data',
             'details': serializer.errors
         }, status=status.HTTP_400_BAD_REQUEST)
+@query_budget(3)
 @api_view(['GET', 'POST'])
 @permission_classes([IsAuthenticated])
+@cache_response(depends_on=('collection', 'building'))
 def collection_view(request):
     """
     GET: Retrieve collection entries with building information
@@ -152,17 +226,33 @@ def collection_view(request):
     if request.method == 'GET':
         collections = Collection.objects.select_related('building').all()
         
+        # Only buildings whose financial module the user can view
+        collections = building_access(request).filter_queryset(collections, module='financial')
+        
         # Filter by building_id if provided
         building_id = request.GET.get('building_id')
         if building_id:
             collections = collections.filter(building_id=building_id)
         
+        # Opt-in cursor pagination (?cursor= / ?limit=)
+        paginator = KeysetCursorPagination(ordering=('-start_date', '-id'))
+        page = paginator.paginate_queryset(collections, request)
+        if page is not None:
+            return paginator.get_paginated_response(CollectionReadSerializer(page, many=True).data)
+        
         serializer = CollectionReadSerializer(collections, many=True)
         return Response(serializer.data, status=status.HTTP_200_OK)
     
     elif request.method == 'POST':
         serializer = CollectionSerializer(data=request.data, context={'request': request})
         
+        if serializer.is_valid() and not user_can_access_building(
+            request, serializer.validated_data['building_id'], module='financial', edit=True
+        ):
+            return Response({
+                'error': 'Building not found or access denied'
+            }, status=status.HTTP_404_NOT_FOUND)
+        
         if serializer.is_valid():
             collection = serializer.save()
             return Response({
@@ -179,3 +269,212 @@ def collection_view(request):
             'error': 'Invalid data',
             'details': serializer.errors
         }, status=status.HTTP_400_BAD_REQUEST)
+
+@query_budget(3)
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@cache_response(depends_on=('financial_account',))
+def financial_account_tree_view(request):
+    """
+    GET: Chart of accounts of one building as a tree, each node carrying the
+         expected/actual totals of its whole subtree
+         Required query parameter: building_id
+         Optional query parameter: root_id to return just that account's subtree
+    """
+    try:
+        building_id = int(request.GET.get('building_id') or 0)
+        root_id = int(request.GET.get('root_id') or 0)
+    except ValueError:
+        return Response({
+            'error': 'building_id and root_id must be integers'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    if not building_id:
+        return Response({
+            'error': 'building_id is required'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    if not user_can_access_building(request, building_id, module='financial'):
+        return Response({
+            'error': 'Building not found or access denied'
+        }, status=status.HTTP_404_NOT_FOUND)
+
+    rows = subtree_rows(building_id, root_id) if root_id else account_rows(building_id)
+    if root_id and not rows:
+        return Response({
+            'error': 'Account not found'
+        }, status=status.HTTP_404_NOT_FOUND)
+
+    return Response({
+        'building_id': building_id,
+        'count': len(rows),
+        'accounts': build_account_tree(rows),
+    }, status=status.HTTP_200_OK)
+
+@query_budget(5)
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@cache_response(depends_on=('expense', 'annual_budget', 'collection', 'financial_account'))
+def financial_summary_view(request):
+    """
+    GET: Financial dashboard for one building, read from the monthly snapshots
+         Required query parameter: building_id
+         Optional query parameters: year (defaults to the current year), month (1-12)
+    Returns budget vs actual by category, expenses and collections by month,
+    collection totals and the account hierarchy.
+    """
+    building_id = request.GET.get('building_id')
+    if not building_id:
+        return Response({
+            'error': 'building_id is required'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        building_id = int(building_id)
+        year = int(request.GET.get('year') or datetime.date.today().year)
+        month = request.GET.get('month')
+        month = int(month) if month else None
+    except ValueError:
+        return Response({
+            'error': 'building_id, year and month must be integers'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    if not 1 <= year <= 9998 or (month is not None and not 1 <= month <= 12):
+        return Response({
+            'error': 'Invalid year or month'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    if not user_can_access_building(request, building_id, module='financial'):
+        return Response({
+            'error': 'Building not found or access denied'
+        }, status=status.HTTP_404_NOT_FOUND)
+
+    return Response(financial_summary(building_id, year, month), status=status.HTTP_200_OK)
+
+
+def bulk_create_response(request, serializer_class, label):
+    try:
+        created = create_batch(request, request.data, serializer_class)
+    except BatchError as e:
+        body = {'error': e.message}
+        if e.details:
+            body['details'] = e.details
+        return Response(body, status=status.HTTP_400_BAD_REQUEST)
+    return Response({
+        'message': f'{len(created)} {label} created successfully',
+        'created': len(created),
+        'ids': [obj.id for obj in created],
+    }, status=status.HTTP_201_CREATED)
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def expense_bulk_view(request):
+    """
+    POST: Create many expenses at once; body is a list of expense objects
+          ({amount, buildingId, category, month}). Nothing is created unless every
+          item is valid; errors are returned per item index.
+    """
+    return bulk_create_response(request, ExpenseSerializer, 'expenses')
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def annual_budget_bulk_view(request):
+    """
+    POST: Create many annual budget entries at once; body is a list of
+          {account_category, building_id, sub_item, budgeted_amount} objects.
+          Nothing is created unless every item is valid; errors are returned per item index.
+    """
+    return bulk_create_response(request, AnnualBudgetSerializer, 'annual budgets')
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def collection_bulk_view(request):
+    """
+    POST: Create many collections at once; body is a list of
+          {buildingId, name, purpose, monthlyAmount, startDate, active} objects.
+          Nothing is created unless every item is valid; errors are returned per item index.
+    """
+    return bulk_create_response(request, CollectionSerializer, 'collections')
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def financial_import_view(request, kind):
+    """
+    POST: Import expenses, annual budgets or chart of accounts entries
+          (kind = expense | annual | account) from a CSV or XLSX upload (`file`).
+          Required: building_id. Optional: mapping (JSON {"file header": "field"}),
+          dry_run=1 to only validate, encoding (CSV, default utf-8),
+          async=1 to run the import as a background job (202, with JOBS_ENABLED).
+          Nothing is imported unless every row is valid; errors are returned per row.
+    """
+    if kind not in IMPORTERS:
+        return Response({
+            'error': f"Unknown import type '{kind}'",
+            'details': f"Expected one of: {', '.join(IMPORTERS)}"
+        }, status=status.HTTP_404_NOT_FOUND)
+
+    def param(name, default=None):
+        return request.data.get(name) or request.query_params.get(name) or default
+
+    building_id = param('building_id')
+    try:
+        building_id = int(building_id)
+    except (TypeError, ValueError):
+        return Response({
+            'error': 'building_id parameter is required'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    building = get_accessible_building(request, building_id, module='financial', edit=True)
+    if not building:
+        return Response({
+            'error': 'Building not found or access denied'
+        }, status=status.HTTP_404_NOT_FOUND)
+
+    if 'file' not in request.FILES:
+        return Response({
+            'error': 'No file uploaded. Please upload a CSV or Excel file.'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    upload = request.FILES['file']
+    extension = os.path.splitext(upload.name)[1].lower()
+    if extension not in IMPORT_EXTENSIONS:
+        return Response({
+            'error': f"Invalid file type. Please upload one of: {', '.join(IMPORT_EXTENSIONS)}"
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    mapping = param('mapping')
+    if isinstance(mapping, str):
+        try:
+            mapping = json.loads(mapping)
+        except ValueError as e:
+            return Response({
+                'error': 'Invalid mapping',
+                'details': str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
+    if mapping is not None and not isinstance(mapping, dict):
+        return Response({
+            'error': 'Invalid mapping',
+            'details': 'Expected a JSON object of {"file header": "field"}'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    options = {
+        'mapping': mapping,
+        'dry_run': param('dry_run') in ('1', 'true'),
+        'encoding': param('encoding', 'utf-8-sig'),
+    }
+
+    if run_in_background(param('async')):
+        # Keep the upload under MEDIA_ROOT so a worker process can read it
+        upload_name = default_storage.save(f'job_uploads/{uuid.uuid4().hex}{extension}', upload)
+        job = enqueue_job('financial_import', {
+            'kind': kind,
+            'building_id': building.id,
+            'upload_name': upload_name,
+            **options,
+        }, user=request.user)
+        return job_accepted_response(job)
+
+    response_data, status_code = import_financial_file(
+        kind, building, upload, upload.name, user=request.user, **options
+    )
+    return Response(response_data, status=status_code)
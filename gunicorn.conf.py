@@ -0,0 +1,59 @@
+"""
+Gunicorn settings, read from the environment so a deployment (or a load
+test run, see loadtest/) can be tuned without editing the start command.
+gunicorn picks this file up from the working directory.
+
+- WEB_CONCURRENCY: worker processes (default 2 x CPUs + 1, at most 8)
+- GUNICORN_THREADS: threads per worker; > 1 switches sync workers to gthread
+- GUNICORN_MAX_REQUESTS / GUNICORN_MAX_REQUESTS_JITTER: recycle a worker
+  after that many requests (0 disables), jittered so workers don't restart together
+- GUNICORN_PRELOAD: import the app once in the master before forking
+- GUNICORN_KEEPALIVE: seconds an idle keep-alive connection is held
+- GUNICORN_TIMEOUT / GUNICORN_GRACEFUL_TIMEOUT: worker watchdog and shutdown grace
+- SERVER_MODE=asgi: uvicorn workers (threads do not apply)
+
+Every worker thread can hold one database connection for CONN_MAX_AGE
+seconds, so workers x threads must stay below the database's connection limit.
+"""
+import multiprocessing
+import os
+
+
+def _int(name, default):
+    return int(os.environ.get(name, default))
+
+
+def _bool(name, default):
+    return os.environ.get(name, str(default)).lower() in ('1', 'true', 'yes', 'on')
+
+
+bind = os.environ.get('GUNICORN_BIND', f"0.0.0.0:{os.environ.get('PORT', '8000')}")
+
+workers = _int('WEB_CONCURRENCY', min(multiprocessing.cpu_count() * 2 + 1, 8))
+# Tell the app how many processes share the load (settings.WEB_CONCURRENCY)
+os.environ['WEB_CONCURRENCY'] = str(workers)
+threads = _int('GUNICORN_THREADS', 1)
+
+if os.environ.get('SERVER_MODE', 'wsgi') == 'asgi':
+    worker_class = 'uvicorn_worker.UvicornWorker'
+elif threads > 1:
+    worker_class = 'gthread'
+else:
+    worker_class = 'sync'
+
+max_requests = _int('GUNICORN_MAX_REQUESTS', 1000)
+max_requests_jitter = _int('GUNICORN_MAX_REQUESTS_JITTER', max_requests // 10)
+
+preload_app = _bool('GUNICORN_PRELOAD', False)
+keepalive = _int('GUNICORN_KEEPALIVE', 5)
+timeout = _int('GUNICORN_TIMEOUT', 30)
+graceful_timeout = _int('GUNICORN_GRACEFUL_TIMEOUT', 30)
+
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG') or None
+errorlog = '-'
+loglevel = os.environ.get('GUNICORN_LOG_LEVEL', 'info')
+
+
+def on_starting(server):
+    server.log.info('workers=%s threads=%s worker_class=%s max_requests=%s preload=%s keepalive=%s',
+                    workers, threads, worker_class, max_requests, preload_app, keepalive)
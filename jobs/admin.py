@@ -0,0 +1,10 @@
+from django.contrib import admin
+from .models import Job
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'job_type', 'status', 'progress', 'attempts', 'created_by', 'created_at', 'finished_at']
+    list_filter = ['status', 'job_type']
+    search_fields = ['job_type', 'error_message']
+    readonly_fields = ['created_at', 'updated_at', 'started_at', 'finished_at']
@@ -0,0 +1,65 @@
+import logging
+import multiprocessing
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from jobs.queue import claim_next_job, requeue_stale_jobs
+from jobs.worker import execute_job, init_worker
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Run background jobs (Excel imports/exports, reports) with a process pool'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=settings.JOB_WORKER_PROCESSES,
+                            help='Number of worker processes')
+        parser.add_argument('--poll-interval', type=float, default=settings.JOB_POLL_INTERVAL,
+                            help='Seconds to wait between queue polls when idle')
+        parser.add_argument('--once', action='store_true',
+                            help='Exit once the queue is empty instead of polling forever')
+
+    def handle(self, *args, **options):
+        processes = max(options['processes'], 1)
+        poll_interval = options['poll_interval']
+
+        self.stdout.write(f'Starting {processes} job worker process(es)...')
+
+        # 'spawn' gives every worker its own fresh database connection instead
+        # of a forked copy of this process' socket
+        context = multiprocessing.get_context('spawn')
+        running = set()
+
+        with ProcessPoolExecutor(max_workers=processes, mp_context=context, initializer=init_worker) as pool:
+            try:
+                while True:
+                    requeue_stale_jobs()
+
+                    # Fill every free slot with a claimed job
+                    while len(running) < processes:
+                        job_id = claim_next_job()
+                        if job_id is None:
+                            break
+                        self.stdout.write(f'Dispatching job {job_id}')
+                        running.add(pool.submit(execute_job, job_id))
+
+                    if not running:
+                        if options['once']:
+                            break
+                        time.sleep(poll_interval)
+                        continue
+
+                    done, running = wait(running, timeout=poll_interval, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        try:
+                            self.stdout.write(f'Finished job {future.result()}')
+                        except Exception:
+                            logger.exception('Job worker process crashed')
+            except KeyboardInterrupt:
+                self.stdout.write('Stopping job workers...')
+
+        self.stdout.write(self.style.SUCCESS('Job workers stopped'))
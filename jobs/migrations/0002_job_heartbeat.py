@@ -0,0 +1,28 @@
+# Generated by Django 5.2.4 on 2026-10-18 22:11
+
+from django.db import migrations, models
+
+
+def strip_tracebacks(apps, schema_editor):
+    # Failed jobs used to store the full traceback, which their owners can read
+    Job = apps.get_model('jobs', 'Job')
+    marker = '\nTraceback (most recent call last):'
+    for job in Job.objects.filter(error_message__contains=marker).only('id', 'error_message'):
+        job.error_message = job.error_message.split(marker, 1)[0]
+        job.save(update_fields=['error_message'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='job',
+            name='heartbeat_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(strip_tracebacks, migrations.RunPython.noop),
+    ]
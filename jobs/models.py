@@ -0,0 +1,43 @@
+from django.db import models
+from django.contrib.auth import get_user_model
+
+User = get_user_model()
+
+class Job(models.Model):
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    ]
+
+    job_type = models.CharField(max_length=100)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+    payload = models.JSONField(default=dict)  # Arguments passed to the job handler
+
+    # Progress and result
+    progress = models.PositiveSmallIntegerField(default=0)  # Percentage 0-100
+    result = models.JSONField(null=True, blank=True)
+    result_file = models.FileField(upload_to='job_results/', null=True, blank=True)
+    error_message = models.TextField(blank=True)
+
+    # Retry handling
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=3)
+    run_after = models.DateTimeField(null=True, blank=True)  # Not picked up before this time
+
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='jobs')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)  # Refreshed by the worker while running
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.job_type} #{self.id} - {self.status}"
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'run_after', 'created_at'], name='jobs_job_queue_idx'),
+        ]
@@ -0,0 +1,170 @@
+import logging
+import os
+import threading
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+# job_type -> callable(job) returning a JSON-serializable result
+JOB_HANDLERS = {}
+
+
+def register_job(job_type):
+    """Register the decorated function as the handler for `job_type`."""
+    def decorator(func):
+        JOB_HANDLERS[job_type] = func
+        return func
+    return decorator
+
+
+def run_in_background(flag):
+    """
+    Whether a request asking for a background job (`async=1`) gets one: only
+    with JOBS_ENABLED, when a `manage.py run_workers` process shares the
+    database and MEDIA_ROOT. Otherwise the work is done in the request.
+    """
+    return flag == '1' and settings.JOBS_ENABLED
+
+
+def enqueue_job(job_type, payload=None, user=None, max_attempts=None):
+    """Create a queued job; it is picked up by `manage.py run_workers`."""
+    if job_type not in JOB_HANDLERS:
+        raise ValueError(f"Unknown job type: {job_type}")
+
+    return Job.objects.create(
+        job_type=job_type,
+        payload=payload or {},
+        created_by=user,
+        max_attempts=max_attempts or settings.JOB_MAX_ATTEMPTS,
+    )
+
+
+def claim_next_job():
+    """
+    Atomically move the oldest runnable queued job to 'running'.
+    Uses SELECT ... FOR UPDATE SKIP LOCKED so several worker hosts can poll
+    the same table without handing out a job twice. Returns the job id or None.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        job = (
+            Job.objects.select_for_update(skip_locked=True)
+            .filter(status='queued')
+            .filter(Q(run_after__isnull=True) | Q(run_after__lte=now))
+            .order_by('created_at')
+            .first()
+        )
+        if job is None:
+            return None
+
+        job.status = 'running'
+        job.attempts += 1
+        job.started_at = now
+        job.heartbeat_at = now
+        job.save(update_fields=['status', 'attempts', 'started_at', 'heartbeat_at', 'updated_at'])
+        return job.id
+
+
+def requeue_stale_jobs():
+    """
+    Give back running jobs whose worker died: no heartbeat for JOB_STALE_AFTER
+    seconds. Jobs that are merely long keep beating and are left alone.
+    """
+    cutoff = timezone.now() - timedelta(seconds=settings.JOB_STALE_AFTER)
+    with transaction.atomic():
+        stale = Job.objects.select_for_update(skip_locked=True).filter(status='running').filter(
+            Q(heartbeat_at__lt=cutoff) | Q(heartbeat_at__isnull=True, started_at__lt=cutoff)
+        )
+        for job in stale:
+            logger.warning("Requeueing job %s (%s): no heartbeat since %s", job.id, job.job_type, job.heartbeat_at)
+            _retry_or_fail(job, 'Job worker stopped responding')
+
+
+@contextmanager
+def job_heartbeat(job_id, interval=None):
+    """Refresh the job's heartbeat_at from a background thread while the block runs."""
+    interval = interval or settings.JOB_HEARTBEAT_INTERVAL
+    stop = threading.Event()
+
+    def beat():
+        try:
+            while not stop.wait(interval):
+                Job.objects.filter(id=job_id, status='running').update(heartbeat_at=timezone.now())
+        except Exception:
+            logger.exception("Heartbeat of job %s failed", job_id)
+        finally:
+            connection.close()
+
+    thread = threading.Thread(target=beat, name=f'job-{job_id}-heartbeat', daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        thread.join()
+
+
+def _retry_or_fail(job, error_message):
+    job.error_message = error_message
+    if job.attempts < job.max_attempts:
+        # Exponential backoff: delay, 2x delay, 4x delay, ...
+        delay = settings.JOB_RETRY_DELAY * (2 ** max(job.attempts - 1, 0))
+        job.status = 'queued'
+        job.run_after = timezone.now() + timedelta(seconds=delay)
+    else:
+        job.status = 'failed'
+        job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'run_after', 'error_message', 'finished_at', 'updated_at'])
+
+
+def run_job(job_id):
+    """Execute a claimed job and record its result, retry or failure."""
+    job = Job.objects.get(id=job_id)
+    handler = JOB_HANDLERS.get(job.job_type)
+
+    if handler is None:
+        job.status = 'failed'
+        job.error_message = f"No handler registered for job type '{job.job_type}'"
+        job.finished_at = timezone.now()
+        job.save(update_fields=['status', 'error_message', 'finished_at', 'updated_at'])
+        return
+
+    try:
+        with job_heartbeat(job.id):
+            result = handler(job)
+    except Exception as e:
+        # The traceback goes to the log only: error_message is shown to the job's owner
+        logger.exception("Job %s (%s) failed on attempt %s", job.id, job.job_type, job.attempts)
+        _retry_or_fail(job, f"{type(e).__name__}: {e}")
+        return
+
+    job.status = 'completed'
+    job.progress = 100
+    job.result = result
+    job.error_message = ''
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'progress', 'result', 'error_message', 'finished_at', 'updated_at'])
+
+
+def set_job_progress(job, done, total):
+    """Store progress as a percentage; 100 is reserved for completed jobs."""
+    percent = min(int(done * 100 / total), 99) if total else 0
+    if percent != job.progress:
+        job.progress = percent
+        Job.objects.filter(id=job.id).update(progress=percent, updated_at=timezone.now())
+
+
+def save_job_result_file(job, filename, path):
+    """Copy a file produced by a job into MEDIA_ROOT/job_results/."""
+    with open(path, 'rb') as f:
+        job.result_file.save(f'{job.id}_{os.path.basename(filename)}', File(f), save=False)
+    Job.objects.filter(id=job.id).update(result_file=job.result_file.name, updated_at=timezone.now())
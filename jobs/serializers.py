@@ -0,0 +1,25 @@
+from django.urls import reverse
+from rest_framework import serializers
+from .models import Job
+
+
+class JobSerializer(serializers.ModelSerializer):
+    status_url = serializers.SerializerMethodField()
+    result_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Job
+        fields = [
+            'id', 'job_type', 'status', 'progress', 'attempts', 'max_attempts',
+            'error_message', 'result', 'status_url', 'result_url',
+            'created_at', 'started_at', 'finished_at'
+        ]
+        read_only_fields = fields
+
+    def get_status_url(self, obj):
+        return reverse('job_status', kwargs={'id': obj.id})
+
+    def get_result_url(self, obj):
+        if obj.status != 'completed':
+            return None
+        return reverse('job_result', kwargs={'id': obj.id})
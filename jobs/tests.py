@@ -0,0 +1,85 @@
+from datetime import timedelta
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from building_mgmt.tests import create_building, create_user
+
+from .models import Job
+from .queue import claim_next_job, register_job, requeue_stale_jobs, run_job
+
+
+@register_job('test_failing')
+def failing_job(job):
+    raise ValueError('bad payload')
+
+
+@override_settings(JOB_STALE_AFTER=300)
+class RequeueStaleJobsTests(TestCase):
+    def running_job(self, started, heartbeat):
+        now = timezone.now()
+        return Job.objects.create(
+            job_type='test_failing', status='running', attempts=1,
+            started_at=now - timedelta(seconds=started),
+            heartbeat_at=now - timedelta(seconds=heartbeat) if heartbeat is not None else None,
+        )
+
+    def test_long_job_with_recent_heartbeat_is_kept(self):
+        job = self.running_job(started=7200, heartbeat=10)
+        requeue_stale_jobs()
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'running')
+
+    def test_job_without_heartbeat_is_requeued(self):
+        stale = self.running_job(started=7200, heartbeat=600)
+        legacy = self.running_job(started=600, heartbeat=None)
+        requeue_stale_jobs()
+        for job in (stale, legacy):
+            job.refresh_from_db()
+            self.assertEqual(job.status, 'queued')
+
+
+class RunJobTests(TestCase):
+    def test_failure_stores_short_message(self):
+        job = Job.objects.create(job_type='test_failing', max_attempts=1)
+        self.assertEqual(claim_next_job(), job.id)
+
+        with self.assertLogs('jobs.queue', level='ERROR') as logs:
+            run_job(job.id)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'failed')
+        self.assertEqual(job.error_message, 'ValueError: bad payload')
+        self.assertIn('Traceback', '\n'.join(logs.output))
+
+
+class BackgroundRequestTests(TestCase):
+    """`?async=1` only queues a job where a worker runs (JOBS_ENABLED)."""
+
+    def setUp(self):
+        user = create_user('master@example.com')
+        self.building = create_building(user, 'Jobs', '00.000.000/0001-40', units=3)
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+
+    def export(self):
+        return self.client.get(f'/api/buildings/{self.building.id}/units/export/excel/?async=1')
+
+    @override_settings(JOBS_ENABLED=False)
+    def test_without_workers_the_request_does_the_work(self):
+        response = self.export()
+        self.assertEqual(response.status_code, 200)
+        response.close()
+        self.assertFalse(Job.objects.exists())
+
+        response = self.client.post('/api/consumption/anomalies/', {'building_id': self.building.id})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'series': 0, 'readings': 0, 'anomalies': 0})
+        self.assertFalse(Job.objects.exists())
+
+    @override_settings(JOBS_ENABLED=True)
+    def test_with_workers_a_job_is_queued(self):
+        response = self.export()
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(Job.objects.get().job_type, 'units_excel_export')
@@ -0,0 +1,7 @@
+from django.urls import path
+from . import views
+
+urlpatterns = [
+    path('<int:id>/', views.job_status, name='job_status'),
+    path('<int:id>/result/', views.job_result, name='job_result'),
+]
@@ -0,0 +1,69 @@
+import os
+
+from django.http import FileResponse
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAuthenticated
+from .models import Job
+from .serializers import JobSerializer
+
+
+def get_accessible_job(user, job_id):
+    """
+    Get job if user has access.
+    Master role users can see all jobs, others only the jobs they started.
+    """
+    jobs = Job.objects.all() if user.role == 'master' else Job.objects.filter(created_by=user)
+    try:
+        return jobs.get(id=job_id)
+    except Job.DoesNotExist:
+        return None
+
+
+def job_accepted_response(job):
+    """202 response returned by endpoints that hand their work to a background job."""
+    return Response({
+        'message': 'Job queued',
+        'job_id': job.id,
+        'job': JobSerializer(job).data
+    }, status=status.HTTP_202_ACCEPTED)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def job_status(request, id):
+    job = get_accessible_job(request.user, id)
+    if not job:
+        return Response({
+            'error': 'Job not found or access denied'
+        }, status=status.HTTP_404_NOT_FOUND)
+
+    return Response(JobSerializer(job).data, status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def job_result(request, id):
+    """
+    GET: Download the file produced by a completed job, or its JSON result
+         when the job does not produce a file.
+    """
+    job = get_accessible_job(request.user, id)
+    if not job:
+        return Response({
+            'error': 'Job not found or access denied'
+        }, status=status.HTTP_404_NOT_FOUND)
+
+    if job.status != 'completed':
+        return Response({
+            'error': 'Job has not completed yet',
+            'status': job.status,
+            'progress': job.progress
+        }, status=status.HTTP_409_CONFLICT)
+
+    if job.result_file:
+        filename = (job.result or {}).get('filename') or os.path.basename(job.result_file.name)
+        return FileResponse(job.result_file.open('rb'), as_attachment=True, filename=filename)
+
+    return Response(job.result, status=status.HTTP_200_OK)
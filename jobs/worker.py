@@ -0,0 +1,23 @@
+"""
+Entry points executed inside the run_workers process pool.
+
+Kept free of model imports at module level: pool processes are started
+with the 'spawn' method and must set Django up before touching the ORM.
+"""
+
+
+def init_worker():
+    import django
+    django.setup()
+
+
+def execute_job(job_id):
+    from django.db import close_old_connections
+    from .queue import run_job
+
+    close_old_connections()
+    try:
+        run_job(job_id)
+    finally:
+        close_old_connections()
+    return job_id
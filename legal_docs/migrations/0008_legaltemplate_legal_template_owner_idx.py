@@ -0,0 +1,20 @@
+# Generated by Django 5.2.4 on 2026-10-18 20:53
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('building_mgmt', '0012_pagination_indexes'),
+        ('legal_docs', '0007_alter_legaltemplate_frequency'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='legaltemplate',
+            index=models.Index(fields=['created_by', 'created_at', 'id'], name='legal_template_owner_idx'),
+        ),
+    ]
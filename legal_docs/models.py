@@ -116,5 +116,10 @@ class LegalTemplate(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_by', 'created_at', 'id'], name='legal_template_owner_idx'),
+        ]
+    
     def __str__(self):
         return self.name
\ No newline at end of file
@@ -4,6 +4,7 @@ from rest_framework import viewsets, status
 from rest_framework.response import Response
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
+from sindipro_backend.pagination import KeysetCursorPagination
 from .models import LegalDocument, LegalObligation, LegalTemplate
 from .serializers import LegalDocumentSerializer, LegalObligationSerializer, LegalTemplateSerializer
 
@@ -13,6 +14,13 @@ from .serializers import LegalDocumentSerializer, LegalObligationSerializer, Leg
 def legal_template_handler(request):
     if request.method == 'GET':
         templates = LegalTemplate.objects.filter(created_by=request.user, active=True)
+
+        # Opt-in cursor pagination (?cursor= / ?limit=)
+        paginator = KeysetCursorPagination(ordering=('-created_at', '-id'), results_key='templates')
+        page = paginator.paginate_queryset(templates, request)
+        if page is not None:
+            return paginator.get_paginated_response(LegalTemplateSerializer(page, many=True).data)
+
         serializer = LegalTemplateSerializer(templates, many=True)
         
         return Response({
@@ -0,0 +1,42 @@
+#!/usr/bin/env bash
+# Reproducible local load test: fresh SQLite database (or the PostgreSQL from
+# DB_* when DB_ENGINE=postgresql) seeded by seed_buildings, the server started
+# through ./start.sh with the current WEB_CONCURRENCY / GUNICORN_* / SERVER_MODE
+# settings, then loadtest/run.py with the given arguments.
+#
+#   WEB_CONCURRENCY=2 GUNICORN_THREADS=4 loadtest/local.sh --label 2w4t --output /tmp/2w4t.json
+
+set -o errexit
+
+cd "$(dirname "$0")/.."
+
+export DB_ENGINE="${DB_ENGINE:-sqlite}"
+export DB_SQLITE_PATH="${DB_SQLITE_PATH:-/tmp/sindipro_loadtest.sqlite3}"
+export DEBUG="${DEBUG:-False}"
+export PORT="${PORT:-8765}"
+export GUNICORN_LOG_LEVEL="${GUNICORN_LOG_LEVEL:-warning}"
+FINANCIAL_MONTHS="${FINANCIAL_MONTHS:-24}"
+SERVER_LOG="${SERVER_LOG:-/tmp/sindipro_loadtest_server.log}"
+
+if [ "$DB_ENGINE" = "sqlite" ]; then
+    # Tables straight from the models: the historical migrations only replay on PostgreSQL
+    export DJANGO_SETTINGS_MODULE=loadtest.settings
+    rm -f "$DB_SQLITE_PATH"
+    python manage.py migrate --run-syncdb --noinput -v 0
+else
+    python manage.py migrate --noinput -v 0
+fi
+if [ "$DB_ENGINE" = "sqlite" ] || [ "${SEED:-0}" = "1" ]; then
+    python manage.py seed_buildings --financial-months "$FINANCIAL_MONTHS" > /dev/null
+fi
+
+./start.sh > "$SERVER_LOG" 2>&1 &
+SERVER_PID=$!
+trap 'kill $SERVER_PID 2>/dev/null; wait $SERVER_PID 2>/dev/null' EXIT
+
+for _ in $(seq 1 50); do
+    curl -s -o /dev/null "http://127.0.0.1:$PORT/" && break
+    sleep 0.2
+done
+
+python loadtest/run.py --base-url "http://127.0.0.1:$PORT" "$@"
@@ -0,0 +1,217 @@
+"""
+HTTP load test for the SINDIPRO API.
+
+Drives a running server (see loadtest/local.sh for a self-contained SQLite
+setup) with `--concurrency` clients for `--duration` seconds per scenario and
+reports throughput and latency percentiles per endpoint. Each scenario is
+either one endpoint or `mixed`, a weighted blend of all of them in the same
+run (slow Excel exports competing with short list requests for workers).
+
+Results can be saved with --output and compared with --compare, so gunicorn
+settings (WEB_CONCURRENCY, GUNICORN_THREADS, ...) can be measured against a
+baseline:
+
+    python loadtest/run.py --label 2w1t --output /tmp/2w1t.json
+    python loadtest/run.py --label 2w4t --compare /tmp/2w1t.json
+
+Requires httpx (loadtest/requirements.txt).
+"""
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+
+import httpx
+
+# name -> (method, path, weight in the mixed scenario)
+ENDPOINTS = {
+    'login': ('POST', '/api/auth/login/', 1),
+    'buildings': ('GET', '/api/buildings/', 4),
+    'units': ('GET', '/api/buildings/units/', 4),
+    'financial_accounts': ('GET', '/api/financial/account/?building_id={building_id}', 2),
+    'annual_budgets': ('GET', '/api/financial/annual/?building_id={building_id}', 2),
+    'expenses': ('GET', '/api/financial/expense/?building_id={building_id}', 4),
+    'collections': ('GET', '/api/financial/collection/?building_id={building_id}', 2),
+    'units_excel': ('GET', '/api/buildings/{building_id}/units/export/excel/', 1),
+}
+
+SCENARIOS = [*ENDPOINTS, 'mixed']
+
+PERCENTILES = (50, 90, 95, 99)
+
+
+def percentile(ordered, p):
+    """Nearest-rank percentile of an ascending list."""
+    if not ordered:
+        return None
+    rank = max(1, -(-len(ordered) * p // 100))
+    return ordered[rank - 1]
+
+
+class Stats:
+    def __init__(self):
+        self.latencies = []
+        self.errors = 0
+        self.statuses = {}
+        self.bytes = 0
+
+    def record(self, elapsed, status, size):
+        self.latencies.append(elapsed)
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+        self.bytes += size
+        if not isinstance(status, int) or status >= 400:
+            self.errors += 1
+
+    def summary(self, duration):
+        ordered = sorted(self.latencies)
+        result = {
+            'requests': len(ordered),
+            'errors': self.errors,
+            'rps': round(len(ordered) / duration, 1),
+            'mean_ms': round(sum(ordered) / len(ordered) * 1000, 1) if ordered else None,
+            'max_ms': round(ordered[-1] * 1000, 1) if ordered else None,
+            'kb_per_request': round(self.bytes / len(ordered) / 1024, 1) if ordered else None,
+            'statuses': {str(status): count for status, count in sorted(self.statuses.items(), key=str)},
+        }
+        for p in PERCENTILES:
+            value = percentile(ordered, p)
+            result[f'p{p}_ms'] = round(value * 1000, 1) if value is not None else None
+        return result
+
+
+async def login(client, email, password):
+    response = await client.post('/api/auth/login/', json={'email': email, 'password': password})
+    if response.status_code != 200:
+        sys.exit(f'Login as {email} failed ({response.status_code}): {response.text[:200]}')
+    return response.json()['access']
+
+
+async def resolve_building(client, headers):
+    response = await client.get('/api/buildings/', headers=headers)
+    response.raise_for_status()
+    buildings = response.json()
+    if not buildings:
+        sys.exit('The load test user cannot see any building; seed with `manage.py seed_buildings`')
+    return buildings[0]['id']
+
+
+async def request(client, name, context):
+    method, path, _ = ENDPOINTS[name]
+    if name == 'login':
+        return await client.post(path, json={'email': context['email'], 'password': context['password']})
+    return await client.request(method, path.format(**context), headers=context['headers'])
+
+
+async def worker(client, names, weights, context, stats, deadline, measured_from):
+    while (now := time.perf_counter()) < deadline:
+        name = random.choices(names, weights)[0] if len(names) > 1 else names[0]
+        try:
+            response = await request(client, name, context)
+            status, size = response.status_code, len(response.content)
+        except httpx.HTTPError as e:
+            status, size = type(e).__name__, 0
+        if now >= measured_from:
+            stats.setdefault(name, Stats()).record(time.perf_counter() - now, status, size)
+
+
+async def run_scenario(client, scenario, context, args):
+    names = list(ENDPOINTS) if scenario == 'mixed' else [scenario]
+    weights = [ENDPOINTS[name][2] for name in names]
+    stats = {}
+    start = time.perf_counter()
+    measured_from = start + args.warmup
+    deadline = measured_from + args.duration
+    await asyncio.gather(*(
+        worker(client, names, weights, context, stats, deadline, measured_from)
+        for _ in range(args.concurrency)
+    ))
+    # Requests in flight at the deadline are counted: use the actual elapsed time
+    duration = time.perf_counter() - measured_from
+    results = {name: stats[name].summary(duration) for name in names if name in stats}
+    if scenario == 'mixed':
+        total = Stats()
+        for name_stats in stats.values():
+            total.latencies += name_stats.latencies
+            total.errors += name_stats.errors
+            total.bytes += name_stats.bytes
+            for status, count in name_stats.statuses.items():
+                total.statuses[status] = total.statuses.get(status, 0) + count
+        results['total'] = total.summary(duration)
+    return results
+
+
+def print_table(report, baseline=None):
+    columns = ['requests', 'errors', 'rps'] + [f'p{p}_ms' for p in PERCENTILES] + ['max_ms']
+    print(f"\n{report['label']}: concurrency={report['concurrency']} duration={report['duration']}s "
+          f"base_url={report['base_url']}")
+    print(f"{'scenario':<20} {'endpoint':<20}" + ''.join(f'{column:>10}' for column in columns))
+    for scenario, endpoints in report['scenarios'].items():
+        for endpoint, result in endpoints.items():
+            print(f'{scenario:<20} {endpoint:<20}' + ''.join(f'{str(result[column]):>10}' for column in columns))
+            previous = (baseline or {}).get('scenarios', {}).get(scenario, {}).get(endpoint)
+            if previous:
+                print(f"{'':<20} {'vs ' + baseline['label']:<20}{'':>20}"
+                      + ''.join(f'{_change(result[column], previous[column]):>10}' for column in columns[2:]))
+    for scenario, endpoints in report['scenarios'].items():
+        for endpoint, result in endpoints.items():
+            if result['errors'] and endpoint != 'total':
+                print(f"errors in {scenario}/{endpoint}: {result['statuses']}")
+
+
+def _change(value, previous):
+    if value is None or not previous:
+        return '-'
+    return f'{(value - previous) / previous * 100:+.0f}%'
+
+
+async def main(args):
+    timeout = httpx.Timeout(args.timeout)
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=timeout, limits=limits) as client:
+        token = await login(client, args.email, args.password)
+        headers = {'Authorization': f'Bearer {token}'}
+        building_id = args.building_id or await resolve_building(client, headers)
+        context = {'email': args.email, 'password': args.password, 'headers': headers, 'building_id': building_id}
+
+        report = {
+            'label': args.label, 'base_url': args.base_url, 'concurrency': args.concurrency,
+            'duration': args.duration, 'building_id': building_id, 'scenarios': {},
+        }
+        for scenario in args.scenarios or SCENARIOS:
+            print(f'Running {scenario}...', file=sys.stderr)
+            report['scenarios'][scenario] = await run_scenario(client, scenario, context, args)
+    return report
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Load test the SINDIPRO API')
+    parser.add_argument('--base-url', default='http://127.0.0.1:8000')
+    parser.add_argument('--email', default='demo@sindipro.com')
+    parser.add_argument('--password', default='demo123456')
+    parser.add_argument('--building-id', type=int,
+                        help='Building used by the per-building endpoints; defaults to the first visible one')
+    parser.add_argument('--scenario', action='append', dest='scenarios', choices=SCENARIOS,
+                        help='Scenario to run (repeatable); defaults to every endpoint and then mixed')
+    parser.add_argument('--concurrency', type=int, default=16, help='Concurrent clients')
+    parser.add_argument('--duration', type=float, default=20, help='Measured seconds per scenario')
+    parser.add_argument('--warmup', type=float, default=3, help='Unmeasured seconds before each scenario')
+    parser.add_argument('--timeout', type=float, default=60, help='Per-request timeout in seconds')
+    parser.add_argument('--label', default='run', help='Name of this configuration in the report')
+    parser.add_argument('--output', help='Write the report as JSON to this file')
+    parser.add_argument('--compare', help='JSON report of a previous run to compare against')
+    return parser.parse_args(argv)
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    report = asyncio.run(main(args))
+    print_table(report, baseline)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
@@ -0,0 +1,8 @@
+"""
+Settings for loadtest/local.sh on SQLite: migrations are disabled so
+`migrate --run-syncdb` creates the tables from the current models.
+"""
+from sindipro_backend.settings import *  # noqa: F401,F403
+from sindipro_backend.settings import INSTALLED_APPS
+
+MIGRATION_MODULES = {app.rsplit('.', 1)[-1]: None for app in INSTALLED_APPS}
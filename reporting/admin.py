@@ -1,3 +1,23 @@
 from django.contrib import admin
+from .models import ReportTemplate, GeneratedReport, ReportSchedule
 
-# Register your models here.
+
+@admin.register(ReportTemplate)
+class ReportTemplateAdmin(admin.ModelAdmin):
+    list_display = ['name', 'report_type', 'is_active', 'created_at']
+    list_filter = ['report_type', 'is_active']
+    search_fields = ['name', 'description']
+
+
+@admin.register(GeneratedReport)
+class GeneratedReportAdmin(admin.ModelAdmin):
+    list_display = ['report_name', 'building', 'report_format', 'status', 'file_size', 'generation_time', 'created_at']
+    list_filter = ['status', 'report_format']
+    search_fields = ['report_name', 'cache_key']
+    readonly_fields = ['cache_key', 'created_at', 'completed_at']
+
+
+@admin.register(ReportSchedule)
+class ReportScheduleAdmin(admin.ModelAdmin):
+    list_display = ['name', 'building', 'frequency', 'is_active', 'next_run_date', 'last_run_date']
+    list_filter = ['frequency', 'is_active']
@@ -0,0 +1,433 @@
+"""
+Report generation engine.
+
+Every section is aggregated in the database (Sum/Count grouped by category
+or month) so generation cost depends on the number of groups, not rows.
+Budget vs actual over whole months is read from MonthlyFinancialSnapshot.
+Generated files are content-addressed: the cache key hashes the template
+configuration, building, date range, format and a data-version stamp of
+every source table, so an identical request is served from the stored file
+until the underlying data changes.
+"""
+import csv
+import hashlib
+import io
+import json
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.files.base import ContentFile
+from django.db.models import Count, Max, Q, Sum
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+from openpyxl import Workbook
+
+from consumptions.models import ConsumptionReading
+from equipment_mgmt.models import Equipment, MaintenanceRecord
+from field_mgmt.models import FieldRequest
+from financials.models import AnnualBudget, BudgetCategory, Collection, Expense, MonthlyFinancialSnapshot, Revenue
+from financials.snapshots import month_bounds, monthly_budget
+from legal_docs.models import LegalDocument, LegalObligation
+from .models import GeneratedReport
+from .pdf import SimplePDF
+
+# Sections included by each report type; 'custom' templates list them in
+# template_config['sections']
+REPORT_TYPE_SECTIONS = {
+    'financial': ['financial'],
+    'maintenance': ['maintenance'],
+    'consumption': ['consumption'],
+    'field_requests': ['field_requests'],
+    'legal_compliance': ['legal_compliance'],
+}
+
+FILE_EXTENSIONS = {'pdf': 'pdf', 'excel': 'xlsx', 'csv': 'csv'}
+
+
+def _month(value):
+    return value.strftime('%Y-%m') if value else ''
+
+
+def _number(value):
+    if value is None:
+        return 0
+    return float(value) if isinstance(value, Decimal) else value
+
+
+def _section(title, columns, rows):
+    return {'title': title, 'columns': columns, 'rows': [[_number(v) for v in row] for row in rows]}
+
+
+# Section builders: each returns a list of tables aggregated in SQL
+
+def covers_whole_months(start_date, end_date):
+    return start_date.day == 1 and (end_date + timedelta(days=1)).day == 1
+
+
+def snapshot_budget_sections(building, start_date, end_date):
+    """
+    Budget vs actual and expenses by month from MonthlyFinancialSnapshot, for
+    ranges made of whole months. Budgets are the monthly shares of the range.
+    """
+    snapshots = MonthlyFinancialSnapshot.objects.filter(
+        Q(year__gt=start_date.year) | Q(year=start_date.year, month__gte=start_date.month),
+        Q(year__lt=end_date.year) | Q(year=end_date.year, month__lte=end_date.month),
+        building=building, category__isnull=False,
+    )
+    by_category = (
+        snapshots.order_by('category__name').values('category__name')
+        .annotate(budgeted=Sum('budgeted'), spent=Sum('spent'), count=Sum('expense_count'))
+    )
+    monthly = (
+        snapshots.filter(expense_count__gt=0).order_by('year', 'month').values('year', 'month')
+        .annotate(total=Sum('spent'), count=Sum('expense_count'))
+    )
+    return (
+        [[row['category__name'], row['budgeted'], row['spent'], row['budgeted'] - row['spent'], row['count']]
+         for row in by_category],
+        [[f"{row['year']}-{row['month']:02d}", row['total'], row['count']] for row in monthly],
+    )
+
+
+def prorated_budget(annual_amount, year, start_date, end_date):
+    """
+    The part of a year's budget falling in [start_date, end_date]: each month's
+    share (as in the snapshots), scaled by the fraction of its days in the range.
+    """
+    total = Decimal(0)
+    for month, share in enumerate(monthly_budget(annual_amount), start=1):
+        month_start, month_end = month_bounds(year, month)
+        days = (min(month_end, end_date + timedelta(days=1)) - max(month_start, start_date)).days
+        if days > 0:
+            total += share * days / (month_end - month_start).days
+    return total.quantize(Decimal('0.01'))
+
+
+def raw_budget_sections(building, start_date, end_date):
+    """
+    Budget vs actual and expenses by month aggregated from the expense rows.
+    Budgets are prorated to the range, matching the snapshot monthly shares.
+    """
+    expenses = Expense.objects.filter(building=building, expense_date__range=(start_date, end_date))
+    years = range(start_date.year, end_date.year + 1)
+
+    spent_by_category = {
+        row['category__name']: row
+        for row in expenses.order_by().values('category__name').annotate(total=Sum('amount'), count=Count('id'))
+    }
+    budget_by_category = {}
+    budgets = (
+        AnnualBudget.objects.filter(building=building, year__in=years)
+        .order_by().values('category__name', 'year').annotate(total=Sum('budgeted_amount'))
+    )
+    for row in budgets:
+        budget_by_category[row['category__name']] = (
+            budget_by_category.get(row['category__name'], Decimal(0))
+            + prorated_budget(row['total'], row['year'], start_date, end_date)
+        )
+    categories = sorted(set(spent_by_category) | set(budget_by_category))
+    budget_rows = []
+    for category in categories:
+        budgeted = budget_by_category.get(category) or Decimal(0)
+        spent = (spent_by_category.get(category) or {}).get('total') or Decimal(0)
+        count = (spent_by_category.get(category) or {}).get('count') or 0
+        budget_rows.append([category, budgeted, spent, budgeted - spent, count])
+
+    monthly = (
+        expenses.annotate(month=TruncMonth('expense_date'))
+        .order_by('month').values('month')
+        .annotate(total=Sum('amount'), count=Count('id'))
+    )
+    return budget_rows, [[_month(row['month']), row['total'], row['count']] for row in monthly]
+
+
+def financial_sections(building, start_date, end_date):
+    if covers_whole_months(start_date, end_date):
+        budget_rows, monthly_rows = snapshot_budget_sections(building, start_date, end_date)
+    else:
+        budget_rows, monthly_rows = raw_budget_sections(building, start_date, end_date)
+    revenues = (
+        Revenue.objects.filter(building=building, revenue_date__range=(start_date, end_date))
+        .order_by('revenue_type').values('revenue_type')
+        .annotate(total=Sum('amount'), count=Count('id'))
+    )
+    collections = (
+        Collection.objects.filter(building=building, start_date__lte=end_date)
+        .order_by('-active').values('active')
+        .annotate(total=Sum('monthly_amount'), count=Count('id'))
+    )
+
+    return [
+        _section('Budget vs Actual by Category',
+                 ['Category', 'Budgeted', 'Spent', 'Remaining', 'Expenses'], budget_rows),
+        _section('Expenses by Month', ['Month', 'Total', 'Expenses'], monthly_rows),
+        _section('Revenue by Type', ['Type', 'Total', 'Entries'],
+                 [[dict(Revenue.REVENUE_TYPE_CHOICES).get(row['revenue_type'], row['revenue_type']),
+                   row['total'], row['count']] for row in revenues]),
+        _section('Collections', ['Active', 'Monthly Amount', 'Collections'],
+                 [['Yes' if row['active'] else 'No', row['total'], row['count']] for row in collections]),
+    ]
+
+
+def consumption_sections(building, start_date, end_date):
+    readings = (
+        ConsumptionReading.objects.filter(building=building, reading_date__range=(start_date, end_date))
+        .annotate(month=TruncMonth('reading_date'))
+        .order_by('consumption_type__name', 'month')
+        .values('consumption_type__name', 'consumption_type__unit', 'month')
+        .annotate(total=Sum('consumption_value'), cost=Sum('cost'), readings=Count('id'))
+    )
+    return [
+        _section('Consumption by Month', ['Utility', 'Unit', 'Month', 'Consumption', 'Cost', 'Readings'],
+                 [[row['consumption_type__name'], row['consumption_type__unit'], _month(row['month']),
+                   row['total'], row['cost'], row['readings']] for row in readings]),
+    ]
+
+
+def maintenance_sections(building, start_date, end_date):
+    # Equipment.building_id is stored as text
+    equipment = Equipment.objects.filter(building_id=str(building.id))
+    records = MaintenanceRecord.objects.filter(equipment__in=equipment, date__range=(start_date, end_date))
+
+    by_equipment = (
+        records.order_by('equipment__name').values('equipment__name', 'equipment__type')
+        .annotate(total=Sum('cost'), count=Count('id'), last_date=Max('date'))
+    )
+    by_status = equipment.order_by('status').values('status').annotate(count=Count('id'))
+
+    return [
+        _section('Maintenance Cost by Equipment', ['Equipment', 'Type', 'Cost', 'Records', 'Last Maintenance'],
+                 [[row['equipment__name'], row['equipment__type'], row['total'], row['count'],
+                   row['last_date'].isoformat() if row['last_date'] else ''] for row in by_equipment]),
+        _section('Equipment by Status', ['Status', 'Equipment'],
+                 [[dict(Equipment.STATUS_CHOICES).get(row['status'], row['status']), row['count']]
+                  for row in by_status]),
+    ]
+
+
+def legal_compliance_sections(building, start_date, end_date):
+    today = timezone.now().date()
+    obligations = (
+        LegalObligation.objects.filter(building=building, due_date__range=(start_date, end_date))
+        .order_by('obligation_type').values('obligation_type')
+        .annotate(
+            total=Count('id'),
+            completed=Count('id', filter=Q(status='completed')),
+            overdue=Count('id', filter=Q(due_date__lt=today) & ~Q(status='completed')),
+            estimated=Sum('estimated_cost'),
+            actual=Sum('actual_cost'),
+        )
+    )
+    documents = (
+        LegalDocument.objects.filter(building=building)
+        .order_by('document_type').values('document_type')
+        .annotate(
+            total=Count('id'),
+            expired=Count('id', filter=Q(expiry_date__lt=today)),
+            expiring=Count('id', filter=Q(expiry_date__range=(start_date, end_date))),
+        )
+    )
+    return [
+        _section('Legal Obligations', ['Type', 'Due', 'Completed', 'Overdue', 'Estimated Cost', 'Actual Cost'],
+                 [[dict(LegalObligation.OBLIGATION_TYPE_CHOICES).get(row['obligation_type'], row['obligation_type']),
+                   row['total'], row['completed'], row['overdue'], row['estimated'], row['actual']]
+                  for row in obligations]),
+        _section('Legal Documents', ['Type', 'Documents', 'Expired', 'Expiring in Period'],
+                 [[dict(LegalDocument.DOCUMENT_TYPE_CHOICES).get(row['document_type'], row['document_type']),
+                   row['total'], row['expired'], row['expiring']] for row in documents]),
+    ]
+
+
+def field_requests_sections(building, start_date, end_date):
+    monthly = (
+        FieldRequest.objects.filter(building=building, created_at__date__range=(start_date, end_date))
+        .annotate(month=TruncMonth('created_at'))
+        .order_by('month').values('month')
+        .annotate(count=Count('id'))
+    )
+    return [
+        _section('Field Requests by Month', ['Month', 'Requests'],
+                 [[_month(row['month']), row['count']] for row in monthly]),
+    ]
+
+
+SECTION_BUILDERS = {
+    'financial': financial_sections,
+    'consumption': consumption_sections,
+    'maintenance': maintenance_sections,
+    'legal_compliance': legal_compliance_sections,
+    'field_requests': field_requests_sections,
+}
+
+
+def template_sections(template):
+    if template.report_type == 'custom':
+        sections = (template.template_config or {}).get('sections', [])
+        return [section for section in sections if section in SECTION_BUILDERS]
+    return REPORT_TYPE_SECTIONS.get(template.report_type, [])
+
+
+# Data version stamp: count + latest change of every source table the
+# report reads, scoped to the building. Count catches deletions.
+
+def _table_stamp(queryset, changed_field):
+    stamp = queryset.order_by().aggregate(count=Count('id'), changed=Max(changed_field))
+    return [stamp['count'], str(stamp['changed'])]
+
+
+def data_version(building, sections):
+    stamps = {}
+    if 'financial' in sections:
+        stamps['expenses'] = _table_stamp(Expense.objects.filter(building=building), 'updated_at')
+        stamps['budgets'] = _table_stamp(AnnualBudget.objects.filter(building=building), 'updated_at')
+        stamps['revenues'] = _table_stamp(Revenue.objects.filter(building=building), 'updated_at')
+        stamps['collections'] = _table_stamp(Collection.objects.filter(building=building), 'updated_at')
+        # Rows are labelled with category names; categories are shared by every building
+        stamps['categories'] = _table_stamp(BudgetCategory.objects.all(), 'updated_at')
+    if 'consumption' in sections:
+        stamps['readings'] = _table_stamp(ConsumptionReading.objects.filter(building=building), 'updated_at')
+    if 'maintenance' in sections:
+        equipment = Equipment.objects.filter(building_id=str(building.id))
+        stamps['equipment'] = _table_stamp(equipment, 'updated_at')
+        # Maintenance records have no timestamps; id and cost totals change with every edit that matters
+        records = MaintenanceRecord.objects.filter(equipment__in=equipment).order_by().aggregate(
+            count=Count('id'), last=Max('id'), cost=Sum('cost'), last_date=Max('date')
+        )
+        stamps['maintenance'] = [str(value) for value in records.values()]
+    if 'legal_compliance' in sections:
+        stamps['obligations'] = _table_stamp(LegalObligation.objects.filter(building=building), 'updated_at')
+        stamps['documents'] = _table_stamp(LegalDocument.objects.filter(building=building), 'updated_at')
+        # Overdue/expired counts depend on the current date
+        stamps['today'] = timezone.now().date().isoformat()
+    if 'field_requests' in sections:
+        stamps['field_requests'] = _table_stamp(FieldRequest.objects.filter(building=building), 'updated_at')
+    return stamps
+
+
+def report_cache_key(template, building, start_date, end_date, report_format, version):
+    content = json.dumps({
+        'template_id': template.id,
+        'report_type': template.report_type,
+        'template_config': template.template_config,
+        'building_id': building.id,
+        'start_date': start_date.isoformat(),
+        'end_date': end_date.isoformat(),
+        'format': report_format,
+        'data_version': version,
+    }, sort_keys=True, default=str)
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+
+# Renderers
+
+def render_csv(title, tables):
+    output = io.StringIO()
+    writer = csv.writer(output)
+    writer.writerow([title])
+    for table in tables:
+        writer.writerow([])
+        writer.writerow([table['title']])
+        writer.writerow(table['columns'])
+        writer.writerows(table['rows'])
+    return output.getvalue().encode('utf-8')
+
+
+def render_excel(title, tables):
+    wb = Workbook(write_only=True)
+    for table in tables:
+        # Sheet titles are limited to 31 characters
+        ws = wb.create_sheet(title=table['title'][:31])
+        ws.append([title])
+        ws.append([])
+        ws.append(table['columns'])
+        for row in table['rows']:
+            ws.append(row)
+    output = io.BytesIO()
+    wb.save(output)
+    return output.getvalue()
+
+
+def render_pdf(title, tables):
+    pdf = SimplePDF()
+    pdf.text(title, size=14, bold=True)
+    for table in tables:
+        pdf.spacer()
+        pdf.text(table['title'], size=11, bold=True)
+        widths = [
+            min(max([len(str(column))] + [len(str(row[i])) for row in table['rows']]), 30)
+            for i, column in enumerate(table['columns'])
+        ]
+        pdf.table(table['columns'], table['rows'], widths)
+        if not table['rows']:
+            pdf.text('No data for this period')
+    return pdf.render()
+
+
+RENDERERS = {'csv': render_csv, 'excel': render_excel, 'pdf': render_pdf}
+
+
+def build_report_tables(template, building, start_date, end_date):
+    tables = []
+    for section in template_sections(template):
+        tables.extend(SECTION_BUILDERS[section](building, start_date, end_date))
+    return tables
+
+
+def find_cached_report(cache_key):
+    return (
+        GeneratedReport.objects.filter(cache_key=cache_key, status='completed')
+        .exclude(report_file='').exclude(report_file__isnull=True)
+        .order_by('-completed_at').first()
+    )
+
+
+def generate_report(template, building, start_date, end_date, report_format='pdf', user=None, report_name=None):
+    """
+    Return (report, cached) for the requested template, building and period.
+
+    An existing completed report with the same cache key is returned as is;
+    otherwise the report is aggregated, rendered and stored with its
+    generation_time and file_size.
+    """
+    sections = template_sections(template)
+    cache_key = report_cache_key(
+        template, building, start_date, end_date, report_format, data_version(building, sections)
+    )
+
+    cached_report = find_cached_report(cache_key)
+    if cached_report:
+        return cached_report, True
+
+    report = GeneratedReport.objects.create(
+        building=building,
+        template=template,
+        report_name=report_name or f"{template.name} - {building.building_name}",
+        report_format=report_format,
+        status='generating',
+        start_date=start_date,
+        end_date=end_date,
+        cache_key=cache_key,
+        generated_by=user,
+    )
+
+    started = time.monotonic()
+    try:
+        tables = build_report_tables(template, building, start_date, end_date)
+        title = f"{report.report_name} ({start_date.isoformat()} - {end_date.isoformat()})"
+        content = RENDERERS[report_format](title, tables)
+
+        filename = f"report_{report.id}_{cache_key[:12]}.{FILE_EXTENSIONS[report_format]}"
+        report.report_file.save(filename, ContentFile(content), save=False)
+        report.file_size = len(content)
+        report.status = 'completed'
+    except Exception as e:
+        report.status = 'failed'
+        report.error_message = str(e)
+        raise
+    finally:
+        report.generation_time = time.monotonic() - started
+        report.completed_at = timezone.now()
+        report.save()
+
+    return report, False
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.4 on 2026-10-18 20:53
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('building_mgmt', '0012_pagination_indexes'),
+        ('reporting', '0002_generatedreport_cache_key'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='generatedreport',
+            index=models.Index(fields=['building', 'created_at', 'id'], name='report_building_created_idx'),
+        ),
+    ]
@@ -57,6 +57,7 @@ class GeneratedReport(models.Model):
     # Metadata
     generation_time = models.FloatField(null=True, blank=True)  # Time in seconds
     error_message = models.TextField(blank=True)
+    cache_key = models.CharField(max_length=64, blank=True, db_index=True)  # Hash of config, range and data version
     
     generated_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
@@ -67,6 +68,9 @@ class GeneratedReport(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['building', 'created_at', 'id'], name='report_building_created_idx'),
+        ]
 
 class ReportSchedule(models.Model):
     FREQUENCY_CHOICES = [
@@ -0,0 +1,86 @@
+"""
+Minimal PDF writer for tabular text reports.
+
+Only what the report engine needs: monospaced (Courier) text lines on A4 pages with
+automatic page breaks. Keeps the project free of a PDF library dependency.
+"""
+
+PAGE_WIDTH = 595  # A4 in points
+PAGE_HEIGHT = 842
+MARGIN = 40
+LINE_HEIGHT = 14
+
+
+def _escape(text):
+    # PDF literal strings: escape backslashes and parentheses, keep Latin-1 only
+    text = str(text).replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+    return text.encode('latin-1', errors='replace').decode('latin-1')
+
+
+class SimplePDF:
+    def __init__(self):
+        self.pages = []
+        self._lines = []
+        self._y = PAGE_HEIGHT - MARGIN
+
+    def _new_page(self):
+        self.pages.append(self._lines)
+        self._lines = []
+        self._y = PAGE_HEIGHT - MARGIN
+
+    def text(self, text, size=9, bold=False, indent=0):
+        if self._y < MARGIN + LINE_HEIGHT:
+            self._new_page()
+        font = 'F2' if bold else 'F1'
+        self._lines.append(f"BT /{font} {size} Tf {MARGIN + indent} {self._y} Td ({_escape(text)}) Tj ET")
+        self._y -= LINE_HEIGHT if size <= 10 else size + 6
+
+    def spacer(self):
+        self._y -= LINE_HEIGHT
+
+    def table(self, columns, rows, widths=None):
+        """Write a fixed-width text table; values are truncated to their column width."""
+        widths = widths or [max(len(str(c)), 10) for c in columns]
+
+        def fmt(values):
+            return '  '.join(str(v if v is not None else '')[:w].ljust(w) for v, w in zip(values, widths))
+
+        self.text(fmt(columns), bold=True)
+        for row in rows:
+            self.text(fmt(row))
+
+    def render(self):
+        """Return the document as bytes."""
+        pages = self.pages + [self._lines]
+
+        objects = [
+            "<< /Type /Catalog /Pages 2 0 R >>",
+            None,  # Pages, filled in once page object ids are known
+            "<< /Type /Font /Subtype /Type1 /BaseFont /Courier /Encoding /WinAnsiEncoding >>",
+            "<< /Type /Font /Subtype /Type1 /BaseFont /Courier-Bold /Encoding /WinAnsiEncoding >>",
+        ]
+        page_ids = []
+        for lines in pages:
+            stream = '\n'.join(lines).encode('latin-1')
+            objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream.decode('latin-1')}\nendstream")
+            content_id = len(objects)
+            objects.append(
+                f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {PAGE_WIDTH} {PAGE_HEIGHT}] "
+                f"/Resources << /Font << /F1 3 0 R /F2 4 0 R >> >> /Contents {content_id} 0 R >>"
+            )
+            page_ids.append(len(objects))
+        kids = ' '.join(f"{page_id} 0 R" for page_id in page_ids)
+        objects[1] = f"<< /Type /Pages /Kids [{kids}] /Count {len(page_ids)} >>"
+
+        output = bytearray(b"%PDF-1.4\n")
+        offsets = []
+        for number, body in enumerate(objects, 1):
+            offsets.append(len(output))
+            output += f"{number} 0 obj\n{body}\nendobj\n".encode('latin-1')
+
+        xref_offset = len(output)
+        output += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode('latin-1')
+        for offset in offsets:
+            output += f"{offset:010d} 00000 n \n".encode('latin-1')
+        output += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref_offset}\n%%EOF\n".encode('latin-1')
+        return bytes(output)
@@ -0,0 +1,53 @@
+from rest_framework import serializers
+from .models import ReportTemplate, GeneratedReport
+
+
+class ReportTemplateSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ReportTemplate
+        fields = [
+            'id', 'name', 'report_type', 'description', 'template_config', 'is_active',
+            'created_at', 'updated_at'
+        ]
+        read_only_fields = ['id', 'created_at', 'updated_at']
+
+    def validate(self, data):
+        report_type = data.get('report_type', getattr(self.instance, 'report_type', None))
+        template_config = data.get('template_config', getattr(self.instance, 'template_config', None)) or {}
+        if report_type == 'custom' and not template_config.get('sections'):
+            raise serializers.ValidationError(
+                "template_config.sections is required for custom report templates"
+            )
+        return data
+
+    def create(self, validated_data):
+        validated_data['created_by'] = self.context['request'].user
+        return super().create(validated_data)
+
+
+class GeneratedReportSerializer(serializers.ModelSerializer):
+    building_name = serializers.CharField(source='building.building_name', read_only=True)
+    template_name = serializers.CharField(source='template.name', read_only=True)
+
+    class Meta:
+        model = GeneratedReport
+        fields = [
+            'id', 'building_id', 'building_name', 'template_id', 'template_name', 'report_name',
+            'report_format', 'status', 'start_date', 'end_date', 'file_size', 'generation_time',
+            'error_message', 'created_at', 'completed_at'
+        ]
+        read_only_fields = fields
+
+
+class ReportGenerateSerializer(serializers.Serializer):
+    template_id = serializers.IntegerField()
+    building_id = serializers.IntegerField()
+    start_date = serializers.DateField()
+    end_date = serializers.DateField()
+    format = serializers.ChoiceField(choices=GeneratedReport.FORMAT_CHOICES, default='pdf')
+    report_name = serializers.CharField(max_length=200, required=False)
+
+    def validate(self, data):
+        if data['start_date'] > data['end_date']:
+            raise serializers.ValidationError("start_date must be before end_date")
+        return data
@@ -0,0 +1,25 @@
+from datetime import date
+
+from django.contrib.auth import get_user_model
+
+from building_mgmt.models import Building
+from jobs.queue import register_job
+from .engine import generate_report
+from .models import ReportTemplate
+
+User = get_user_model()
+
+
+@register_job('report_generation')
+def generate_report_job(job):
+    payload = job.payload
+    report, cached = generate_report(
+        ReportTemplate.objects.get(id=payload['template_id']),
+        Building.objects.get(id=payload['building_id']),
+        date.fromisoformat(payload['start_date']),
+        date.fromisoformat(payload['end_date']),
+        report_format=payload['format'],
+        user=User.objects.filter(id=payload.get('user_id')).first(),
+        report_name=payload.get('report_name'),
+    )
+    return {'report_id': report.id, 'cached': cached, 'file_size': report.file_size}
@@ -0,0 +1,88 @@
+import datetime
+import shutil
+import tempfile
+from decimal import Decimal
+from unittest import mock
+
+from django.test import TestCase, override_settings
+
+from building_mgmt.tests import create_building, create_user
+from financials.models import BudgetCategory, Expense
+from .engine import generate_report
+from .models import ReportTemplate
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class ReportCacheTests(TestCase):
+    """Generated files are reused until the data the report reads changes."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('master@example.com')
+        cls.building = create_building(cls.user, 'Reports', '00.000.000/0001-50')
+        cls.template = ReportTemplate.objects.create(
+            name='Financial', report_type='financial', template_config={}, created_by=cls.user
+        )
+        cls.category = BudgetCategory.objects.create(name='Cleaning')
+        cls.add_expense('40.00')
+
+    @classmethod
+    def add_expense(cls, amount):
+        with TestCase.captureOnCommitCallbacks(execute=True):
+            Expense.objects.create(
+                building=cls.building, category=cls.category, expense_type='operational', description='Supplies',
+                amount=Decimal(amount), expense_date=datetime.date(2025, 3, 10),
+            )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def generate(self, report_format='csv'):
+        return generate_report(self.template, self.building, datetime.date(2025, 1, 1), datetime.date(2025, 12, 31),
+                               report_format, user=self.user)
+
+    def content(self, report):
+        with report.report_file.open('rb') as f:
+            return f.read().decode('utf-8')
+
+    def test_hit_and_miss(self):
+        report, cached = self.generate()
+        self.assertFalse(cached)
+        self.assertEqual(report.status, 'completed')
+
+        again, cached = self.generate()
+        self.assertTrue(cached)
+        self.assertEqual(again.id, report.id)
+
+        # Another format is another file
+        self.assertFalse(self.generate('excel')[1])
+
+        self.add_expense('2.50')
+        changed, cached = self.generate()
+        self.assertFalse(cached)
+        self.assertNotEqual(changed.cache_key, report.cache_key)
+        self.assertIn('Cleaning,0.0,42.5,-42.5,2', self.content(changed))
+
+    def test_category_rename_is_a_miss(self):
+        report, _ = self.generate()
+        self.category.name = 'Housekeeping'
+        self.category.save()
+
+        renamed, cached = self.generate()
+        self.assertFalse(cached)
+        self.assertIn('Cleaning', self.content(report))
+        self.assertIn('Housekeeping', self.content(renamed))
+        self.assertNotIn('Cleaning', self.content(renamed))
+
+    def test_generation_time_and_file_size(self):
+        with mock.patch('reporting.engine.time.monotonic', side_effect=[10.0, 12.5]):
+            report, _ = self.generate()
+        report.refresh_from_db()
+        self.assertEqual(report.generation_time, 2.5)
+        self.assertEqual(report.file_size, report.report_file.size)
+        self.assertEqual(report.file_size, len(self.content(report).encode('utf-8')))
+        self.assertIsNotNone(report.completed_at)
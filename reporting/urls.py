@@ -1,6 +1,11 @@
+from django.conf import settings
 from django.urls import path
 from . import views
 
 urlpatterns = [
-    # API endpoints will be added here
+    path('templates/', views.report_template_handler, name='report_template_handler'),
+    path('generate/', views.generate_report_view, name='generate_report'),
+    path('generated/', views.generated_reports, name='generated_reports'),
+    path('generated/<int:id>/download/', views.download_report_async if settings.ASYNC_VIEWS else views.download_report,
+         name='download_report'),
 ]
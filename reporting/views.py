@@ -0,0 +1,190 @@
+import os
+
+from asgiref.sync import sync_to_async
+from django.http import FileResponse, JsonResponse
+from django.views.decorators.http import require_GET
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAuthenticated
+from building_mgmt.access import building_access
+from building_mgmt.views import get_accessible_building, user_can_access_building
+from jobs.queue import enqueue_job, run_in_background
+from jobs.views import job_accepted_response
+from sindipro_backend.async_views import authenticated, stream_async
+from sindipro_backend.instrumentation import query_budget
+from sindipro_backend.pagination import KeysetCursorPagination
+from .engine import generate_report
+from .models import ReportTemplate, GeneratedReport
+from .serializers import (ReportTemplateSerializer, GeneratedReportSerializer,
+                          ReportGenerateSerializer)
+
+
+@api_view(['GET', 'POST'])
+@permission_classes([IsAuthenticated])
+def report_template_handler(request):
+    """
+    GET: Retrieve active report templates
+    POST: Create a report template
+    """
+    if request.method == 'GET':
+        templates = ReportTemplate.objects.filter(is_active=True).order_by('name')
+        serializer = ReportTemplateSerializer(templates, many=True)
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+    elif request.method == 'POST':
+        serializer = ReportTemplateSerializer(data=request.data, context={'request': request})
+
+        if serializer.is_valid():
+            template = serializer.save()
+            return Response({
+                'message': 'Report template created successfully',
+                'template': ReportTemplateSerializer(template).data
+            }, status=status.HTTP_201_CREATED)
+
+        return Response({
+            'error': 'Invalid data',
+            'details': serializer.errors
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def generate_report_view(request):
+    """
+    POST: Generate a report, or return the cached one when nothing changed.
+    Expected data structure:
+    {
+        "template_id": 1,
+        "building_id": 1,
+        "start_date": "2025-01-01",
+        "end_date": "2025-12-31",
+        "format": "pdf"  # pdf, excel or csv
+    }
+    With ?async=1 (and JOBS_ENABLED) the report is generated by a background job.
+    """
+    serializer = ReportGenerateSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response({
+            'error': 'Invalid data',
+            'details': serializer.errors
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    data = serializer.validated_data
+
+    building = get_accessible_building(request, data['building_id'], module='reports', edit=True)
+    if not building:
+        return Response({
+            'error': 'Building not found or access denied'
+        }, status=status.HTTP_404_NOT_FOUND)
+
+    try:
+        template = ReportTemplate.objects.get(id=data['template_id'], is_active=True)
+    except ReportTemplate.DoesNotExist:
+        return Response({
+            'error': 'Report template not found'
+        }, status=status.HTTP_404_NOT_FOUND)
+
+    if run_in_background(request.query_params.get('async')):
+        job = enqueue_job('report_generation', {
+            'template_id': template.id,
+            'building_id': building.id,
+            'start_date': data['start_date'].isoformat(),
+            'end_date': data['end_date'].isoformat(),
+            'format': data['format'],
+            'report_name': data.get('report_name'),
+            'user_id': request.user.id,
+        }, user=request.user)
+        return job_accepted_response(job)
+
+    try:
+        report, cached = generate_report(
+            template, building, data['start_date'], data['end_date'],
+            report_format=data['format'], user=request.user, report_name=data.get('report_name')
+        )
+    except Exception as e:
+        return Response({
+            'error': f'Error generating report: {str(e)}'
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    return Response({
+        'message': 'Report served from cache' if cached else 'Report generated successfully',
+        'cached': cached,
+        'report': GeneratedReportSerializer(report).data
+    }, status=status.HTTP_200_OK if cached else status.HTTP_201_CREATED)
+
+
+@query_budget(3)
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def generated_reports(request):
+    """
+    GET: Retrieve generated reports
+         Optional query parameter: building_id to filter by building
+    """
+    reports = building_access(request).filter_queryset(
+        GeneratedReport.objects.select_related('building', 'template'), module='reports'
+    )
+
+    building_id = request.GET.get('building_id')
+    if building_id:
+        reports = reports.filter(building_id=building_id)
+
+    # Opt-in cursor pagination (?cursor= / ?limit=)
+    paginator = KeysetCursorPagination(ordering=('-created_at', '-id'))
+    page = paginator.paginate_queryset(reports, request)
+    if page is not None:
+        return paginator.get_paginated_response(GeneratedReportSerializer(page, many=True).data)
+
+    serializer = GeneratedReportSerializer(reports, many=True)
+    return Response(serializer.data, status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def download_report(request, id):
+    try:
+        report = GeneratedReport.objects.select_related('building').get(id=id)
+    except GeneratedReport.DoesNotExist:
+        report = None
+
+    if not report or not user_can_access_building(request, report.building_id, module='reports'):
+        return Response({
+            'error': 'Report not found or access denied'
+        }, status=status.HTTP_404_NOT_FOUND)
+
+    if report.status != 'completed' or not report.report_file:
+        return Response({
+            'error': 'Report file is not available',
+            'status': report.status
+        }, status=status.HTTP_409_CONFLICT)
+
+    return FileResponse(
+        report.report_file.open('rb'), as_attachment=True,
+        filename=os.path.basename(report.report_file.name)
+    )
+
+
+@require_GET
+@authenticated
+async def download_report_async(request, id):
+    """
+    download_report for ASGI mode (settings.ASYNC_VIEWS): the lookup uses the
+    async ORM and the file is streamed by the ASGI handler.
+    """
+    report = await GeneratedReport.objects.filter(id=id).afirst()
+    if not report or not await sync_to_async(user_can_access_building)(request, report.building_id, module='reports'):
+        return JsonResponse({
+            'error': 'Report not found or access denied'
+        }, status=status.HTTP_404_NOT_FOUND)
+
+    if report.status != 'completed' or not report.report_file:
+        return JsonResponse({
+            'error': 'Report file is not available',
+            'status': report.status
+        }, status=status.HTTP_409_CONFLICT)
+
+    return stream_async(FileResponse(
+        await sync_to_async(report.report_file.open)('rb'), as_attachment=True,
+        filename=os.path.basename(report.report_file.name)
+    ))
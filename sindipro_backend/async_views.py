@@ -0,0 +1,67 @@
+"""
+Helpers for the async (ASGI mode) views.
+
+DRF views are sync-only, so the async versions of the I/O-heavy read
+endpoints are plain Django views. They authenticate with the same DRF
+authenticators (JWT) and answer errors with the same JSON bodies; the token
+check and user lookup run in one sync_to_async call, the rest of the view
+uses the async ORM.
+"""
+import functools
+
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse
+from rest_framework import exceptions
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+
+FILE_CHUNK_BYTES = 64 * 1024
+
+
+async def _read_chunks(file):
+    read = sync_to_async(file.read, thread_sensitive=False)
+    while chunk := await read(FILE_CHUNK_BYTES):
+        yield chunk
+
+
+def stream_async(response):
+    """
+    Serve a FileResponse from an async iterator: the ASGI handler would
+    otherwise read the whole file into memory first. File reads run in the
+    thread pool; headers (length, type, disposition) are kept.
+    """
+    file = getattr(response, 'file_to_stream', None)
+    if file is not None:
+        response.streaming_content = _read_chunks(file)
+    return response
+
+
+def _authenticate(request):
+    drf_request = Request(request, authenticators=[cls() for cls in api_settings.DEFAULT_AUTHENTICATION_CLASSES])
+    try:
+        user = drf_request.user
+    except exceptions.APIException as e:
+        return None, drf_request, e
+    return user, drf_request, None
+
+
+def authenticated(view):
+    """
+    Async counterpart of @permission_classes([IsAuthenticated]): sets
+    request.user or answers 401 like DRF does (detail + WWW-Authenticate).
+    """
+    @functools.wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        user, drf_request, error = await sync_to_async(_authenticate)(request)
+        if user is None or not user.is_authenticated:
+            error = error or exceptions.NotAuthenticated()
+            body = error.detail if isinstance(error.detail, dict) else {'detail': error.detail}
+            response = JsonResponse(body, status=error.status_code)
+            authenticators = drf_request.authenticators
+            if authenticators:
+                response['WWW-Authenticate'] = authenticators[0].authenticate_header(drf_request)
+            return response
+        request.user = user
+        return await view(request, *args, **kwargs)
+    return wrapper
@@ -0,0 +1,207 @@
+"""
+Response caching for DRF function views.
+
+@cache_response(depends_on=(...)) (placed below @permission_classes) caches
+successful GET responses. The key varies on:
+- the view, its URL kwargs and query string, and the host (paginated
+  responses embed absolute links),
+- who is asking: master users share one entry; everybody else gets their own,
+  keyed on their resolved building access as well, so a grant change never
+  serves a stale list,
+- the building (the `building_kwarg` URL kwarg, else ?building_id=), which
+  also scopes the dependencies below.
+
+Invalidation is tag based. Every key embeds the current version of each tag it
+depends on ("unit", or "unit:<building id>" for a building-scoped view);
+register_cache_dependency(Model, tag) bumps those versions once the transaction
+of a post_save/post_delete commits, so dependent entries are simply never read
+again and expire on their own. Bulk writes that skip signals call invalidate_tags() themselves.
+
+Tag versions must be shared by every process serving requests: on a
+process-local (locmem) cache with WEB_CONCURRENCY > 1 an invalidation would
+only reach the worker that made the write, so cache_response serves every
+request uncached instead.
+
+Hit/miss counters are per process and exported by metrics_view.
+"""
+import functools
+import hashlib
+import logging
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from rest_framework.response import Response
+
+logger = logging.getLogger(__name__)
+
+TAG_VERSION_KEY = 'cache_tag:{tag}'
+RESPONSE_KEY = 'view_response:{view}:{digest}'
+
+
+def get_cache():
+    return caches[settings.VIEW_CACHE_ALIAS]
+
+
+class CacheStats:
+    """Thread-safe per-view hit/miss counters."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counts = defaultdict(lambda: {'hit': 0, 'miss': 0})
+
+    def record(self, view, outcome):
+        with self.lock:
+            self.counts[view][outcome] += 1
+
+    def reset(self):
+        with self.lock:
+            self.counts.clear()
+
+    def snapshot(self):
+        with self.lock:
+            return {view: dict(counts) for view, counts in self.counts.items()}
+
+
+stats = CacheStats()
+
+
+def render_cache_stats(snapshot):
+    lines = [
+        '# HELP sindipro_view_cache_requests_total Cached view lookups by outcome',
+        '# TYPE sindipro_view_cache_requests_total counter',
+    ]
+    for view in sorted(snapshot):
+        for outcome, count in sorted(snapshot[view].items()):
+            lines.append(f'sindipro_view_cache_requests_total{{view="{view}",outcome="{outcome}"}} {count}')
+    return '\n'.join(lines) + '\n'
+
+
+_unshared_warned = False
+
+
+def cache_is_shared():
+    """Whether every process serving requests reads and writes the same cache."""
+    global _unshared_warned
+    if settings.WEB_CONCURRENCY <= 1 or not isinstance(get_cache(), LocMemCache):
+        return True
+    if not _unshared_warned:
+        _unshared_warned = True
+        logger.warning('View caching is off: %s workers cannot share a locmem cache, '
+                       'set CACHE_BACKEND to file or redis', settings.WEB_CONCURRENCY)
+    return False
+
+
+def _scoped(tag, building_id):
+    return f'{tag}:{building_id}' if building_id is not None else tag
+
+
+def tag_versions(tags):
+    """Current version of each tag, creating the missing ones."""
+    cache = get_cache()
+    keys = {TAG_VERSION_KEY.format(tag=tag): tag for tag in tags}
+    versions = cache.get_many(keys)
+    for key in keys.keys() - versions.keys():
+        # Start from a timestamp, not 0, so an evicted version can't resurrect old entries
+        cache.add(key, time.time_ns(), None)
+        versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def invalidate_tags(*tags, building_id=None):
+    """Invalidate every cached response depending on `tags` (and their `building_id` scope)."""
+    cache = get_cache()
+    scoped = set(tags)
+    if building_id is not None:
+        scoped.update(_scoped(tag, building_id) for tag in tags)
+    for tag in scoped:
+        key = TAG_VERSION_KEY.format(tag=tag)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, time.time_ns(), None)
+
+
+def register_cache_dependency(model, tag, building_field='building_id'):
+    """
+    Invalidate `tag` whenever an instance of `model` is saved or deleted.
+    `building_field` names the attribute holding the building id, for models
+    that belong to a building (None otherwise).
+    """
+    def handler(sender, instance, **kwargs):
+        building_id = getattr(instance, building_field, None) if building_field else None
+        # After commit, so a concurrent read can't cache the pre-commit state under the new version
+        transaction.on_commit(lambda: invalidate_tags(tag, building_id=building_id))
+
+    dispatch_uid = f'cache_dependency:{model._meta.label}:{tag}'
+    post_save.connect(handler, sender=model, weak=False, dispatch_uid=dispatch_uid)
+    post_delete.connect(handler, sender=model, weak=False, dispatch_uid=dispatch_uid)
+
+
+def _building_id(request, kwargs, building_kwarg):
+    value = kwargs.get(building_kwarg) if building_kwarg else None
+    if value is None:
+        value = request.query_params.get('building_id')
+    return str(value) if value not in (None, '') else None
+
+
+def _audience(request):
+    from building_mgmt.access import building_access
+
+    resolver = building_access(request)
+    if resolver.is_master:
+        return 'role:master'
+    grants = sorted((building_id, sorted(grant.items())) for building_id, grant in resolver.grants.items())
+    return f'user:{request.user.id}:{grants!r}'
+
+
+def cache_response(depends_on=(), timeout=None, building_kwarg=None):
+    """
+    Cache 200 responses of a DRF function view's GET requests.
+    Place it below @api_view/@permission_classes so it sees the authenticated request.
+    `building_kwarg` names the URL kwarg holding the building id, if any.
+    """
+    def decorator(view):
+        view_name = f'{view.__module__}.{view.__qualname__}'
+
+        @functools.wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if (request.method not in ('GET', 'HEAD') or not settings.VIEW_CACHE_ENABLED
+                    or not cache_is_shared()):
+                return view(request, *args, **kwargs)
+
+            building_id = _building_id(request, kwargs, building_kwarg)
+            tags = [_scoped(tag, building_id) for tag in depends_on]
+            parts = (
+                request.get_host(),
+                _audience(request),
+                sorted(kwargs.items()),
+                sorted(request.query_params.lists()),
+                tag_versions(tags),
+            )
+            digest = hashlib.sha256(repr(parts).encode('utf-8')).hexdigest()
+            key = RESPONSE_KEY.format(view=view_name, digest=digest)
+
+            cache = get_cache()
+            cached = cache.get(key)
+            if cached is not None:
+                stats.record(view_name, 'hit')
+                data, status_code = cached
+                response = Response(data, status=status_code)
+                response['X-Cache'] = 'HIT'
+                return response
+
+            stats.record(view_name, 'miss')
+            response = view(request, *args, **kwargs)
+            if isinstance(response, Response) and response.status_code == 200:
+                cache.set(key, (response.data, response.status_code),
+                          settings.VIEW_CACHE_TIMEOUT if timeout is None else timeout)
+                response['X-Cache'] = 'MISS'
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,176 @@
+"""
+Resized variants (thumb / medium / WebP) of uploaded photos.
+
+Variants are rendered with Pillow and cached on disk under
+MEDIA_ROOT/variants/<source key>/, where the source key identifies the
+original image (e.g. 'technical/12' for a database blob, or an ImageField
+name such as 'field_request_photos/abc.jpg'). They are generated right after
+upload and lazily on first request for rows that predate the pipeline.
+"""
+import io
+import logging
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+from django.conf import settings
+from django.http import FileResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from PIL import Image, ImageOps
+from rest_framework import status
+from rest_framework.response import Response
+
+logger = logging.getLogger(__name__)
+
+VARIANT_DIR = 'variants'
+
+VARIANT_SPECS = {
+    'thumb': {'max_size': 200, 'format': 'JPEG', 'quality': 80},
+    'medium': {'max_size': 800, 'format': 'JPEG', 'quality': 85},
+    'webp': {'max_size': 1600, 'format': 'WEBP', 'quality': 80},
+}
+
+FORMAT_EXTENSIONS = {'JPEG': 'jpg', 'WEBP': 'webp'}
+FORMAT_CONTENT_TYPES = {'JPEG': 'image/jpeg', 'WEBP': 'image/webp'}
+
+# Value of ?size= that serves the untouched upload
+ORIGINAL = 'original'
+SIZE_CHOICES = (ORIGINAL,) + tuple(VARIANT_SPECS)
+
+
+def variant_path(source_key, variant):
+    spec = VARIANT_SPECS[variant]
+    return Path(settings.MEDIA_ROOT) / VARIANT_DIR / source_key / f"{variant}.{FORMAT_EXTENSIONS[spec['format']]}"
+
+
+def variant_content_type(variant):
+    return FORMAT_CONTENT_TYPES[VARIANT_SPECS[variant]['format']]
+
+
+def _open_image(source):
+    """Open bytes, a path or a file-like object and apply the EXIF orientation."""
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        source = io.BytesIO(bytes(source))
+    image = Image.open(source)
+    image.load()
+    return ImageOps.exif_transpose(image)
+
+
+def render_variant(image, variant):
+    """Return the encoded bytes of `variant` for an already opened PIL image."""
+    spec = VARIANT_SPECS[variant]
+    resized = image.copy()
+    resized.thumbnail((spec['max_size'], spec['max_size']), Image.Resampling.LANCZOS)
+
+    if spec['format'] == 'JPEG' and resized.mode != 'RGB':
+        # JPEG has no alpha channel: flatten transparent images onto white
+        if resized.mode in ('RGBA', 'LA') or 'transparency' in resized.info:
+            rgba = resized.convert('RGBA')
+            background = Image.new('RGB', rgba.size, (255, 255, 255))
+            background.paste(rgba, mask=rgba.getchannel('A'))
+            resized = background
+        else:
+            resized = resized.convert('RGB')
+    elif spec['format'] == 'WEBP' and resized.mode not in ('RGB', 'RGBA'):
+        resized = resized.convert('RGBA' if 'transparency' in resized.info else 'RGB')
+
+    output = io.BytesIO()
+    resized.save(output, format=spec['format'], quality=spec['quality'], optimize=True)
+    return output.getvalue()
+
+
+def _write_atomic(path, data):
+    # Write next to the target and rename, so readers never see a partial file
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as tmp:
+            tmp.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+def generate_variants(source_key, source, variants=None, force=False):
+    """
+    Render the missing variants of one image (all of them with force=True).
+    `source` is the original as bytes, a path or a file-like object; it is only
+    decoded when at least one variant has to be rendered.
+    Returns the list of variants written.
+    """
+    variants = list(variants or VARIANT_SPECS)
+    if not force:
+        variants = [v for v in variants if not variant_path(source_key, v).exists()]
+    if not variants:
+        return []
+
+    if callable(source):
+        source = source()
+    image = _open_image(source)
+    for variant in variants:
+        _write_atomic(variant_path(source_key, variant), render_variant(image, variant))
+    return variants
+
+
+def generate_variants_safely(source_key, source):
+    """generate_variants for upload hooks: a broken image must not fail the upload."""
+    try:
+        return generate_variants(source_key, source)
+    except Exception:
+        logger.exception('Could not generate image variants for %s', source_key)
+        return []
+
+
+def delete_variants(source_key):
+    shutil.rmtree(Path(settings.MEDIA_ROOT) / VARIANT_DIR / source_key, ignore_errors=True)
+
+
+def serve_variant(request, source_key, variant, load_source):
+    """
+    Response with the cached variant, rendering it first if needed.
+    `load_source` is only called on a cache miss and returns the original image.
+    Raises OSError / PIL errors when the original cannot be decoded.
+    """
+    path = variant_path(source_key, variant)
+    if not path.exists():
+        generate_variants(source_key, load_source, variants=[variant])
+
+    stat = path.stat()
+    etag = quote_etag(f"{variant}-{int(stat.st_mtime)}-{stat.st_size}")
+    not_modified = get_conditional_response(request, etag=etag, last_modified=int(stat.st_mtime))
+    if not_modified is not None:
+        return not_modified
+
+    response = FileResponse(open(path, 'rb'), content_type=variant_content_type(variant))
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(int(stat.st_mtime))
+    response['Cache-Control'] = 'private, max-age=86400'
+    return response
+
+
+def invalid_size_response(size, response_class=Response):
+    """
+    400 response for an unknown ?size= value, None when the value is valid.
+    Plain Django views (async_views) pass response_class=JsonResponse.
+    """
+    if size in SIZE_CHOICES:
+        return None
+    return response_class({
+        'error': 'Invalid size',
+        'details': f"size must be one of: {', '.join(SIZE_CHOICES)}"
+    }, status=status.HTTP_400_BAD_REQUEST)
+
+
+def variant_response(request, source_key, size, load_source, response_class=Response):
+    """serve_variant for API views: a 422 when the original is not a decodable image."""
+    try:
+        return serve_variant(request, source_key, size, load_source)
+    except (OSError, ValueError) as e:
+        return response_class({
+            'error': 'Could not generate image variant',
+            'details': str(e)
+        }, status=status.HTTP_422_UNPROCESSABLE_ENTITY)
@@ -0,0 +1,290 @@
+"""
+Per-request instrumentation.
+
+RequestMetricsMiddleware measures for every request:
+- SQL query count and total SQL time (through a connection execute wrapper,
+  so it works with DEBUG off),
+- render time, i.e. the time DRF spends serializing the response body
+  (recorded by InstrumentedJSONRenderer),
+- response size and total latency.
+
+Each request is logged as one JSON line on the 'sindipro.requests' logger and
+folded into per-URL-name reservoirs that sindipro_backend.views.metrics_view exposes as Prometheus
+summaries (p50/p95/p99). Reservoirs are per process: with several gunicorn
+workers each scrape reports the worker that served it.
+
+Views can declare a query budget with @query_budget(n) (placed above
+@api_view). Going over budget logs a warning, or raises QueryBudgetExceeded
+when QUERY_BUDGET_STRICT is on (the test setting).
+
+The middleware is async-capable. Under ASGI, the ORM runs every query of
+concurrent requests on the same sync worker thread, so instead of a wrapper
+per request each new connection gets one permanent wrapper that routes its
+queries to the metrics of the request in context (contextvars follow
+sync_to_async into the thread).
+"""
+import contextvars
+import json
+import logging
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from rest_framework.renderers import JSONRenderer
+
+logger = logging.getLogger('sindipro.requests')
+
+# Samples kept per URL name for the percentile estimates
+RESERVOIR_SIZE = 1024
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+# Metric name -> (help text, RequestMetrics attribute)
+SUMMARIES = {
+    'sindipro_request_duration_seconds': ('Request latency', 'duration'),
+    'sindipro_request_db_queries': ('SQL queries per request', 'queries'),
+    'sindipro_request_db_seconds': ('Time spent in SQL per request', 'db_time'),
+    'sindipro_request_render_seconds': ('Time spent rendering the response body', 'render_time'),
+    'sindipro_response_size_bytes': ('Response body size', 'size'),
+}
+
+_current = contextvars.ContextVar('request_metrics', default=None)
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+class RequestMetrics:
+    __slots__ = ('queries', 'db_time', 'render_time', 'duration', 'size', 'status')
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.render_time = 0.0
+        self.duration = 0.0
+        self.size = 0
+        self.status = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        # connection.execute_wrapper hook: count and time every query
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - start
+            self.queries += 1
+
+
+class MetricsRegistry:
+    """Thread-safe per-URL-name sample reservoirs."""
+
+    def __init__(self, size=RESERVOIR_SIZE):
+        self.size = size
+        self.lock = threading.Lock()
+        self.samples = defaultdict(lambda: deque(maxlen=self.size))
+        self.counts = defaultdict(int)
+        self.sums = defaultdict(lambda: defaultdict(float))
+
+    def record(self, view_name, metrics):
+        with self.lock:
+            self.samples[view_name].append(tuple(getattr(metrics, attr) for _, attr in SUMMARIES.values()))
+            self.counts[view_name] += 1
+            for _, attr in SUMMARIES.values():
+                self.sums[view_name][attr] += getattr(metrics, attr)
+
+    def reset(self):
+        with self.lock:
+            self.samples.clear()
+            self.counts.clear()
+            self.sums.clear()
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                name: (list(samples), self.counts[name], dict(self.sums[name]))
+                for name, samples in self.samples.items()
+            }
+
+
+registry = MetricsRegistry()
+
+
+def quantile(sorted_values, q):
+    """Nearest-rank quantile of an already sorted list."""
+    if not sorted_values:
+        return 0
+    index = min(int(q * len(sorted_values)), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+def _label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def render_prometheus(snapshot):
+    lines = []
+    for position, (metric, (help_text, attr)) in enumerate(SUMMARIES.items()):
+        lines.append(f'# HELP {metric} {help_text}')
+        lines.append(f'# TYPE {metric} summary')
+        for view_name in sorted(snapshot):
+            samples, count, sums = snapshot[view_name]
+            values = sorted(sample[position] for sample in samples)
+            view = _label(view_name)
+            for q in QUANTILES:
+                lines.append(f'{metric}{{view="{view}",quantile="{q}"}} {quantile(values, q):.6g}')
+            lines.append(f'{metric}_sum{{view="{view}"}} {sums.get(attr, 0):.6g}')
+            lines.append(f'{metric}_count{{view="{view}"}} {count}')
+    return '\n'.join(lines) + '\n'
+
+
+def view_name_for(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unresolved'
+    return match.view_name or match._func_path
+
+
+def _route_to_current(execute, sql, params, many, context):
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    return metrics(execute, sql, params, many, context)
+
+
+def _install_router(sender, connection, **kwargs):
+    """connection_created receiver: route the connection's queries to the current request's metrics."""
+    if _route_to_current not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_route_to_current)
+
+
+class RequestMetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+            connection_created.connect(_install_router, dispatch_uid='request_metrics_router')
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        start = time.perf_counter()
+        try:
+            with _wrap_aliases(metrics, list(connections)):
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, metrics, start)
+
+    async def __acall__(self, request):
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, metrics, start)
+
+    def finish(self, request, response, metrics, start):
+        metrics.duration = time.perf_counter() - start
+        metrics.status = response.status_code
+        if not response.streaming:
+            metrics.size = len(response.content)
+        elif response.has_header('Content-Length'):
+            metrics.size = int(response['Content-Length'])
+
+        view_name = view_name_for(request)
+        registry.record(view_name, metrics)
+        logger.info(json.dumps({
+            'method': request.method,
+            'path': request.path,
+            'view': view_name,
+            'status': metrics.status,
+            'duration_ms': round(metrics.duration * 1000, 2),
+            'db_queries': metrics.queries,
+            'db_ms': round(metrics.db_time * 1000, 2),
+            'render_ms': round(metrics.render_time * 1000, 2),
+            'response_bytes': metrics.size,
+        }))
+
+        self.check_query_budget(request, view_name, metrics)
+        return response
+
+    def check_query_budget(self, request, view_name, metrics):
+        match = getattr(request, 'resolver_match', None)
+        budget = getattr(match.func, 'query_budget', None) if match else None
+        if budget is None or metrics.queries <= budget:
+            return
+        if request.method not in match.func.query_budget_methods:
+            return
+        message = f'{view_name} ran {metrics.queries} queries, over its budget of {budget}'
+        if settings.QUERY_BUDGET_STRICT:
+            raise QueryBudgetExceeded(message)
+        logger.warning(message)
+
+
+class InstrumentedJSONRenderer(JSONRenderer):
+    """JSONRenderer that adds its render time to the current request's metrics."""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        start = time.perf_counter()
+        try:
+            return super().render(data, accepted_media_type, renderer_context)
+        finally:
+            metrics = _current.get()
+            if metrics is not None:
+                metrics.render_time += time.perf_counter() - start
+
+
+def query_budget(max_queries, methods=('GET',)):
+    """
+    Declare the most SQL queries a view may run per request for `methods`.
+    Apply above @api_view so the attribute lands on the routed view.
+    """
+    def decorator(view):
+        view.query_budget = max_queries
+        view.query_budget_methods = tuple(methods)
+        return view
+    return decorator
+
+
+@contextmanager
+def assert_max_queries(max_queries, using=None):
+    """
+    Test helper: fail when the block runs more than `max_queries` queries.
+
+        with assert_max_queries(4):
+            client.get('/api/buildings/units/')
+    """
+    metrics = RequestMetrics()
+    with _wrap_aliases(metrics, [using] if using else list(connections)):
+        yield metrics
+    if metrics.queries > max_queries:
+        raise QueryBudgetExceeded(f'{metrics.queries} queries executed, budget is {max_queries}')
+
+
+@contextmanager
+def _wrap_aliases(metrics, aliases):
+    """Route every query on the given database aliases through `metrics`."""
+    wrapped = []
+    try:
+        for alias in aliases:
+            wrapper = connections[alias].execute_wrapper(metrics)
+            wrapper.__enter__()
+            wrapped.append(wrapper)
+        yield
+    finally:
+        for wrapper in reversed(wrapped):
+            wrapper.__exit__(None, None, None)
@@ -0,0 +1,146 @@
+import base64
+import json
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetCursorPagination(BasePagination):
+    """
+    Opt-in keyset (seek) pagination for the function-based list views.
+
+    Pagination only kicks in when the request has `?cursor=` or `?limit=`,
+    so existing clients keep receiving the full list. Pages are fetched with
+    a WHERE (ordering columns) < (last row values) condition on a unique
+    ordering that always ends in `id`, so every page costs the same
+    regardless of how deep the client has scrolled.
+
+    Usage in a view:
+
+        paginator = KeysetCursorPagination(ordering=('-expense_date', '-id'))
+        page = paginator.paginate_queryset(expenses, request)
+        if page is not None:
+            return paginator.get_paginated_response(ExpenseReadSerializer(page, many=True).data)
+    """
+    cursor_query_param = 'cursor'
+    limit_query_param = 'limit'
+    default_limit = 50
+    max_limit = 500
+    invalid_cursor_message = 'Invalid cursor'
+
+    def __init__(self, ordering=('-created_at', '-id'), results_key='results'):
+        ordering = tuple(ordering)
+        if ordering[-1].lstrip('-') not in ('id', 'pk'):
+            # A unique tie-breaker keeps the keyset strictly ordered
+            ordering += ('-id' if ordering[-1].startswith('-') else 'id',)
+        self.ordering = ordering
+        self.results_key = results_key
+
+    def is_requested(self, request):
+        params = request.query_params
+        return self.cursor_query_param in params or self.limit_query_param in params
+
+    def get_limit(self, request):
+        try:
+            limit = int(request.query_params[self.limit_query_param])
+        except (KeyError, ValueError):
+            return self.default_limit
+        return min(max(limit, 1), self.max_limit)
+
+    def encode_cursor(self, values):
+        raw = json.dumps(values, default=str, separators=(',', ':')).encode('utf-8')
+        return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+    def decode_cursor(self, cursor, model):
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+            if not isinstance(values, list) or len(values) != len(self.ordering):
+                raise ValueError
+            return [
+                _resolve_field(model, field.lstrip('-')).to_python(value)
+                for field, value in zip(self.ordering, values)
+            ]
+        except Exception:
+            raise NotFound(self.invalid_cursor_message)
+
+    def _after(self, values):
+        """Build the keyset condition selecting rows that follow `values`."""
+        condition = Q()
+        equal = Q()
+        for field, value in zip(self.ordering, values):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            condition |= equal & Q(**{f'{name}__{lookup}': value})
+            equal &= Q(**{name: value})
+        return condition
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if not self.is_requested(request):
+            return None
+
+        self.request = request
+        self.limit = self.get_limit(request)
+
+        queryset = queryset.order_by(*self.ordering)
+        cursor = request.query_params.get(self.cursor_query_param)
+        if cursor:
+            queryset = queryset.filter(self._after(self.decode_cursor(cursor, queryset.model)))
+
+        # One extra row tells whether another page exists without a COUNT(*)
+        rows = list(queryset[:self.limit + 1])
+        self.has_more = len(rows) > self.limit
+        page = rows[:self.limit]
+
+        self.next_cursor = None
+        if self.has_more:
+            last = page[-1]
+            self.next_cursor = self.encode_cursor([
+                _value_of(last, field.lstrip('-')) for field in self.ordering
+            ])
+        return page
+
+    def get_next_link(self):
+        if not self.next_cursor:
+            return None
+        url = self.request.build_absolute_uri()
+        url = replace_query_param(url, self.limit_query_param, self.limit)
+        return replace_query_param(url, self.cursor_query_param, self.next_cursor)
+
+    def get_paginated_response(self, data):
+        return Response({
+            self.results_key: data,
+            'next': self.get_next_link(),
+            'next_cursor': self.next_cursor,
+            'limit': self.limit,
+        })
+
+
+def _resolve_field(model, path):
+    """Return the model field for a (possibly related) lookup path like 'building__building_name'."""
+    field = None
+    for part in path.split('__'):
+        if part == 'pk':
+            part = model._meta.pk.name
+        try:
+            field = model._meta.get_field(part)
+        except FieldDoesNotExist:
+            raise FieldDoesNotExist(f"Cannot paginate on unknown field '{path}'")
+        if field.is_relation and field.related_model is not None and part != path.split('__')[-1]:
+            model = field.related_model
+    if field.is_relation:
+        # Ordering on a foreign key compares its raw id value
+        field = field.target_field
+    return field
+
+
+def _value_of(obj, path):
+    for part in path.split('__'):
+        if obj is None:
+            return None
+        obj = getattr(obj, part)
+    return getattr(obj, 'pk', obj)
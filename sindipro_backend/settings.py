@@ -14,6 +14,11 @@ RENDER_EXTERNAL_HOSTNAME = config('RENDER_EXTERNAL_HOSTNAME', default='')
 if RENDER_EXTERNAL_HOSTNAME:
     ALLOWED_HOSTS.append(RENDER_EXTERNAL_HOSTNAME)
 
+# 'wsgi' (sync gunicorn workers) or 'asgi' (uvicorn workers under gunicorn, see start.sh).
+# In ASGI mode the I/O-heavy read endpoints are routed to their async views.
+SERVER_MODE = config('SERVER_MODE', default='wsgi')
+ASYNC_VIEWS = config('ASYNC_VIEWS', default=SERVER_MODE == 'asgi', cast=bool)
+
 INSTALLED_APPS = [
     'django.contrib.admin',
     'django.contrib.auth',
@@ -39,11 +44,13 @@ INSTALLED_APPS = [
     'reporting',
     'users_mgmt',
     'contacts_mgmt',
+    'jobs',
 ]
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',
+    'sindipro_backend.middleware.AsyncWhiteNoiseMiddleware',
+    'sindipro_backend.instrumentation.RequestMetricsMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -80,7 +87,9 @@ DATABASES = {
         'PASSWORD': config('DB_PASSWORD', default=''),
         'HOST': config('DB_HOST', default='pg-388d85e4-horiachyir-880f.d.aivencloud.com'),
         'PORT': config('DB_PORT', default='19239'),
-        'CONN_MAX_AGE': 60,  # Keep connections alive for 60 seconds
+        # Persistent connections: one per worker thread, kept for DB_CONN_MAX_AGE seconds
+        'CONN_MAX_AGE': config('DB_CONN_MAX_AGE', default=60, cast=int),
+        'CONN_HEALTH_CHECKS': config('DB_CONN_HEALTH_CHECKS', default=True, cast=bool),
         'OPTIONS': {
             'client_encoding': 'UTF8',
             'connect_timeout': 10,  # Connection timeout in seconds
@@ -89,6 +98,17 @@ DATABASES = {
     }
 }
 
+# DB_ENGINE=sqlite: local SQLite file (DB_SQLITE_PATH) instead of PostgreSQL, for tests and load
+# tests. The historical building_mgmt migrations only replay on PostgreSQL, so SQLite databases
+# are created from the models (test databases here, loadtest/settings.py for load tests).
+if config('DB_ENGINE', default='postgresql') == 'sqlite':
+    DATABASES['default'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': config('DB_SQLITE_PATH', default=str(BASE_DIR / 'db.sqlite3')),
+        'CONN_MAX_AGE': DATABASES['default']['CONN_MAX_AGE'],
+        'TEST': {'MIGRATE': False},
+    }
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -132,7 +152,7 @@ REST_FRAMEWORK = {
     'PAGE_SIZE': 10,
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
     'DEFAULT_RENDERER_CLASSES': (
-        'rest_framework.renderers.JSONRenderer',
+        'sindipro_backend.instrumentation.InstrumentedJSONRenderer',
     ),
     'DEFAULT_PARSER_CLASSES': [
         'rest_framework.parsers.JSONParser',
@@ -228,3 +248,100 @@ MEDIA_ROOT = BASE_DIR / 'media'
 
 # Custom User Model
 AUTH_USER_MODEL = 'auth_system.User'
+
+# Background jobs (manage.py run_workers). Off unless a worker shares the database and MEDIA_ROOT
+# with the web service: `?async=1` requests are then handled in the request itself.
+JOBS_ENABLED = config('JOBS_ENABLED', default=False, cast=bool)
+JOB_WORKER_PROCESSES = config('JOB_WORKER_PROCESSES', default=2, cast=int)
+JOB_POLL_INTERVAL = config('JOB_POLL_INTERVAL', default=2.0, cast=float)  # Seconds between polls when idle
+JOB_MAX_ATTEMPTS = config('JOB_MAX_ATTEMPTS', default=3, cast=int)
+JOB_RETRY_DELAY = config('JOB_RETRY_DELAY', default=30, cast=int)  # Seconds, doubled on every retry
+JOB_HEARTBEAT_INTERVAL = config('JOB_HEARTBEAT_INTERVAL', default=30, cast=int)  # Seconds between running-job heartbeats
+JOB_STALE_AFTER = config('JOB_STALE_AFTER', default=300, cast=int)  # Running jobs without a heartbeat for this long are requeued
+
+# Technical request photo uploads (multipart)
+TECHNICAL_IMAGE_MAX_BYTES = config('TECHNICAL_IMAGE_MAX_BYTES', default=10 * 1024 * 1024, cast=int)
+TECHNICAL_IMAGE_MAX_FILES = config('TECHNICAL_IMAGE_MAX_FILES', default=10, cast=int)
+TECHNICAL_IMAGE_INSERT_BATCH_BYTES = config('TECHNICAL_IMAGE_INSERT_BATCH_BYTES', default=16 * 1024 * 1024, cast=int)  # Image bytes held per bulk INSERT
+TECHNICAL_IMAGE_STREAM_CHUNK_BYTES = config('TECHNICAL_IMAGE_STREAM_CHUNK_BYTES', default=1024 * 1024, cast=int)  # Blob slice per query (async view)
+
+# Caches: CACHE_BACKEND is locmem (default, per process), file or redis.
+# A locmem cache is private to each process: with several gunicorn workers use file or redis
+# so invalidations reach every worker (cache_response is bypassed otherwise).
+CACHE_BACKEND = config('CACHE_BACKEND', default='locmem')
+CACHE_BACKENDS = {
+    'locmem': ('django.core.cache.backends.locmem.LocMemCache', 'sindipro'),
+    'file': ('django.core.cache.backends.filebased.FileBasedCache', '/var/tmp/sindipro_cache'),
+    'redis': ('django.core.cache.backends.redis.RedisCache', 'redis://127.0.0.1:6379/1'),
+}
+CACHES = {
+    'default': {
+        'BACKEND': CACHE_BACKENDS[CACHE_BACKEND][0],
+        'LOCATION': config('CACHE_LOCATION', default=CACHE_BACKENDS[CACHE_BACKEND][1]),
+        'TIMEOUT': config('CACHE_TIMEOUT', default=300, cast=int),
+        'KEY_PREFIX': 'sindipro',
+        'OPTIONS': {'MAX_ENTRIES': config('CACHE_MAX_ENTRIES', default=10000, cast=int)}
+                   if CACHE_BACKEND != 'redis' else {},
+    },
+}
+
+# Processes serving requests (gunicorn.conf.py exports the worker count it starts)
+WEB_CONCURRENCY = config('WEB_CONCURRENCY', default=1, cast=int)
+
+# View response caching (sindipro_backend.caching.cache_response)
+VIEW_CACHE_ENABLED = config('VIEW_CACHE_ENABLED', default=True, cast=bool)
+VIEW_CACHE_ALIAS = 'default'
+VIEW_CACHE_TIMEOUT = config('VIEW_CACHE_TIMEOUT', default=300, cast=int)
+
+# Financial batch endpoints (POST .../bulk/)
+FINANCIAL_BULK_MAX_ITEMS = config('FINANCIAL_BULK_MAX_ITEMS', default=1000, cast=int)
+FINANCIAL_BULK_BATCH_SIZE = config('FINANCIAL_BULK_BATCH_SIZE', default=500, cast=int)  # Rows per INSERT
+# Row errors reported by a CSV/XLSX financial import (the rest are only counted)
+FINANCIAL_IMPORT_MAX_ERRORS = config('FINANCIAL_IMPORT_MAX_ERRORS', default=100, cast=int)
+
+# Consumption register bulk ingest (POST /api/consumption/register/bulk/)
+CONSUMPTION_BULK_MAX_ITEMS = config('CONSUMPTION_BULK_MAX_ITEMS', default=10000, cast=int)
+CONSUMPTION_BULK_BATCH_SIZE = config('CONSUMPTION_BULK_BATCH_SIZE', default=1000, cast=int)  # Rows per INSERT
+
+# Consumption anomaly detection (consumptions.anomalies)
+CONSUMPTION_ANOMALY_Z_THRESHOLD = config('CONSUMPTION_ANOMALY_Z_THRESHOLD', default=3.0, cast=float)
+CONSUMPTION_ANOMALY_SEASONAL_THRESHOLD = config('CONSUMPTION_ANOMALY_SEASONAL_THRESHOLD', default=50.0, cast=float)  # Percent
+CONSUMPTION_ANOMALY_MIN_HISTORY = config('CONSUMPTION_ANOMALY_MIN_HISTORY', default=6, cast=int)  # Readings before z-scores
+
+# Consumption register rollups (consumptions.rollups): series spanning more days than
+# CONSUMPTION_ROLLUP_MIN_DAYS read the rollups; compact_consumption_registers folds raw
+# registers older than CONSUMPTION_RAW_RETENTION_DAYS into them
+CONSUMPTION_ROLLUP_MIN_DAYS = config('CONSUMPTION_ROLLUP_MIN_DAYS', default=92, cast=int)
+CONSUMPTION_RAW_RETENTION_DAYS = config('CONSUMPTION_RAW_RETENTION_DAYS', default=730, cast=int)
+
+# Seconds a user's resolved building access is cached (invalidated on Building/BuildingAccess changes)
+BUILDING_ACCESS_CACHE_TTL = config('BUILDING_ACCESS_CACHE_TTL', default=60, cast=int)
+
+# Public building directory (signup): server-side cache (invalidated on Building/Address
+# changes) and the Cache-Control max-age for browsers and shared caches (CDN)
+BUILDING_DIRECTORY_CACHE_TTL = config('BUILDING_DIRECTORY_CACHE_TTL', default=3600, cast=int)
+BUILDING_DIRECTORY_MAX_AGE = config('BUILDING_DIRECTORY_MAX_AGE', default=60, cast=int)
+BUILDING_DIRECTORY_SHARED_MAX_AGE = config('BUILDING_DIRECTORY_SHARED_MAX_AGE', default=300, cast=int)
+
+# Request instrumentation (sindipro_backend.instrumentation)
+# Strict mode turns @query_budget overruns into errors; enable it when running tests
+QUERY_BUDGET_STRICT = config('QUERY_BUDGET_STRICT', default=False, cast=bool)
+REQUEST_LOG_LEVEL = config('REQUEST_LOG_LEVEL', default='INFO')
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        # One JSON line per request
+        'sindipro.requests': {
+            'handlers': ['console'],
+            'level': REQUEST_LOG_LEVEL,
+            'propagate': False,
+        },
+    },
+}
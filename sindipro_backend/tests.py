@@ -0,0 +1,205 @@
+import datetime
+import shutil
+import tempfile
+from unittest import mock
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.test import TestCase, override_settings
+from django.urls import path
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from auth_system.models import User
+from building_mgmt import views as building_views
+from building_mgmt.tests import create_building, create_user
+from field_mgmt import views as field_views
+from field_mgmt.models import FieldMgmtTechnical, FieldMgmtTechnicalImage
+from financials.views import financial_account_view
+from reporting import views as reporting_views
+from reporting.models import GeneratedReport, ReportTemplate
+from users_mgmt.tests import GIF
+from .instrumentation import QueryBudgetExceeded, assert_max_queries
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+# Each async view next to its sync version (the real URLconf routes only one, per ASYNC_VIEWS)
+urlpatterns = [
+    path('sync/reports/<int:id>/', reporting_views.download_report),
+    path('async/reports/<int:id>/', reporting_views.download_report_async),
+    path('sync/images/<int:id>/', field_views.technical_image),
+    path('async/images/<int:id>/', field_views.technical_image_async),
+    path('sync/directory/', building_views.building_directory),
+    path('async/directory/', building_views.building_directory_async),
+]
+
+
+class AssertMaxQueriesTests(TestCase):
+    def test_within_budget(self):
+        with assert_max_queries(2) as metrics:
+            User.objects.count()
+            User.objects.exists()
+        self.assertEqual(metrics.queries, 2)
+
+    def test_over_budget_fails(self):
+        with self.assertRaisesMessage(QueryBudgetExceeded, '3 queries executed, budget is 2'):
+            with assert_max_queries(2):
+                for _ in range(3):
+                    User.objects.count()
+
+
+class QueryBudgetTests(TestCase):
+    """@query_budget is enforced by RequestMetricsMiddleware on the routed view."""
+
+    url = '/api/financial/account/'
+
+    def setUp(self):
+        cache.clear()  # a cached response runs no queries
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user(
+            email='master@example.com', username='master@example.com', password='test-password', role='master'
+        ))
+
+    @override_settings(QUERY_BUDGET_STRICT=True)
+    def test_within_budget(self):
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+
+    @override_settings(QUERY_BUDGET_STRICT=True)
+    @mock.patch.object(financial_account_view, 'query_budget', 0)
+    def test_strict_over_budget_raises(self):
+        with self.assertRaisesMessage(QueryBudgetExceeded, 'over its budget of 0'):
+            self.client.get(self.url)
+
+    @override_settings(QUERY_BUDGET_STRICT=False)
+    @mock.patch.object(financial_account_view, 'query_budget', 0)
+    def test_over_budget_warns(self):
+        with self.assertLogs('sindipro.requests', 'WARNING') as logs:
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('over its budget of 0', logs.output[0])
+
+    @override_settings(QUERY_BUDGET_STRICT=True)
+    @mock.patch.object(financial_account_view, 'query_budget', 0)
+    def test_other_methods_are_not_budgeted(self):
+        response = self.client.post(self.url, {}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+
+@override_settings(VIEW_CACHE_ENABLED=True)
+class CacheResponseTests(TestCase):
+    url = '/api/financial/account/'
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user(
+            email='master@example.com', username='master@example.com', password='test-password', role='master'
+        ))
+
+    def cache_header(self):
+        return self.client.get(self.url).get('X-Cache')
+
+    @override_settings(WEB_CONCURRENCY=1)
+    def test_single_process_locmem_is_cached(self):
+        self.assertEqual(self.cache_header(), 'MISS')
+        self.assertEqual(self.cache_header(), 'HIT')
+
+    @override_settings(WEB_CONCURRENCY=4)
+    def test_locmem_shared_by_several_workers_is_bypassed(self):
+        self.assertIsNone(self.cache_header())
+        self.assertIsNone(self.cache_header())
+
+
+@override_settings(ROOT_URLCONF='sindipro_backend.tests', MEDIA_ROOT=MEDIA_ROOT)
+class AsyncViewParityTests(TestCase):
+    """The ASGI-mode views answer exactly like the sync views they replace."""
+
+    COMPARED_HEADERS = ('Content-Type', 'Content-Length', 'Content-Disposition', 'Content-Range', 'ETag',
+                        'Last-Modified', 'Cache-Control', 'Accept-Ranges', 'WWW-Authenticate')
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.master = create_user('master@example.com')
+        cls.outsider = create_user('outsider@example.com', role='manager')
+        cls.building = create_building(cls.master, 'Async', '00.000.000/0001-70')
+        template = ReportTemplate.objects.create(name='Financial', report_type='financial', template_config={})
+        report_dates = {'start_date': datetime.date(2025, 1, 1), 'end_date': datetime.date(2025, 12, 31)}
+        cls.report = GeneratedReport.objects.create(
+            building=cls.building, template=template, report_name='Done', report_format='csv', status='completed',
+            **report_dates,
+        )
+        cls.report.report_file.save('report.csv', ContentFile(b'a,b\r\n1,2\r\n' * 5000))
+        cls.pending = GeneratedReport.objects.create(
+            building=cls.building, template=template, report_name='Pending', status='generating', **report_dates,
+        )
+        technical_request = FieldMgmtTechnical.objects.create(
+            company_email='tech@example.com', title='Leak', description='Garage leak', location='Garage'
+        )
+        cls.image = FieldMgmtTechnicalImage.objects.create(
+            technical_request=technical_request, image_data=GIF + bytes(100), mime_type='image/gif',
+            filename='leak.gif'
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+
+    def auth(self, user):
+        return {'Authorization': f'Bearer {RefreshToken.for_user(user).access_token}'}
+
+    async def content(self, response):
+        if not response.streaming:
+            return response.content
+        if hasattr(response.streaming_content, '__aiter__'):
+            return b''.join([chunk async for chunk in response.streaming_content])
+        # The sync views' iterators read the database
+        return await sync_to_async(b''.join)(response.streaming_content)
+
+    async def assert_same(self, path, user=None, headers=None):
+        """GET `path` from the sync and the async view; returns the (sync) status code."""
+        headers = {**(headers or {}), **(self.auth(user) if user else {})}
+        sync_response = await self.async_client.get(f'/sync/{path}', headers=headers)
+        async_response = await self.async_client.get(f'/async/{path}', headers=headers)
+        self.assertEqual(async_response.status_code, sync_response.status_code)
+        compared = self.COMPARED_HEADERS
+        if sync_response.get('Content-Type') == 'application/json':
+            # DRF renders compact JSON, JsonResponse adds spaces: same document, different length
+            self.assertEqual(async_response.json(), sync_response.json())
+            compared = [header for header in compared if header != 'Content-Length']
+        else:
+            self.assertEqual(await self.content(async_response), await self.content(sync_response))
+        for header in compared:
+            self.assertEqual(async_response.get(header), sync_response.get(header), header)
+        return sync_response.status_code
+
+    async def test_unauthenticated(self):
+        for path in (f'reports/{self.report.id}/', f'images/{self.image.id}/'):
+            with self.subTest(path=path):
+                self.assertEqual(await self.assert_same(path), 401)
+                self.assertEqual(await self.assert_same(path, headers={'Authorization': 'Bearer not-a-token'}), 401)
+
+    async def test_report_download(self):
+        self.assertEqual(await self.assert_same(f'reports/{self.report.id}/', self.master), 200)
+        self.assertEqual(await self.assert_same(f'reports/{self.report.id}/', self.outsider), 404)
+        self.assertEqual(await self.assert_same('reports/0/', self.master), 404)
+        self.assertEqual(await self.assert_same(f'reports/{self.pending.id}/', self.master), 409)
+
+    async def test_technical_image(self):
+        path = f'images/{self.image.id}/'
+        self.assertEqual(await self.assert_same(path, self.master), 200)
+        self.assertEqual(await self.assert_same(path, self.master, {'Range': 'bytes=3-40'}), 206)
+        self.assertEqual(await self.assert_same(path, self.master, {'Range': 'bytes=900-'}), 416)
+        etag = (await self.async_client.get(f'/sync/{path}', headers=self.auth(self.master)))['ETag']
+        self.assertEqual(await self.assert_same(path, self.master, {'If-None-Match': etag}), 304)
+        self.assertEqual(await self.assert_same(f'{path}?size=huge', self.master), 400)
+        self.assertEqual(await self.assert_same('images/0/', self.master), 404)
+
+    async def test_building_directory(self):
+        self.assertEqual(await self.assert_same('directory/'), 200)
+        etag = (await self.async_client.get('/sync/directory/'))['ETag']
+        self.assertEqual(await self.assert_same('directory/', headers={'If-None-Match': etag}), 304)
@@ -19,6 +19,7 @@ from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 from drf_spectacular.views import SpectacularAPIView, SpectacularRedocView, SpectacularSwaggerView
+from sindipro_backend.views import metrics_view
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -39,6 +40,10 @@ urlpatterns = [
     path('api/reports/', include('reporting.urls')),
     path('api/users/', include('users_mgmt.urls')),
     path('api/contacts/', include('contacts_mgmt.urls')),
+    path('api/jobs/', include('jobs.urls')),
+    
+    # Request metrics (Prometheus text format, admin only)
+    path('api/_metrics/', metrics_view, name='metrics'),
 ]
 
 # Media files serving for development
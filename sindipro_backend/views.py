@@ -0,0 +1,18 @@
+from django.http import HttpResponse
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAdminUser
+from .caching import render_cache_stats, stats as cache_stats
+from .instrumentation import registry, render_prometheus
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def metrics_view(request):
+    """
+    GET: Per-URL-name latency, SQL and size summaries, and view cache hit/miss
+         counters, in Prometheus text format.
+    """
+    return HttpResponse(
+        render_prometheus(registry.snapshot()) + render_cache_stats(cache_stats.snapshot()),
+        content_type='text/plain; version=0.0.4; charset=utf-8'
+    )
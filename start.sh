@@ -0,0 +1,13 @@
+#!/usr/bin/env bash
+
+set -o errexit
+
+# Workers, threads, recycling, preload and keep-alive come from gunicorn.conf.py
+# (WEB_CONCURRENCY, GUNICORN_* environment variables).
+# SERVER_MODE=asgi: uvicorn workers under gunicorn, with the async views of the
+# I/O-heavy read endpoints (see SERVER_MODE / ASYNC_VIEWS in settings)
+if [ "${SERVER_MODE:-wsgi}" = "asgi" ]; then
+    exec gunicorn sindipro_backend.asgi:application --config gunicorn.conf.py
+else
+    exec gunicorn sindipro_backend.wsgi:application --config gunicorn.conf.py
+fi
@@ -23,6 +23,11 @@ class UserProfile(models.Model):
     
     def __str__(self):
         return f"Profile of {self.user.username}"
+    
+    @property
+    def avatar_variant_key(self):
+        """Directory of the avatar's resized variants under MEDIA_ROOT/variants/"""
+        return self.avatar.name
 
 class BuildingAccess(models.Model):
     ACCESS_LEVEL_CHOICES = [
@@ -0,0 +1,21 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from sindipro_backend.image_variants import delete_variants, generate_variants_safely
+from .models import UserProfile
+
+
+@receiver(post_save, sender=UserProfile)
+def user_profile_saved(sender, instance, **kwargs):
+    # A new avatar gets a new file name, hence a fresh variant directory
+    if instance.avatar:
+        transaction.on_commit(
+            lambda: generate_variants_safely(instance.avatar_variant_key, instance.avatar.path)
+        )
+
+
+@receiver(post_delete, sender=UserProfile)
+def user_profile_deleted(sender, instance, **kwargs):
+    if instance.avatar:
+        transaction.on_commit(lambda: delete_variants(instance.avatar_variant_key))
@@ -0,0 +1,66 @@
+import shutil
+import tempfile
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from building_mgmt.tests import create_building, create_user
+from field_mgmt.models import FieldRequest, FieldRequestPhoto
+from .models import BuildingAccess, UserProfile
+
+# 1x1 transparent GIF
+GIF = (
+    b'GIF89a\x01\x00\x01\x00\x80\x00\x00\x00\x00\x00\xff\xff\xff!\xf9\x04\x01\x00\x00\x00\x00'
+    b',\x00\x00\x00\x00\x01\x00\x01\x00\x00\x02\x02D\x01\x00;'
+)
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class ImageAccessTests(TestCase):
+    """Photos and avatars are only served to users who can reach their building."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.master = create_user('master@example.com')
+        cls.owner = create_user('owner@example.com', role='manager')
+        cls.grantee = create_user('grantee@example.com', role='manager')
+        cls.outsider = create_user('outsider@example.com', role='manager')
+        cls.building = create_building(cls.owner, 'Shared', '00.000.000/0001-10')
+        create_building(cls.outsider, 'Other', '00.000.000/0001-11')
+        BuildingAccess.objects.create(user=cls.grantee, building=cls.building)
+
+        field_request = FieldRequest.objects.create(building=cls.building, title='Leak')
+        cls.photo = FieldRequestPhoto.objects.create(
+            field_request=field_request, photo=SimpleUploadedFile('leak.gif', GIF)
+        )
+        UserProfile.objects.create(user=cls.grantee, avatar=SimpleUploadedFile('avatar.gif', GIF))
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def get(self, user, url):
+        client = APIClient()
+        client.force_authenticate(user)
+        response = client.get(url)
+        if hasattr(response, 'close'):
+            response.close()
+        return response.status_code
+
+    def test_field_request_photo(self):
+        url = f'/api/field/requests/photos/{self.photo.id}/'
+        self.assertEqual(self.get(self.master, url), 200)
+        self.assertEqual(self.get(self.owner, url), 200)
+        self.assertEqual(self.get(self.grantee, url), 200)
+        self.assertEqual(self.get(self.outsider, url), 404)
+
+    def test_user_avatar(self):
+        url = f'/api/users/{self.grantee.id}/avatar/'
+        self.assertEqual(self.get(self.grantee, url), 200)
+        self.assertEqual(self.get(self.master, url), 200)
+        self.assertEqual(self.get(self.owner, url), 200)
+        self.assertEqual(self.get(self.outsider, url), 404)
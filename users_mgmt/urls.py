@@ -2,5 +2,5 @@ from django.urls import path
 from . import views
 
 urlpatterns = [
-    # API endpoints will be added here
+    path('<int:user_id>/avatar/', views.user_avatar, name='user-avatar'),
 ]
@@ -0,0 +1,40 @@
+from django.db.models import Q
+from django.http import FileResponse
+from rest_framework import status
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from building_mgmt.access import building_access
+from sindipro_backend.image_variants import ORIGINAL, invalid_size_response, variant_response
+from .models import UserProfile
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def user_avatar(request, user_id):
+    """
+    GET: A user's avatar: the user's own, or one of a user attached to (or granted
+    access to) a building the requesting user can access.
+    Query params: size=original|thumb|medium|webp (default original)
+    """
+    size = request.query_params.get('size', ORIGINAL)
+    error_response = invalid_size_response(size)
+    if error_response:
+        return error_response
+
+    profiles = UserProfile.objects.filter(user_id=user_id)
+    if user_id != request.user.id:
+        building_ids = building_access(request).building_ids()
+        if building_ids is not None:
+            profiles = profiles.filter(
+                Q(user__building_id__in=building_ids) | Q(user__building_access__building_id__in=building_ids)
+            ).distinct()
+    profile = profiles.only('id', 'avatar').first()
+    if not profile or not profile.avatar:
+        return Response({
+            'error': 'Avatar not found'
+        }, status=status.HTTP_404_NOT_FOUND)
+
+    if size == ORIGINAL:
+        return FileResponse(profile.avatar.open('rb'))
+    return variant_response(request, profile.avatar_variant_key, size, lambda: profile.avatar.path)